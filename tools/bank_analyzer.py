@@ -4,34 +4,51 @@ FQ4 Bank File Analyzer
 Analyzes and extracts data from CHRBANK, MAPBANK, BGMBANK files
 
 Bank File Structure:
-- Offset table at beginning (array of 16-bit little-endian values)
-- Each offset points to an entry in the file
+- Table at beginning (array of 16-bit little-endian values): entry
+  sizes in most banks, ascending entry offsets in others
 - Entries are variable length
 - Last entry extends to end of file
+
+The bank is memory-mapped: analyzer[i] returns entry i as a zero-copy
+memoryview without reading the rest of the file.
 """
 
-import struct
 import sys
 from pathlib import Path
-from typing import List, Tuple
+from typing import List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).parent))
+from bank_format import BankReader, BankLayout, ARCHIVE_SUFFIX, detect_bank_layout
 
 
-class BankAnalyzer:
+class BankAnalyzer(BankReader):
     """Analyzes and extracts DOS game bank files"""
 
     def __init__(self, filepath: str):
-        self.filepath = Path(filepath)
-        self.data: bytes = b''
-        self.offsets: List[int] = []
+        super().__init__(filepath)
         self.entry_count: int = 0
         self.base_offset: int = 0
 
     def load(self) -> None:
-        """Load bank file into memory"""
-        with open(self.filepath, 'rb') as f:
-            self.data = f.read()
+        """Map bank file into memory"""
+        self.open()
         print(f"Loaded {self.filepath.name}: {len(self.data)} bytes")
 
+    def build_offsets(self) -> List[int]:
+        if not self.detect_offset_table():
+            return []
+        return self._offsets
+
+    def apply_layout(self, layout: Optional[BankLayout]) -> bool:
+        """Adopt a detected layout; False if detection failed"""
+        if layout is None:
+            return False
+
+        self.offsets = list(layout.offsets)
+        self.entry_count = len(layout.offsets)
+        self.base_offset = layout.base_offset
+        return True
+
     def detect_size_table(self) -> bool:
         """
         Detect size table structure.
@@ -40,101 +57,13 @@ class BankAnalyzer:
         - Pure size table starting at byte 0 (no header)
         - Each 16-bit LE word is the size of an entry
         - Size table continues until sizes would exceed file
-        - Data immediately follows size table
-
-        Algorithm:
-        1. Read 16-bit sizes sequentially
-        2. Stop when sizes account for entire file
-        3. Calculate offsets by accumulating sizes
+        - Data immediately follows size table (after optional zero padding)
         """
-        if len(self.data) < 4:
-            return False
-
-        sizes = []
-        pos = 0
-        total_data_size = 0
-
-        # Read sizes until we account for the entire file
-        max_entries = min(10000, len(self.data) // 2)  # Sanity limit
-
-        for i in range(max_entries):
-            if pos + 2 > len(self.data):
-                break
-
-            size = struct.unpack_from('<H', self.data, pos)[0]
-
-            # Sanity checks
-            if size == 0:
-                # Zero marks end of size table
-                pos += 2  # Skip the zero
-                break
-            if size > 50000:  # Unreasonably large for these files
-                break
-
-            sizes.append(size)
-            total_data_size += size
-            pos += 2
-
-            # Check if we've accounted for the entire file
-            # Size table includes all entries plus any terminator
-            size_table_bytes = pos
-            expected_file_size = size_table_bytes + total_data_size
-
-            # Allow small variance (padding)
-            if abs(expected_file_size - len(self.data)) <= 10:
-                break
-
-            # If we've gone over, we read too many
-            if expected_file_size > len(self.data):
-                # Remove last entry and stop
-                sizes.pop()
-                total_data_size -= size
-                pos -= 2
-                break
-
-        if len(sizes) < 2:
-            return False
-
-        # Verify the calculation
-        # pos now points after the last entry (or zero terminator)
-        size_table_bytes = pos
-        expected_file_size = size_table_bytes + total_data_size
-
-        # Check if there's padding between size table and data
-        # (e.g., MAPBANK has 52 bytes of padding)
-        padding = 0
-        if expected_file_size < len(self.data):
-            # Check for zero padding
-            potential_padding = len(self.data) - expected_file_size
-            if potential_padding < 256:  # Reasonable padding size
-                # Verify it's actually zeros
-                padding_bytes = self.data[pos:pos + potential_padding]
-                if all(b == 0 for b in padding_bytes):
-                    padding = potential_padding
-                    size_table_bytes = pos + padding
-
-        expected_file_size = size_table_bytes + total_data_size
-
-        if abs(expected_file_size - len(self.data)) > 10:
-            return False
-
-        # Calculate offsets from sizes
-        current_offset = size_table_bytes
-        calculated_offsets = []
-
-        for size in sizes:
-            calculated_offsets.append(current_offset)
-            current_offset += size
-
-        self.offsets = calculated_offsets
-        self.entry_count = len(calculated_offsets)
-        self.base_offset = size_table_bytes
-
-        return True
+        return self.apply_layout(detect_bank_layout(self.data, ('size_table',)))
 
     def detect_offset_table(self) -> bool:
-        """Wrapper that tries size table detection"""
-        return self.detect_size_table()
+        """Detect the bank layout (size table or offset table)"""
+        return self.apply_layout(self.detect_layout())
 
     def analyze(self) -> dict:
         """Analyze bank file structure and return metadata"""
@@ -149,12 +78,7 @@ class BankAnalyzer:
         # Calculate entry sizes
         entry_info = []
         for i in range(self.entry_count):
-            start = self.offsets[i]
-            if i < self.entry_count - 1:
-                end = self.offsets[i + 1]
-            else:
-                end = len(self.data)
-
+            start, end = self.entry_range(i)
             size = end - start
             entry_info.append({
                 'index': i,
@@ -167,6 +91,7 @@ class BankAnalyzer:
             'filename': self.filepath.name,
             'filesize': len(self.data),
             'entry_count': self.entry_count,
+            'layout': self.layout.kind,
             'base_offset': self.base_offset,
             'offset_table_size': self.base_offset,
             'entries': entry_info,
@@ -188,12 +113,7 @@ class BankAnalyzer:
         extracted = 0
 
         for i in range(self.entry_count):
-            start = self.offsets[i]
-            if i < self.entry_count - 1:
-                end = self.offsets[i + 1]
-            else:
-                end = len(self.data)
-
+            start, end = self.entry_range(i)
             entry_data = self.data[start:end]
 
             # Save with index and offset in filename
@@ -228,7 +148,7 @@ class BankAnalyzer:
         return '\n'.join(lines)
 
 
-def analyze_all_banks(game_dir: Path, output_dir: Path):
+def analyze_all_banks(game_dir: Path, output_dir: Path, pack: bool = False):
     """Analyze all bank files in GAME directory"""
 
     bank_files = [
@@ -254,20 +174,27 @@ def analyze_all_banks(game_dir: Path, output_dir: Path):
         if result['status'] == 'success':
             print(analyzer.dump_header_info())
             print(f"\n--- Analysis Results ---")
+            print(f"Table layout: {result['layout']}")
             print(f"Entry count: {result['entry_count']}")
             print(f"Offset table size: {result['offset_table_size']} bytes")
             print(f"Average entry size: {result['avg_entry_size']:.1f} bytes")
             print(f"Entry size range: {result['min_entry_size']} - {result['max_entry_size']} bytes")
 
             # Extract entries
-            extract_dir = output_dir / bank_name.lower()
-            extracted = analyzer.extract_entries(extract_dir)
-            print(f"\nExtracted {extracted} entries to {extract_dir}")
+            if pack:
+                archive_path, _ = analyzer.write_archive(output_dir / f"{bank_name.lower()}{ARCHIVE_SUFFIX}")
+                print(f"\nPacked {result['entry_count']} entries into {archive_path}")
+            else:
+                extract_dir = output_dir / bank_name.lower()
+                extracted = analyzer.extract_entries(extract_dir)
+                print(f"\nExtracted {extracted} entries to {extract_dir}")
 
             results.append(result)
         else:
             print(f"Error analyzing {bank_name}: {result['message']}")
 
+        analyzer.close()
+
     # Save summary report
     summary_path = output_dir / "bank_analysis_summary.txt"
     with open(summary_path, 'w') as f:
@@ -288,19 +215,23 @@ def analyze_all_banks(game_dir: Path, output_dir: Path):
 
 def main():
     """Main entry point"""
-    if len(sys.argv) < 2:
-        print("Usage: bank_analyzer.py <bank_file> [output_dir]")
-        print("   or: bank_analyzer.py --all [game_dir] [output_dir]")
+    pack = '--pack' in sys.argv
+    argv = [arg for arg in sys.argv if arg != '--pack']
+
+    if len(argv) < 2:
+        print("Usage: bank_analyzer.py <bank_file> [output_dir] [--pack]")
+        print("   or: bank_analyzer.py --all [game_dir] [output_dir] [--pack]")
         print("\nAnalyzes FQ4 bank files and extracts entries")
+        print(f"--pack writes one {ARCHIVE_SUFFIX} archive + JSON index per bank")
         sys.exit(1)
 
-    if sys.argv[1] == '--all':
-        game_dir = Path(sys.argv[2] if len(sys.argv) > 2 else 'GAME')
-        output_dir = Path(sys.argv[3] if len(sys.argv) > 3 else 'output/banks')
-        analyze_all_banks(game_dir, output_dir)
+    if argv[1] == '--all':
+        game_dir = Path(argv[2] if len(argv) > 2 else 'GAME')
+        output_dir = Path(argv[3] if len(argv) > 3 else 'output/banks')
+        analyze_all_banks(game_dir, output_dir, pack)
     else:
-        bank_path = Path(sys.argv[1])
-        output_dir = Path(sys.argv[2] if len(sys.argv) > 2 else 'output/banks')
+        bank_path = Path(argv[1])
+        output_dir = Path(argv[2] if len(argv) > 2 else 'output/banks')
 
         analyzer = BankAnalyzer(str(bank_path))
         result = analyzer.analyze()
@@ -308,14 +239,20 @@ def main():
         if result['status'] == 'success':
             print(analyzer.dump_header_info())
             print(f"\n--- Analysis Results ---")
+            print(f"Table layout: {result['layout']}")
             print(f"Entry count: {result['entry_count']}")
             print(f"Offset table size: {result['offset_table_size']} bytes")
             print(f"Average entry size: {result['avg_entry_size']:.1f} bytes")
 
             # Extract
-            extract_dir = output_dir / bank_path.stem.lower()
-            extracted = analyzer.extract_entries(extract_dir)
-            print(f"\nExtracted {extracted} entries to {extract_dir}")
+            if pack:
+                archive_path, _ = analyzer.write_archive(output_dir / f"{bank_path.stem.lower()}{ARCHIVE_SUFFIX}")
+                print(f"\nPacked {result['entry_count']} entries into {archive_path}")
+            else:
+                extract_dir = output_dir / bank_path.stem.lower()
+                extracted = analyzer.extract_entries(extract_dir)
+                print(f"\nExtracted {extracted} entries to {extract_dir}")
+            analyzer.close()
         else:
             print(f"Error: {result['message']}")
             sys.exit(1)
@@ -0,0 +1,401 @@
+#!/usr/bin/env python3
+"""
+FQ4 Bank File Access
+Memory-mapped, random-access reading of CHRBANK, MAPBANK, BGMBANK files
+
+Bank files are an index table followed by variable-length entries. The
+reader maps the file instead of reading it, and hands out entries as
+zero-copy memoryviews, so looking up one entry never touches the others.
+
+Usage:
+    from bank_format import BankReader
+
+    with SomeBankReader('GAME/CHRBANK') as bank:
+        print(len(bank))
+        entry = bank[500]          # memoryview, no copy
+        for entry in bank:
+            ...
+        bank.write_archive('output/bank/CHRBANK.fq4b')
+
+Bank table layouts (detected per file, see detect_bank_layout):
+    size_table    16-bit entry sizes, optional 0 terminator and zero padding,
+                  then entry data; sizes account for the whole file
+    offset_table  16-bit ascending entry offsets; the first one points just
+                  past the table
+The detected offsets are cached in GAME/.fq4idx/<bank>.json, keyed by file
+size and mtime, so later runs skip detection.
+
+Packed archive layout (little-endian):
+    header  'FQ4B', version u16, reserved u16, entry count u32
+    table   (offset u32, size u32) per entry, offsets from start of file
+    data    entry bytes in index order, no gaps
+A JSON index with the same table is written next to it as <archive>.json.
+"""
+
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from dataclasses import dataclass
+from itertools import accumulate, repeat
+from operator import add
+from pathlib import Path
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+
+LAYOUT_KINDS = ('size_table', 'offset_table')
+DETECTOR_VERSION = 1
+INDEX_DIR = '.fq4idx'
+
+# Size table sanity limits
+MAX_TABLE_ENTRIES = 10000
+MAX_ENTRY_SIZE = 50000   # Unreasonably large for these files
+SIZE_TOLERANCE = 10      # Allowed mismatch between sizes and file length
+MAX_PADDING = 256        # Zero padding between table and data (MAPBANK has 52)
+
+
+ARCHIVE_MAGIC = b'FQ4B'
+ARCHIVE_VERSION = 1
+ARCHIVE_SUFFIX = '.fq4b'
+ARCHIVE_HEADER = struct.Struct('<4sHHI')
+ARCHIVE_ENTRY = struct.Struct('<II')
+ARCHIVE_BUFFER_SIZE = 1 << 20
+
+
+@dataclass
+class BankLayout:
+    """Detected bank table structure"""
+    kind: str            # one of LAYOUT_KINDS
+    offsets: List[int]   # entry start offsets
+    base_offset: int     # end of table (+ padding), i.e. start of entry data
+
+
+def read_table_words(data, count: int) -> array:
+    """Read up to count little-endian 16-bit words from the start of data"""
+    words = array('H')
+    words.frombytes(data[:min(count, len(data) // 2) * 2])
+    if sys.byteorder == 'big':
+        words.byteswap()
+    return words
+
+
+def detect_size_table(data, words: Sequence[int]) -> Optional[BankLayout]:
+    """
+    Size table hypothesis
+
+    Each word is the size of an entry. Sizes are read until they account
+    for the whole file (within SIZE_TOLERANCE), a 0 terminator, or an
+    implausible size; the gap left over must be zero padding.
+    """
+    length = len(data)
+    if length < 4:
+        return None
+
+    words = words[:MAX_TABLE_ENTRIES]
+    limit = len(words)
+    terminated = False
+    if 0 in words:
+        limit = words.index(0)
+        terminated = True
+    if limit and max(words[:limit]) > MAX_ENTRY_SIZE:
+        limit = next(i for i, size in enumerate(words[:limit]) if size > MAX_ENTRY_SIZE)
+        terminated = False
+
+    # ends[k]: table bytes + data bytes if the table held entries 0..k
+    ends = list(accumulate(map(add, words[:limit], repeat(2))))
+    count = bisect_left(ends, length - SIZE_TOLERANCE)
+    if count < limit:
+        # Entry `count` completes the file unless it overshoots it
+        if ends[count] <= length + SIZE_TOLERANCE:
+            count += 1
+        terminated = False
+
+    if count < 2:
+        return None
+
+    sizes = words[:count]
+    table_size = count * 2 + (2 if terminated else 0)
+    total = ends[count - 1] - count * 2
+
+    # Zero padding between size table and data
+    expected = table_size + total
+    if 0 < length - expected < MAX_PADDING and not any(data[table_size:length - total]):
+        table_size = length - total
+
+    if abs(table_size + total - length) > SIZE_TOLERANCE:
+        return None
+
+    offsets = [table_size] + [table_size + end for end in accumulate(sizes[:-1])]
+    return BankLayout('size_table', offsets, table_size)
+
+
+def detect_offset_table(data, words: Sequence[int]) -> Optional[BankLayout]:
+    """
+    Offset table hypothesis
+
+    The first word points just past the table, which fixes the entry
+    count; the offsets must then be ascending and inside the file.
+    """
+    if not words:
+        return None
+
+    count = words[0] // 2
+    offsets = list(words[:count])
+    if count < 2 or len(offsets) < count:
+        return None
+    if offsets != sorted(offsets) or offsets[-1] >= len(data):
+        return None
+
+    return BankLayout('offset_table', offsets, count * 2)
+
+
+LAYOUT_DETECTORS = {
+    'size_table': detect_size_table,
+    'offset_table': detect_offset_table,
+}
+
+
+def detect_bank_layout(data, kinds: Sequence[str] = LAYOUT_KINDS) -> Optional[BankLayout]:
+    """
+    Detect the table layout of a bank file
+
+    The header is read once into an array('H') and every hypothesis is
+    checked against it; the first consistent one (in `kinds` order) wins.
+
+    Args:
+        data: Bank file contents (bytes or memoryview)
+        kinds: Hypotheses to try
+
+    Returns:
+        BankLayout or None if no hypothesis is consistent
+    """
+    words = read_table_words(data, MAX_TABLE_ENTRIES + 1)
+    for kind in kinds:
+        layout = LAYOUT_DETECTORS[kind](data, words)
+        if layout is not None:
+            return layout
+    return None
+
+
+def layout_index_path(bank_path: Path) -> Path:
+    """Sidecar file holding the detected layout of a bank"""
+    return bank_path.parent / INDEX_DIR / f"{bank_path.name}.json"
+
+
+def load_layout_index(bank_path: Path, stat: os.stat_result) -> Optional[BankLayout]:
+    """Load a cached layout if it matches the bank's size and mtime"""
+    try:
+        with open(layout_index_path(bank_path), 'r', encoding='utf-8') as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if (index.get('version') != DETECTOR_VERSION or
+            index.get('size') != stat.st_size or
+            index.get('mtime_ns') != stat.st_mtime_ns):
+        return None
+    return BankLayout(index['kind'], index['offsets'], index['base_offset'])
+
+
+def save_layout_index(bank_path: Path, stat: os.stat_result, layout: BankLayout):
+    """Persist a detected layout (silently skipped if the directory is read-only)"""
+    index_path = layout_index_path(bank_path)
+    index = {
+        'version': DETECTOR_VERSION,
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'kind': layout.kind,
+        'base_offset': layout.base_offset,
+        'offsets': layout.offsets,
+    }
+    tmp_path = index_path.with_suffix('.tmp')
+    try:
+        index_path.parent.mkdir(exist_ok=True)
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(index, f)
+        os.replace(tmp_path, index_path)
+    except OSError:
+        pass
+
+
+class BankReader:
+    """
+    Memory-mapped bank file with lazily parsed, random-access entries
+
+    Entries are located with detect_bank_layout() (subclasses may override
+    build_offsets()). Entry i spans offsets[i] up to offsets[i + 1] (the
+    last entry runs to end of file).
+
+    Entry memoryviews point into the mapping: release them (or let them go
+    out of scope) before close(), otherwise the mapping stays open until
+    they are garbage collected.
+    """
+
+    def __init__(self, filepath, use_index: bool = True):
+        self.filepath = Path(filepath)
+        self.use_index = use_index
+        self.layout: Optional[BankLayout] = None
+        self._file = None
+        self._mmap: Optional[mmap.mmap] = None
+        self._view: Optional[memoryview] = None
+        self._offsets: Optional[List[int]] = None
+
+    def open(self) -> memoryview:
+        """Map the bank file (no-op if already open)"""
+        if self._view is None:
+            self._file = open(self.filepath, 'rb')
+            size = os.fstat(self._file.fileno()).st_size
+            if size == 0:
+                # mmap cannot map empty files
+                self._view = memoryview(b'')
+            else:
+                self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+                self._view = memoryview(self._mmap)
+        return self._view
+
+    def close(self):
+        """Unmap the bank file"""
+        if self._view is not None:
+            self._view.release()
+            self._view = None
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                # Entry views are still alive; the mapping closes with them
+                pass
+            self._mmap = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    @property
+    def data(self) -> memoryview:
+        """Whole file as a read-only memoryview (maps on first access)"""
+        return self.open()
+
+    def detect_layout(self) -> Optional[BankLayout]:
+        """Detect the table layout, using the sidecar index when it is current"""
+        if self.layout is None:
+            data = self.data
+            stat = os.fstat(self._file.fileno())
+            if self.use_index:
+                self.layout = load_layout_index(self.filepath, stat)
+            if self.layout is None:
+                self.layout = detect_bank_layout(data)
+                if self.layout is not None and self.use_index:
+                    save_layout_index(self.filepath, stat, self.layout)
+        return self.layout
+
+    def build_offsets(self) -> List[int]:
+        """Locate entry start offsets"""
+        layout = self.detect_layout()
+        return list(layout.offsets) if layout is not None else []
+
+    @property
+    def offsets(self) -> List[int]:
+        """Entry start offsets, parsed on first access"""
+        if self._offsets is None:
+            self._offsets = self.build_offsets()
+        return self._offsets
+
+    @offsets.setter
+    def offsets(self, value: List[int]):
+        self._offsets = value
+
+    def entry_range(self, index: int) -> Tuple[int, int]:
+        """Return (start, end) byte range of an entry"""
+        offsets = self.offsets
+        if index < 0:
+            index += len(offsets)
+        if not 0 <= index < len(offsets):
+            raise IndexError(f"Entry {index} out of range (0-{len(offsets) - 1})")
+
+        start = offsets[index]
+        end = offsets[index + 1] if index + 1 < len(offsets) else len(self.data)
+        return start, end
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def __getitem__(self, index: int) -> memoryview:
+        start, end = self.entry_range(index)
+        return self.data[start:end]
+
+    def __iter__(self) -> Iterator[memoryview]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def write_archive(self, archive_path) -> Tuple[Path, Path]:
+        """
+        Pack all entries into one indexed archive plus a JSON index
+
+        The archive is written in a single buffered pass straight from the
+        mapping. Empty entries are kept so archive indices match the bank.
+
+        Args:
+            archive_path: Output archive path (index goes to <archive>.json)
+
+        Returns:
+            (archive_path, index_path)
+        """
+        archive_path = Path(archive_path)
+        archive_path.parent.mkdir(parents=True, exist_ok=True)
+
+        data = self.data
+        ranges = [self.entry_range(index) for index in range(len(self))]
+        table = bytearray(ARCHIVE_HEADER.pack(ARCHIVE_MAGIC, ARCHIVE_VERSION, 0, len(ranges)))
+        offset = ARCHIVE_HEADER.size + ARCHIVE_ENTRY.size * len(ranges)
+        entries = []
+        for index, (start, end) in enumerate(ranges):
+            size = max(min(end, len(data)) - start, 0)
+            table += ARCHIVE_ENTRY.pack(offset, size)
+            entries.append({'index': index, 'offset': offset, 'size': size, 'source_offset': start})
+            offset += size
+
+        with open(archive_path, 'wb', buffering=ARCHIVE_BUFFER_SIZE) as f:
+            f.write(table)
+            for entry in entries:
+                start = entry['source_offset']
+                f.write(data[start:start + entry['size']])
+
+        index_path = archive_path.with_name(archive_path.name + '.json')
+        index = {
+            'format': ARCHIVE_MAGIC.decode('ascii'),
+            'version': ARCHIVE_VERSION,
+            'source': self.filepath.name,
+            'source_size': len(data),
+            'archive_size': offset,
+            'count': len(entries),
+            'entries': entries,
+        }
+        with open(index_path, 'w', encoding='utf-8') as f:
+            json.dump(index, f, indent=2)
+
+        return archive_path, index_path
+
+
+class PackedBank(BankReader):
+    """Random access to an archive written by BankReader.write_archive"""
+
+    def build_offsets(self) -> List[int]:
+        data = self.data
+        if len(data) < ARCHIVE_HEADER.size:
+            raise ValueError(f"Not a packed bank archive: {self.filepath}")
+
+        magic, version, _, count = ARCHIVE_HEADER.unpack_from(data)
+        if magic != ARCHIVE_MAGIC or version != ARCHIVE_VERSION:
+            raise ValueError(f"Not a packed bank archive: {self.filepath}")
+
+        table_end = ARCHIVE_HEADER.size + ARCHIVE_ENTRY.size * count
+        return [offset for offset, _ in ARCHIVE_ENTRY.iter_unpack(data[ARCHIVE_HEADER.size:table_end])]
@@ -23,8 +23,10 @@ from typing import List, Tuple, Optional
 
 try:
     from PIL import Image
+    import numpy as np
 except ImportError:
-    print("Error: PIL/Pillow required. Install with: pip install Pillow")
+    print("Error: PIL/Pillow and numpy are required.")
+    print("Install with: pip install Pillow numpy")
     sys.exit(1)
 
 
@@ -113,28 +115,23 @@ def select_sprite_palette(colors: List[Tuple[int, int, int]]) -> List[Tuple[int,
     # Start with black
     selected = [(0, 0, 0)]
     remaining = [c for c in filtered if c != (0, 0, 0)]
-
-    while len(selected) < 16 and remaining:
-        # Find color most different from all selected
-        best_color = None
-        best_min_dist = -1
-
-        for candidate in remaining:
-            # Calculate minimum distance to any selected color
-            min_dist = min(
-                sum((a - b) ** 2 for a, b in zip(candidate, sel))
-                for sel in selected
-            )
-
-            if min_dist > best_min_dist:
-                best_min_dist = min_dist
-                best_color = candidate
-
-        if best_color:
-            selected.append(best_color)
-            remaining.remove(best_color)
-        else:
-            break
+    if not remaining:
+        return selected + [(0, 0, 0)] * 15
+
+    # Minimum squared distance from each candidate to the selected set,
+    # updated with only the newest pick each round instead of recomputed
+    candidates = np.array(remaining, dtype=np.int64)
+    min_dist = ((candidates - np.array(selected[0])) ** 2).sum(axis=1)
+    taken = np.zeros(len(candidates), dtype=bool)
+
+    while len(selected) < 16 and not taken.all():
+        # Find color most different from all selected (first on ties)
+        best = int(np.where(taken, -1, min_dist).argmax())
+        taken[best] = True
+        selected.append(remaining[best])
+
+        dist = ((candidates - candidates[best]) ** 2).sum(axis=1)
+        np.minimum(min_dist, dist, out=min_dist)
 
     # Pad with black if needed
     while len(selected) < 16:
@@ -14,15 +14,16 @@ from typing import List, Tuple, Optional
 import argparse
 
 try:
-    from PIL import Image
+    import numpy as np
 except ImportError:
-    print("Error: PIL/Pillow is required. Install with: pip install Pillow")
+    print("Error: numpy is required. Install with: pip install numpy")
     sys.exit(1)
 
 # Import FQ4PaletteParser from existing fq4_extractor.py
 sys.path.insert(0, str(Path(__file__).parent))
 try:
-    from fq4_extractor import FQ4PaletteParser
+    from fq4_extractor import (FQ4PaletteParser, TileDedup, decode_planar_tiles,
+                               dedup_tiles, assemble_tile_sheet, indexed_image)
 except ImportError:
     print("Error: Cannot import FQ4PaletteParser from fq4_extractor.py")
     sys.exit(1)
@@ -52,7 +53,8 @@ class CHRExtractor:
     def __init__(self, filepath: Path, palette: List[Tuple[int, int, int]]):
         self.filepath = filepath
         self.palette = palette
-        self.tiles = []
+        self.data = b''
+        self.tiles = np.zeros((0, 8, 8), dtype=np.uint8)
         self.tile_width = 8
         self.tile_height = 8
 
@@ -70,6 +72,7 @@ class CHRExtractor:
 
         with open(self.filepath, 'rb') as f:
             data = f.read()
+        self.data = data
 
         total_tiles = len(data) // bytes_per_tile
         print(f"File: {self.filepath.name}")
@@ -77,24 +80,32 @@ class CHRExtractor:
         print(f"Tile size: {tile_size}x{tile_size}")
         print(f"Total tiles: {total_tiles}")
 
-        self.tiles = []
-        for tile_idx in range(total_tiles):
-            offset = tile_idx * bytes_per_tile
-            tile_data = data[offset:offset + bytes_per_tile]
+        self.tiles = decode_planar_tiles(data, tile_size, tile_size)
 
-            if len(tile_data) < bytes_per_tile:
-                break
+        # Debug: Show first non-empty tiles
+        for tile_idx, pixels in enumerate(self.tiles[:10]):
+            non_zero = int(np.count_nonzero(pixels))
+            if non_zero > 0:
+                colors = set(np.unique(pixels).tolist())
+                print(f"  Tile {tile_idx}: {non_zero}/{pixels.size} non-zero pixels, colors: {colors}")
 
-            pixels = self.decode_planar_tile(tile_data, tile_size, tile_size)
-            self.tiles.append(pixels)
+        print(f"Extracted {len(self.tiles)} tiles")
 
-            # Debug: Show first non-empty tile
-            if tile_idx < 10:
-                non_zero = sum(1 for p in pixels if p != 0)
-                if non_zero > 0:
-                    print(f"  Tile {tile_idx}: {non_zero}/{len(pixels)} non-zero pixels, colors: {set(pixels)}")
+    def dedup_tiles(self, flips: bool = False) -> TileDedup:
+        """
+        Reduce self.tiles to unique tiles (matched on raw planar bytes)
 
-        print(f"Extracted {len(self.tiles)} tiles")
+        Args:
+            flips: Also match horizontally/vertically mirrored tiles
+
+        Returns:
+            TileDedup holding the original -> unique index map
+        """
+        result = dedup_tiles(self.data, self.tile_width, self.tile_height, flips)
+        print(f"Unique tiles: {len(result.tiles)}/{len(self.tiles)}"
+              f"{' (flips matched)' if flips else ''}")
+        self.tiles = result.tiles
+        return result
 
     def decode_planar_tile(self, data: bytes, width: int, height: int) -> List[int]:
         """
@@ -118,32 +129,12 @@ class CHRExtractor:
         Returns:
             List of pixel indices (0-15)
         """
-        pixels = []
-        bytes_per_row = width // 8  # Number of bytes per row
-        bytes_per_plane = height * bytes_per_row
-
-        for row in range(height):
-            for col in range(width):
-                pixel = 0
-
-                # Which byte in the row contains this column?
-                byte_in_row = col // 8
-                bit_in_byte = 7 - (col % 8)  # MSB first
-
-                # Combine bits from all 4 planes
-                for plane in range(4):
-                    plane_offset = plane * bytes_per_plane
-                    row_offset = row * bytes_per_row
-                    byte_offset = plane_offset + row_offset + byte_in_row
-
-                    if byte_offset < len(data):
-                        byte_val = data[byte_offset]
-                        bit = (byte_val >> bit_in_byte) & 1
-                        pixel |= (bit << plane)
+        bytes_per_tile = 4 * height * (width // 8)
+        tile_data = bytes(data[:bytes_per_tile])
+        # Bytes missing from a short tile decode as color 0
+        tile_data += bytes(bytes_per_tile - len(tile_data))
 
-                pixels.append(pixel)
-
-        return pixels
+        return decode_planar_tiles(tile_data, width, height).reshape(-1).tolist()
 
     def save_sprite_sheet(self, output_path: Path, columns: int = 16):
         """
@@ -153,7 +144,7 @@ class CHRExtractor:
             output_path: Output PNG path
             columns: Number of tiles per row
         """
-        if not self.tiles:
+        if len(self.tiles) == 0:
             print("No tiles to save")
             return
 
@@ -163,32 +154,9 @@ class CHRExtractor:
         sheet_width = columns * self.tile_width
         sheet_height = rows * self.tile_height
 
-        # Create indexed color image
-        img = Image.new('P', (sheet_width, sheet_height), color=0)
-
-        # Set palette
-        pal_data = []
-        for r, g, b in self.palette:
-            pal_data.extend([r, g, b])
-        # Pad to 256 colors
-        while len(pal_data) < 768:
-            pal_data.append(0)
-        img.putpalette(pal_data)
-
-        # Draw tiles
-        for tile_idx, pixels in enumerate(self.tiles):
-            row = tile_idx // columns
-            col = tile_idx % columns
-
-            x_offset = col * self.tile_width
-            y_offset = row * self.tile_height
-
-            for y in range(self.tile_height):
-                for x in range(self.tile_width):
-                    pixel_idx = y * self.tile_width + x
-                    if pixel_idx < len(pixels):
-                        color_idx = pixels[pixel_idx]
-                        img.putpixel((x_offset + x, y_offset + y), color_idx)
+        # Lay out all tiles in one index buffer, then build the image once
+        sheet = assemble_tile_sheet(self.tiles, columns)
+        img = indexed_image(sheet, self.palette)
 
         output_path.parent.mkdir(parents=True, exist_ok=True)
         img.save(output_path)
@@ -202,30 +170,14 @@ class CHRExtractor:
         Args:
             output_dir: Output directory
         """
-        if not self.tiles:
+        if len(self.tiles) == 0:
             print("No tiles to save")
             return
 
         output_dir.mkdir(parents=True, exist_ok=True)
 
-        # Set palette
-        pal_data = []
-        for r, g, b in self.palette:
-            pal_data.extend([r, g, b])
-        while len(pal_data) < 768:
-            pal_data.append(0)
-
         for tile_idx, pixels in enumerate(self.tiles):
-            img = Image.new('P', (self.tile_width, self.tile_height), color=0)
-            img.putpalette(pal_data)
-
-            for y in range(self.tile_height):
-                for x in range(self.tile_width):
-                    pixel_idx = y * self.tile_width + x
-                    if pixel_idx < len(pixels):
-                        color_idx = pixels[pixel_idx]
-                        img.putpixel((x, y), color_idx)
-
+            img = indexed_image(pixels, self.palette)
             output_path = output_dir / f"tile_{tile_idx:04d}.png"
             img.save(output_path)
 
@@ -244,6 +196,9 @@ Examples:
   # Extract 16x16 tiles from FQ4.CHR as sprite sheet
   python chr_extractor.py C:/claude/Fq4/GAME/FQ4.CHR --tile-size 16 --output C:/claude/Fq4/output/sprites/FQ4/ --sheet
 
+  # Extract only unique 8x8 tiles (mirrored tiles merged) plus a tile map
+  python chr_extractor.py C:/claude/Fq4/GAME/FQ4.CHR --output C:/claude/Fq4/output/sprites/FQ4/ --dedup-flips
+
   # Extract MAGIC.CHR with custom palette
   python chr_extractor.py C:/claude/Fq4/GAME/MAGIC.CHR --tile-size 8 --palette C:/claude/Fq4/GAME/FQ4.RGB --output C:/claude/Fq4/output/sprites/MAGIC/
         """
@@ -264,6 +219,10 @@ Examples:
                         help='Debug mode: show first tile analysis')
     parser.add_argument('--bright-palette', action='store_true',
                         help='Use bright default palette instead of FQ4.RGB')
+    parser.add_argument('--dedup', action='store_true',
+                        help='Save unique tiles only, plus a tile map (<name>_tilemap.json)')
+    parser.add_argument('--dedup-flips', action='store_true',
+                        help='Like --dedup, also matching horizontally/vertically mirrored tiles')
 
     args = parser.parse_args()
 
@@ -297,16 +256,23 @@ Examples:
     extractor = CHRExtractor(chr_path, palette)
     extractor.extract_tiles(args.tile_size)
 
-    if not extractor.tiles:
+    if len(extractor.tiles) == 0:
         print("Error: No tiles extracted")
         return 1
 
     # Save output
     output_dir = Path(args.output)
 
+    dedup = args.dedup or args.dedup_flips
+    if dedup:
+        result = extractor.dedup_tiles(flips=args.dedup_flips)
+        map_path = output_dir / f"{chr_path.stem}_tilemap.json"
+        result.save_tile_map(map_path, chr_path.name, args.dedup_flips)
+        print(f"Tile map saved to: {map_path}")
+
     if args.sheet:
         # Save as sprite sheet
-        sheet_name = chr_path.stem + "_sheet.png"
+        sheet_name = chr_path.stem + ("_unique_sheet.png" if dedup else "_sheet.png")
         output_path = output_dir / sheet_name
         extractor.save_sprite_sheet(output_path, args.columns)
     else:
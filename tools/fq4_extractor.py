@@ -13,16 +13,319 @@ Date: 2026-01-30
 
 import struct
 import sys
+import io
+import os
+import json
+import hashlib
+from contextlib import redirect_stdout
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import List, Tuple, Optional, Dict
+from typing import List, Tuple, Optional, Dict, Callable
 import argparse
 
 try:
     from PIL import Image
+    import numpy as np
 except ImportError:
-    print("Error: PIL/Pillow is required. Install with: pip install Pillow")
+    print("Error: PIL/Pillow and numpy are required.")
+    print("Install with: pip install Pillow numpy")
     sys.exit(1)
 
+sys.path.insert(0, str(Path(__file__).parent))
+from bank_format import BankReader, ARCHIVE_SUFFIX
+
+
+# Planar-to-chunky engines for RGBEDecoder.combine_planes
+# - numpy:  vectorized unpackbits + shift-and-or (default)
+# - python: original per-bit loop, kept as byte-exact reference
+PLANAR_ENGINES = ('numpy', 'python')
+
+# Tile dedup flip flags (bit field stored per original tile in the tile map)
+FLIP_H = 1
+FLIP_V = 2
+
+# Byte -> same byte with bit order reversed (horizontal flip of 8 pixels)
+_REVERSED_BITS = np.packbits(np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1)[:, ::-1], axis=1).ravel()
+
+
+def decode_planar_tiles(data: bytes, tile_width: int = 8, tile_height: int = 8) -> np.ndarray:
+    """
+    Decode every 4bpp planar tile in a CHR buffer in one vectorized pass
+
+    Tile layout (shared by CHRDecoder and CHRExtractor):
+    - 4 consecutive bitplanes per tile, plane 0 = bit 0 (LSB)
+    - Each plane is tile_height rows of tile_width / 8 bytes, MSB = leftmost pixel
+    - Trailing bytes that do not fill a whole tile are ignored
+
+    Args:
+        data: Raw CHR data (bytes, bytearray or memoryview)
+        tile_width: Tile width in pixels (multiple of 8)
+        tile_height: Tile height in pixels
+
+    Returns:
+        uint8 array of shape (n_tiles, tile_height, tile_width) with values 0-15
+    """
+    bytes_per_row = tile_width // 8
+    bytes_per_tile = 4 * tile_height * bytes_per_row
+    n_tiles = len(data) // bytes_per_tile
+
+    raw = np.frombuffer(data, dtype=np.uint8, count=n_tiles * bytes_per_tile)
+    planes = raw.reshape(n_tiles, 4, tile_height, bytes_per_row)
+
+    # (n_tiles, 4, tile_height, tile_width) bits, MSB first
+    bits = np.unpackbits(planes, axis=3)
+
+    return (bits[:, 0]
+            | (bits[:, 1] << 1)
+            | (bits[:, 2] << 2)
+            | (bits[:, 3] << 3))
+
+
+@dataclass
+class TileDedup:
+    """Unique tiles of a CHR buffer and the map back to original tile numbers"""
+    tiles: np.ndarray    # (n_unique, h, w) decoded unique tiles
+    index: np.ndarray    # (n_tiles,) unique id of each original tile
+    flips: np.ndarray    # (n_tiles,) FLIP_H/FLIP_V to apply to the unique tile
+    first: np.ndarray    # (n_unique,) original tile number each unique tile came from
+
+    def restore(self) -> np.ndarray:
+        """Rebuild the original (n_tiles, h, w) tile array"""
+        tiles = self.tiles[self.index]
+        h_flip = (self.flips & FLIP_H) != 0
+        v_flip = (self.flips & FLIP_V) != 0
+        tiles[h_flip] = tiles[h_flip][:, :, ::-1]
+        tiles[v_flip] = tiles[v_flip][:, ::-1, :]
+        return tiles
+
+    def tile_map(self, source: str, use_flips: bool) -> Dict:
+        """JSON-ready tile map (original tile number -> unique id [, flip flags])"""
+        tile_map = {
+            'source': source,
+            'tile_width': int(self.tiles.shape[2]),
+            'tile_height': int(self.tiles.shape[1]),
+            'tile_count': len(self.index),
+            'unique_count': len(self.tiles),
+            'flips': use_flips,
+            'index': self.index.tolist(),
+        }
+        if use_flips:
+            tile_map['flip_flags'] = {'h': FLIP_H, 'v': FLIP_V}
+            tile_map['flip'] = self.flips.tolist()
+        return tile_map
+
+    def save_tile_map(self, output_path: Path, source: str, use_flips: bool):
+        """Write tile_map() as JSON"""
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump(self.tile_map(source, use_flips), f)
+
+
+def dedup_tiles(data: bytes, tile_width: int = 8, tile_height: int = 8,
+                flips: bool = False) -> TileDedup:
+    """
+    Find unique tiles by hashing their raw planar bytes
+
+    Identical planar bytes mean identical pixels, so tiles are compared
+    before decoding. With flips, each tile is also keyed under its H, V
+    and HV mirrors (bit-reversed bytes / reversed rows) and matched on
+    the smallest key; the flip flags then say how to mirror the unique
+    tile to get the original back. Unique ids follow first occurrence.
+
+    Args:
+        data: Raw CHR data
+        tile_width: Tile width in pixels (multiple of 8)
+        tile_height: Tile height in pixels
+        flips: Also match horizontally/vertically mirrored tiles
+
+    Returns:
+        TileDedup
+    """
+    bytes_per_row = tile_width // 8
+    bytes_per_tile = 4 * tile_height * bytes_per_row
+    n_tiles = len(data) // bytes_per_tile
+
+    raw = np.frombuffer(data, dtype=np.uint8, count=n_tiles * bytes_per_tile)
+    planes = raw.reshape(n_tiles, 4, tile_height, bytes_per_row)
+
+    # Variant k is the tile mirrored by flip flags k
+    variants = [planes]
+    if flips:
+        h_flip = _REVERSED_BITS[planes[..., ::-1]]
+        variants += [h_flip, planes[:, :, ::-1], h_flip[:, :, ::-1]]
+
+    # np.unique ranks byte strings in sorted order, so the smallest rank
+    # over a tile's variants identifies its canonical orientation
+    keys = np.ascontiguousarray(np.stack(variants, axis=1)).reshape(-1, bytes_per_tile)
+    _, key_ids = np.unique(keys.view(np.dtype((np.void, bytes_per_tile))).ravel(),
+                           return_inverse=True)
+    key_ids = key_ids.reshape(n_tiles, len(variants))
+    canonical_flip = key_ids.argmin(axis=1)
+    canonical = key_ids[np.arange(n_tiles), canonical_flip]
+
+    # Renumber unique tiles in order of first occurrence
+    _, first, inverse = np.unique(canonical, return_index=True, return_inverse=True)
+    order = np.argsort(first)
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    index = rank[inverse.ravel()]
+    first = first[order]
+
+    # tile = mirror(canonical, f_tile) and canonical = mirror(first tile, f_first)
+    flip = (canonical_flip ^ canonical_flip[first][index]).astype(np.uint8)
+
+    unique = decode_planar_tiles(planes[first].tobytes(), tile_width, tile_height)
+    return TileDedup(unique, index, flip, first)
+
+
+def assemble_tile_sheet(tiles: np.ndarray, columns: int = 16) -> np.ndarray:
+    """
+    Lay out decoded tiles into a single 2D index buffer
+
+    Tiles are placed row-major, `columns` per row. The last row is padded
+    with empty (index 0) tiles.
+
+    Args:
+        tiles: uint8 array of shape (n_tiles, tile_height, tile_width)
+        columns: Number of tiles per sheet row
+
+    Returns:
+        uint8 array of shape (rows * tile_height, columns * tile_width)
+    """
+    n_tiles, tile_height, tile_width = tiles.shape
+    rows = (n_tiles + columns - 1) // columns
+
+    padded = np.zeros((rows * columns, tile_height, tile_width), dtype=np.uint8)
+    padded[:n_tiles] = tiles
+
+    # (rows, columns, h, w) -> (rows, h, columns, w) -> 2D sheet
+    sheet = padded.reshape(rows, columns, tile_height, tile_width).transpose(0, 2, 1, 3)
+    return sheet.reshape(rows * tile_height, columns * tile_width)
+
+
+def build_palette_data(palette: List[Tuple[int, int, int]]) -> List[int]:
+    """Flatten (R, G, B) tuples into a 768-entry list for Image.putpalette"""
+    pal_data = []
+    for r, g, b in palette:
+        pal_data.extend([r, g, b])
+    # Pad to 256 colors
+    while len(pal_data) < 768:
+        pal_data.append(0)
+    return pal_data
+
+
+def indexed_image(pixels: np.ndarray,
+                  palette: Optional[List[Tuple[int, int, int]]] = None) -> Image.Image:
+    """
+    Create a 'P' mode image from a 2D index array with one frombuffer call
+
+    Args:
+        pixels: 2D array of palette indices
+        palette: Optional list of (R, G, B) tuples
+
+    Returns:
+        PIL Image in 'P' mode
+    """
+    height, width = pixels.shape
+    data = np.ascontiguousarray(pixels, dtype=np.uint8).tobytes()
+    img = Image.frombuffer('P', (width, height), data, 'raw', 'P', 0, 1)
+    if palette is not None:
+        img.putpalette(build_palette_data(palette))
+    return img
+
+
+class BitReader:
+    """
+    Bit-stream reader for packed variable-width codes
+
+    Bit orders:
+    - lsb: bits are taken from bit 0 upward within each byte, and the first
+      bit read becomes bit 0 of the code (FQ4 Type 9 streams)
+    - msb: bits are taken from bit 7 downward, and the first bit read
+      becomes the highest bit of the code
+
+    The stream is unpacked into a bit array once, so bulk reads of many
+    codes are a single reshape + dot product.
+    """
+
+    BIT_ORDERS = ('lsb', 'msb')
+
+    def __init__(self, data: bytes, bit_order: str = 'lsb'):
+        if bit_order not in self.BIT_ORDERS:
+            raise ValueError(f"Unknown bit order: {bit_order}. Available: {list(self.BIT_ORDERS)}")
+
+        self.data = data
+        self.bit_order = bit_order
+        self.pos = 0  # Current position in bits
+        self._bits: Optional[np.ndarray] = None
+
+    @property
+    def bits(self) -> np.ndarray:
+        """Whole stream as a uint8 array of 0/1 values in read order"""
+        if self._bits is None:
+            raw = np.frombuffer(self.data, dtype=np.uint8)
+            order = 'little' if self.bit_order == 'lsb' else 'big'
+            self._bits = np.unpackbits(raw, bitorder=order)
+        return self._bits
+
+    @property
+    def bits_remaining(self) -> int:
+        return len(self.data) * 8 - self.pos
+
+    def seek(self, bit_pos: int):
+        """Move to an absolute bit position"""
+        self.pos = max(0, min(bit_pos, len(self.data) * 8))
+
+    @staticmethod
+    def _check_width(width: int):
+        if not 1 <= width <= 32:
+            raise ValueError(f"Code width must be 1-32 bits, got {width}")
+
+    def _weights(self, width: int) -> np.ndarray:
+        shifts = np.arange(width, dtype=np.uint32)
+        if self.bit_order == 'msb':
+            shifts = shifts[::-1]
+        return np.left_shift(np.uint32(1), shifts)
+
+    def read(self, width: int) -> Optional[int]:
+        """
+        Read one code of `width` bits
+
+        Args:
+            width: Code width in bits (1-32)
+
+        Returns:
+            Code value, or None if fewer than `width` bits remain
+        """
+        self._check_width(width)
+        if width > self.bits_remaining:
+            return None
+        chunk = self.bits[self.pos:self.pos + width]
+        self.pos += width
+        return int(chunk @ self._weights(width))
+
+    def read_codes(self, width: int, count: Optional[int] = None) -> np.ndarray:
+        """
+        Read many codes of `width` bits at once
+
+        Args:
+            width: Code width in bits (1-32)
+            count: Number of codes to read (None = all complete codes left)
+
+        Returns:
+            uint32 array of codes; an incomplete trailing code is not read
+        """
+        self._check_width(width)
+        if count is not None and count < 0:
+            raise ValueError(f"Code count must not be negative, got {count}")
+        available = self.bits_remaining // width
+        n = available if count is None else min(count, available)
+
+        chunk = self.bits[self.pos:self.pos + n * width].reshape(n, width)
+        self.pos += n * width
+        return (chunk @ self._weights(width)).astype(np.uint32)
+
 
 class FQ4PaletteParser:
     """Parser for FQ4.RGB palette file (88 bytes)"""
@@ -97,13 +400,26 @@ class RGBEDecoder:
         02+:   RLE compressed data
     """
 
-    def __init__(self, base_path: str):
-        """Initialize decoder with base path (e.g., "FQOP_01")"""
+    def __init__(self, base_path: str, engine: str = 'numpy'):
+        """
+        Initialize decoder with base path (e.g., "FQOP_01")
+
+        Args:
+            base_path: Base path of the RGBE plane files (without extension)
+            engine: Planar-to-chunky engine, one of PLANAR_ENGINES
+        """
+        if engine not in PLANAR_ENGINES:
+            raise ValueError(f"Unknown engine: {engine}. Available: {list(PLANAR_ENGINES)}")
+
         self.base_path = Path(base_path)
+        self.engine = engine
         self.width = 320   # Standard VGA width
         self.height = 200  # Standard VGA height
         self.plane_size = self.width * self.height // 8  # 8000 bytes per plane
 
+    # One 128-byte fill per byte value, sliced for each run
+    _RUN_FILLS = [bytes((value,)) * 128 for value in range(256)]
+
     def decompress_type7_rle(self, data: bytes, skip: int = 2) -> bytes:
         """
         Decompress Type 7 RLE format (used by R_ and E_ files)
@@ -111,28 +427,81 @@ class RGBEDecoder:
         Format:
         - control >= 0x80: Repeat next byte (control - 0x7F) times
         - control < 0x80: Copy (control + 1) literal bytes
+
+        Output is written through a memoryview into a preallocated buffer
+        with one slice copy per run or literal block. The buffer has 128
+        bytes of slack so the last block can spill past plane_size without
+        a bounds check; anything past the end of the plane is dropped.
         """
-        result = bytearray()
+        plane_size = self.plane_size
+        fills = self._RUN_FILLS
+        out = memoryview(bytearray(plane_size + 128))
+        src = memoryview(data)
+        size = len(data)
+        pos = 0
         i = skip  # Skip header bytes
 
-        while i < len(data) and len(result) < self.plane_size:
+        while i < size and pos < plane_size:
             control = data[i]
             i += 1
 
             if control >= 0x80:
-                count = control - 0x7F
-                if i < len(data):
-                    value = data[i]
+                if i < size:
+                    count = control - 0x7F
+                    out[pos:pos + count] = fills[data[i]][:count]
                     i += 1
-                    result.extend([value] * count)
+                    pos += count
             else:
-                count = control + 1
-                if i + count <= len(data):
-                    result.extend(data[i:i+count])
-                    i += count
-                else:
+                end = i + control + 1
+                if end > size:
                     break
+                out[pos:pos + control + 1] = src[i:end]
+                pos += control + 1
+                i = end
+
+        return out[:min(pos, plane_size)].tobytes()
+
+    def compress_type7_rle(self, data: bytes, min_run: int = 3) -> bytes:
+        """
+        Compress a raw plane into Type 7 RLE format (inverse of decompress_type7_rle)
+
+        Repeats of at least `min_run` bytes become runs (up to 128 bytes each),
+        everything else is stored as literal blocks of up to 128 bytes.
+
+        Args:
+            data: Raw plane data
+            min_run: Shortest repeat encoded as a run
+
+        Returns:
+            Type 7 file contents, including the 2-byte type header
+        """
+        result = bytearray(struct.pack('<H', 7))
+        size = len(data)
+        literal_start = 0
+        i = 0
+
+        def flush_literals(end: int):
+            for start in range(literal_start, end, 128):
+                block = data[start:min(start + 128, end)]
+                result.append(len(block) - 1)
+                result.extend(block)
+
+        while i < size:
+            value = data[i]
+            run = 1
+            while i + run < size and run < 128 and data[i + run] == value:
+                run += 1
+
+            if run >= min_run:
+                flush_literals(i)
+                result.append(0x7F + run)
+                result.append(value)
+                i += run
+                literal_start = i
+            else:
+                i += run
 
+        flush_literals(size)
         return bytes(result)
 
     def decompress_type9(self, data: bytes) -> bytes:
@@ -172,39 +541,17 @@ class RGBEDecoder:
 
         compressed = data[data_start:]
 
-        # Parse symbol table entries
-        entries = []
-        for i in range(0, min(1024, len(flag_table)), 2):
-            if i + 1 < len(flag_table):
-                word = struct.unpack('<H', flag_table[i:i + 2])[0]
-                entries.append(word)
+        # Parse symbol table entries (16-bit LE words, first 1024 bytes)
+        entry_count = min(1024, len(flag_table)) // 2
+        entries = np.frombuffer(flag_table, dtype='<u2', count=entry_count).tolist()
 
-        # 9-bit code reader
-        result = bytearray()
-        bit_pos = 0
-        byte_idx = 0
-
-        def read_9bits():
-            nonlocal bit_pos, byte_idx
-            if byte_idx >= len(compressed):
-                return None
-            val = 0
-            for i in range(9):
-                if byte_idx >= len(compressed):
-                    return None
-                byte = compressed[byte_idx]
-                bit = (byte >> bit_pos) & 1
-                val |= (bit << i)
-                bit_pos += 1
-                if bit_pos >= 8:
-                    bit_pos = 0
-                    byte_idx += 1
-            return val
+        # Read every complete 9-bit code up front
+        codes = BitReader(compressed, bit_order='lsb').read_codes(9).tolist()
 
         # Decode using symbol table
-        while len(result) < self.plane_size:
-            code = read_9bits()
-            if code is None:
+        result = bytearray()
+        for code in codes:
+            if len(result) >= self.plane_size:
                 break
 
             # Skip Entry[0] (metadata)
@@ -231,10 +578,8 @@ class RGBEDecoder:
                 else:
                     # RLE: repeat previous byte (lo + 3) times
                     repeat_count = lo + 3
-                    if len(result) > 0:
-                        result.extend([result[-1]] * repeat_count)
-                    else:
-                        result.extend([0] * repeat_count)
+                    previous = result[-1] if result else 0
+                    result.extend(bytes((previous,)) * repeat_count)
             else:
                 # Unknown entry type - output lo byte as fallback
                 result.append(lo)
@@ -274,8 +619,8 @@ class RGBEDecoder:
 
         return decompressed
 
-    def load_planes(self) -> Optional[bytes]:
-        """Load and decompress all 4 RGBE plane files"""
+    def load_plane_data(self) -> Optional[List[bytes]]:
+        """Load and decompress all 4 RGBE plane files (BGRE order)"""
         # BGRE order for proper 4-bit pixel assembly
         plane_extensions = ['B_', 'G_', 'R_', 'E_']
         plane_files = [
@@ -291,12 +636,56 @@ class RGBEDecoder:
                 return None
             planes.append(plane)
 
+        return planes
+
+    def load_planes(self) -> Optional[np.ndarray]:
+        """Load all 4 RGBE plane files and combine them into an indexed image"""
+        planes = self.load_plane_data()
+        if planes is None:
+            return None
+
         # Combine planes to create indexed image
         return self.combine_planes(planes)
 
-    def combine_planes(self, planes: List[bytes]) -> bytes:
+    def combine_planes(self, planes: List[bytes]) -> np.ndarray:
         """
-        Combine 4 bitplanes into indexed color image
+        Combine 4 bitplanes using the selected engine
+
+        Returns:
+            uint8 array of shape (height, width) with pixel values (0-15)
+        """
+        if self.engine == 'python':
+            pixels = np.frombuffer(self.combine_planes_reference(planes), dtype=np.uint8)
+            return pixels.reshape(self.height, self.width)
+        return self.combine_planes_numpy(planes)
+
+    def combine_planes_numpy(self, planes: List[bytes]) -> np.ndarray:
+        """
+        Vectorized planar-to-chunky conversion
+
+        All four planes are stacked into a (4, plane_size) array, expanded
+        MSB-first with np.unpackbits and merged with one shift-and-or pass.
+        Bytes past the end of the B plane stay 0, matching the reference loop.
+
+        Returns:
+            uint8 array of shape (height, width) with pixel values (0-15)
+        """
+        stacked = np.zeros((4, self.plane_size), dtype=np.uint8)
+        limit = min(len(planes[0]), self.plane_size)
+        for idx, plane in enumerate(planes):
+            count = min(len(plane), limit)
+            stacked[idx, :count] = np.frombuffer(plane, dtype=np.uint8, count=count)
+
+        # (4, width * height) bits, MSB first within each byte
+        bits = np.unpackbits(stacked, axis=1)
+
+        # B=bit3, G=bit2, R=bit1, E=bit0
+        pixels = (bits[0] << 3) | (bits[1] << 2) | (bits[2] << 1) | bits[3]
+        return pixels.reshape(self.height, self.width)
+
+    def combine_planes_reference(self, planes: List[bytes]) -> bytes:
+        """
+        Combine 4 bitplanes into indexed color image (reference implementation)
 
         VGA planar format: each plane byte contains 8 horizontal pixels
         Planes are combined bit-by-bit:
@@ -360,27 +749,23 @@ class RGBEDecoder:
         if data is None:
             return None
 
-        # Create indexed color image
-        img = Image.new('P', (self.width, self.height))
-
-        # Set palette
-        pal_data = []
-        for r, g, b in palette:
-            pal_data.extend([r, g, b])
-        # Pad to 256 colors
-        while len(pal_data) < 768:
-            pal_data.append(0)
-        img.putpalette(pal_data)
+        # Create indexed color image directly from the pixel array
+        return indexed_image(data, palette)
 
-        # Put pixel data
-        # Truncate or pad data to fit image
-        pixel_data = bytearray(self.width * self.height)
-        copy_len = min(len(data), len(pixel_data))
-        pixel_data[:copy_len] = data[:copy_len]
+    def verify_engines(self) -> bool:
+        """
+        Decode with both engines and check that the output matches byte for byte
 
-        img.putdata(pixel_data)
+        Returns:
+            True if numpy and reference output are identical
+        """
+        planes = self.load_plane_data()
+        if planes is None:
+            return False
 
-        return img
+        fast = self.combine_planes_numpy(planes).tobytes()
+        reference = self.combine_planes_reference(planes)
+        return fast == reference
 
 
 class CHRDecoder:
@@ -424,155 +809,103 @@ class CHRDecoder:
             List of pixel values (0-15)
         """
         pixels_per_tile = self.tile_width * self.tile_height
-        bytes_per_plane = pixels_per_tile // 8
-        bytes_per_tile = bytes_per_plane * 4
+        bytes_per_tile = pixels_per_tile // 8 * 4
 
         if offset + bytes_per_tile > len(self.data):
             return [0] * pixels_per_tile
 
-        # Extract 4 bitplanes
-        planes = []
-        for plane_idx in range(4):
-            plane_offset = offset + (plane_idx * bytes_per_plane)
-            plane_data = self.data[plane_offset:plane_offset + bytes_per_plane]
-            planes.append(plane_data)
-
-        # Combine bitplanes to pixels
-        pixels = []
-        for pixel_idx in range(pixels_per_tile):
-            byte_idx = pixel_idx // 8
-            bit_idx = 7 - (pixel_idx % 8)
+        tile = decode_planar_tiles(self.data[offset:offset + bytes_per_tile],
+                                   self.tile_width, self.tile_height)
+        return tile.reshape(-1).tolist()
 
-            pixel_value = 0
-            for plane_num, plane in enumerate(planes):
-                if byte_idx < len(plane):
-                    byte_val = plane[byte_idx]
-                    bit = (byte_val >> bit_idx) & 1
-                    pixel_value |= (bit << plane_num)
+    def decode_tiles(self) -> np.ndarray:
+        """
+        Decode all tiles in the CHR file at once
 
-            pixels.append(pixel_value)
+        Returns:
+            uint8 array of shape (n_tiles, tile_height, tile_width)
+        """
+        if self.data is None:
+            self.load()
 
-        return pixels
+        return decode_planar_tiles(self.data, self.tile_width, self.tile_height)
 
-    def extract_all_tiles(self) -> List[Image.Image]:
+    def dedup_tiles(self, flips: bool = False) -> TileDedup:
         """
-        Extract all tiles from CHR file
+        Find the unique tiles of the CHR file without decoding duplicates
+
+        Args:
+            flips: Also match horizontally/vertically mirrored tiles
 
         Returns:
-            List of PIL Images (one per tile)
+            TileDedup with unique tiles and the original -> unique index map
         """
         if self.data is None:
             self.load()
 
-        pixels_per_tile = self.tile_width * self.tile_height
-        bytes_per_plane = pixels_per_tile // 8
-        bytes_per_tile = bytes_per_plane * 4
-
-        num_tiles = len(self.data) // bytes_per_tile
-        print(f"Extracting {num_tiles} tiles from {self.filepath.name}")
+        return dedup_tiles(self.data, self.tile_width, self.tile_height, flips)
 
-        tiles = []
-        for tile_idx in range(num_tiles):
-            offset = tile_idx * bytes_per_tile
-            pixels = self.decode_tile(offset)
+    def extract_all_tiles(self) -> List[Image.Image]:
+        """
+        Extract all tiles from CHR file
 
-            # Create indexed image
-            tile_img = Image.new('P', (self.tile_width, self.tile_height))
-            tile_img.putdata(pixels)
-            tiles.append(tile_img)
+        Returns:
+            List of PIL Images (one per tile)
+        """
+        tile_pixels = self.decode_tiles()
+        print(f"Extracting {len(tile_pixels)} tiles from {self.filepath.name}")
 
-        return tiles
+        return [indexed_image(pixels) for pixels in tile_pixels]
 
-    def create_sprite_sheet(self, tiles: List[Image.Image], cols: int = 16) -> Image.Image:
+    def create_sprite_sheet(self, tiles, cols: int = 16) -> Image.Image:
         """
         Arrange tiles in a sprite sheet
 
         Args:
-            tiles: List of tile images
+            tiles: Decoded tile array (n_tiles, h, w) or list of tile images
             cols: Number of columns in sprite sheet
 
         Returns:
             Combined sprite sheet image
         """
-        if not tiles:
+        if len(tiles) == 0:
             return Image.new('P', (1, 1))
 
-        rows = (len(tiles) + cols - 1) // cols
-        sheet_width = cols * self.tile_width
-        sheet_height = rows * self.tile_height
+        if not isinstance(tiles, np.ndarray):
+            tiles = np.stack([np.asarray(tile, dtype=np.uint8) for tile in tiles])
 
-        sheet = Image.new('P', (sheet_width, sheet_height))
+        return indexed_image(assemble_tile_sheet(tiles, cols))
 
-        for idx, tile in enumerate(tiles):
-            col = idx % cols
-            row = idx // cols
-            x = col * self.tile_width
-            y = row * self.tile_height
-            sheet.paste(tile, (x, y))
 
-        return sheet
-
-
-class BankDecoder:
-    """Decoder for Bank files (offset table + compressed data)"""
+class BankDecoder(BankReader):
+    """
+    Decoder for Bank files (offset table + compressed data)
 
-    def __init__(self, filepath: Path):
-        self.filepath = filepath
-        self.data = None
-        self.offsets = []
+    The file is memory-mapped and the offset table parsed on first use;
+    decoder[i] returns entry i as a zero-copy memoryview.
+    """
 
-    def load(self) -> bytes:
-        """Load Bank file"""
-        with open(self.filepath, 'rb') as f:
-            self.data = f.read()
-        return self.data
+    def load(self) -> memoryview:
+        """Map Bank file"""
+        return self.open()
 
     def parse_offset_table(self) -> List[int]:
         """
-        Parse offset table at beginning of Bank file
+        Parse the entry table at the beginning of the Bank file
 
         Bank format analysis:
         - CHRBANK first bytes: 37 0D C1 0C 09 0B 29 0C...
-        - These are 16-bit little-endian offsets
-        - 0x0D37 = 3383, 0x0CC1 = 3265, 0x0B09 = 2825...
-        - Offsets are NOT in ascending order (they jump around)
-        - Need different strategy: read until offset points into offset table itself
+        - These are 16-bit little-endian entry sizes (0x0D37 = 3383, ...),
+          not offsets: they sum to the file size
+        - Other banks may carry an ascending offset table instead
+        - Detection is shared with bank_analyzer (bank_format.detect_bank_layout)
 
         Returns:
             List of byte offsets
         """
-        if self.data is None:
-            self.load()
+        return self.offsets
 
-        offsets = []
-        idx = 0
-
-        # Strategy: Read offsets until we hit one that points back to offset table
-        # The first data entry can't start before the offset table ends
-        while idx + 2 <= len(self.data):
-            offset = struct.unpack('<H', self.data[idx:idx+2])[0]
-
-            # If offset points into current offset table area, we've gone too far
-            if offset <= idx + 2:
-                break
-
-            # If offset is way beyond file size, probably not valid
-            if offset >= len(self.data):
-                # But don't break immediately - might be padding
-                if len(offsets) > 0:
-                    break
-
-            offsets.append(offset)
-            idx += 2
-
-            # Safety limit
-            if len(offsets) > 10000:
-                break
-
-        self.offsets = offsets
-        return offsets
-
-    def extract_entry(self, entry_idx: int) -> Optional[bytes]:
+    def extract_entry(self, entry_idx: int) -> Optional[memoryview]:
         """
         Extract data for specific entry
 
@@ -580,36 +913,29 @@ class BankDecoder:
             entry_idx: Index in offset table
 
         Returns:
-            Raw data bytes or None
+            Zero-copy view of the entry data or None
         """
-        if entry_idx >= len(self.offsets):
+        if entry_idx >= len(self):
             return None
+        return self[entry_idx]
 
-        start_offset = self.offsets[entry_idx]
-
-        # Determine end offset
-        if entry_idx + 1 < len(self.offsets):
-            end_offset = self.offsets[entry_idx + 1]
-        else:
-            end_offset = len(self.data)
-
-        return self.data[start_offset:end_offset]
-
-    def extract_all_entries(self, output_dir: Path):
+    def extract_all_entries(self, output_dir: Path, entries: Optional[List[int]] = None):
         """
-        Extract all entries to files
+        Extract entries to files
 
         Args:
             output_dir: Directory to save entries
+            entries: Entry indices to extract (default: all)
         """
-        if not self.offsets:
-            self.parse_offset_table()
-
         output_dir.mkdir(parents=True, exist_ok=True)
 
-        print(f"Extracting {len(self.offsets)} entries from {self.filepath.name}")
+        if entries is None:
+            entries = range(len(self))
+            print(f"Extracting {len(self)} entries from {self.filepath.name}")
+        else:
+            print(f"Extracting {len(entries)} of {len(self)} entries from {self.filepath.name}")
 
-        for idx in range(len(self.offsets)):
+        for idx in entries:
             data = self.extract_entry(idx)
             if data:
                 output_file = output_dir / f"entry_{idx:04d}.bin"
@@ -725,6 +1051,264 @@ class TextDecoder:
                     print(f"  String {idx:4d}: [binary data]")
 
 
+# Bump a stage's version whenever its decoder output changes for the same
+# input, so cached outputs from older versions are regenerated
+DECODER_VERSIONS = {
+    'rgbe': 1,
+    'chr': 1,
+    'bank': 2,
+}
+
+
+class ExtractionCache:
+    """
+    Content-addressed manifest of extracted assets
+
+    Stored as .fq4_manifest.json in the output directory. Each asset is
+    keyed by the SHA-256 of its input files, the stage's decoder version
+    and the palette hash. An asset whose key and output files are unchanged
+    is skipped on the next run.
+    """
+
+    MANIFEST_NAME = '.fq4_manifest.json'
+    MANIFEST_VERSION = 1
+
+    def __init__(self, output_dir: Path, force: bool = False):
+        self.output_dir = output_dir
+        self.path = output_dir / self.MANIFEST_NAME
+        self.force = force
+        self.entries: Dict[str, dict] = {}
+        self.hits = 0
+        self.rebuilt = 0
+        self._file_hashes: Dict[Path, str] = {}
+        self.load()
+
+    def load(self):
+        """Load manifest from disk (missing or unreadable manifest = empty)"""
+        if not self.path.exists():
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return
+        if manifest.get('version') == self.MANIFEST_VERSION:
+            self.entries = manifest.get('assets', {})
+
+    def save(self):
+        """Write manifest atomically"""
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': self.MANIFEST_VERSION, 'assets': self.entries},
+                      f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def file_hash(self, filepath: Path) -> str:
+        """SHA-256 of a file's contents (memoized per run)"""
+        if filepath not in self._file_hashes:
+            digest = hashlib.sha256()
+            with open(filepath, 'rb') as f:
+                for chunk in iter(lambda: f.read(1 << 20), b''):
+                    digest.update(chunk)
+            self._file_hashes[filepath] = digest.hexdigest()
+        return self._file_hashes[filepath]
+
+    @staticmethod
+    def palette_hash(palette: Optional[List[Tuple[int, int, int]]]) -> str:
+        """SHA-256 of the parsed palette ('' for palette-independent assets)"""
+        if palette is None:
+            return ''
+        return hashlib.sha256(bytes(build_palette_data(palette))).hexdigest()
+
+    def asset_key(self, stage: str, inputs: List[Path],
+                  palette: Optional[List[Tuple[int, int, int]]] = None,
+                  options: str = '') -> str:
+        """Compute the cache key for one asset"""
+        digest = hashlib.sha256()
+        digest.update(f"{stage}:{DECODER_VERSIONS[stage]}\n".encode())
+        for filepath in inputs:
+            digest.update(f"{filepath.name}:{self.file_hash(filepath)}\n".encode())
+        digest.update(self.palette_hash(palette).encode())
+        if options:
+            digest.update(f"\noptions:{options}".encode())
+        return digest.hexdigest()
+
+    def is_fresh(self, name: str, key: str) -> bool:
+        """True if the asset was built with this key and all outputs still exist"""
+        if self.force:
+            return False
+        entry = self.entries.get(name)
+        if entry is None or entry.get('key') != key:
+            return False
+        return all((self.output_dir / out).exists() for out in entry.get('outputs', []))
+
+    def record(self, name: str, key: str, outputs: List[Path], count: int = 0):
+        """Remember the outputs produced for an asset"""
+        self.entries[name] = {
+            'key': key,
+            'count': count,
+            'outputs': sorted(Path(os.path.relpath(out, self.output_dir)).as_posix()
+                              for out in outputs),
+        }
+
+
+# RGBE image sets shipped with the game
+RGBE_SETS = [
+    "FQOP_01", "FQOP_02", "FQOP_03", "FQOP_04", "FQOP_05",
+    "FQOP_06", "FQOP_07", "FQOP_08", "FQOP_09", "FQOP_10",
+    "FQ4G16", "FQ4GLOGO",
+    "SUEMI_A1", "SUEMI_A2", "SUEMI_A3"
+]
+
+
+@dataclass
+class ExtractionUnit:
+    """One independent piece of extract-all work (RGBE set, CHR file or bank)"""
+    stage: str
+    name: str
+    func: Callable
+    args: tuple = ()
+    inputs: List[Path] = field(default_factory=list)
+    palette: Optional[List[Tuple[int, int, int]]] = None
+    options: str = ''  # output options that change the produced files
+
+    @property
+    def asset_name(self) -> str:
+        """Manifest key, unique across stages"""
+        return f"{self.stage}/{self.name}"
+
+
+@dataclass
+class UnitResult:
+    """Outcome of an ExtractionUnit, including its captured console output"""
+    stage: str
+    name: str
+    ok: bool
+    summary: str = ''
+    log: str = ''
+    count: int = 0
+    outputs: List[str] = field(default_factory=list)
+    cached: bool = False
+
+
+def extract_rgbe_unit(game_dir: Path, base_name: str, output_dir: Path,
+                      palette: List[Tuple[int, int, int]],
+                      engine: str = 'numpy') -> Tuple[str, int, List[str]]:
+    """Decode one RGBE image set to {output_dir}/{base_name}.png"""
+    decoder = RGBEDecoder(str(game_dir / base_name), engine=engine)
+    img = decoder.decode_to_image(palette)
+    if img is None:
+        raise ValueError("Failed to decode")
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    output_path = output_dir / f"{base_name}.png"
+    img.save(output_path)
+    return f"{base_name}.png", 1, [str(output_path)]
+
+
+def extract_chr_unit(chr_file: Path, output_dir: Path,
+                     palette: List[Tuple[int, int, int]]) -> Tuple[str, int, List[str]]:
+    """Decode one CHR file to {output_dir}/{stem}/{stem}_sheet.png"""
+    decoder = CHRDecoder(chr_file, tile_width=8, tile_height=8)
+    tiles = decoder.decode_tiles()
+    print(f"Extracting {len(tiles)} tiles from {chr_file.name}")
+    if len(tiles) == 0:
+        return f"{chr_file.name}: 0 tiles", 0, []
+
+    chr_dir = output_dir / chr_file.stem
+    chr_dir.mkdir(parents=True, exist_ok=True)
+
+    sprite_sheet = decoder.create_sprite_sheet(tiles, cols=16)
+    sprite_sheet.putpalette(build_palette_data(palette))
+    sheet_path = chr_dir / f"{chr_file.stem}_sheet.png"
+    sprite_sheet.save(sheet_path)
+    return f"{chr_file.name}: {len(tiles)} tiles", len(tiles), [str(sheet_path)]
+
+
+def extract_bank_unit(bank_file: Path, output_dir: Path,
+                      pack: bool = False) -> Tuple[str, int, List[str]]:
+    """
+    Split one bank file into {output_dir}/{stem}/entry_NNNN.bin, or with
+    pack=True into a single {output_dir}/{stem}.fq4b archive plus index
+    """
+    with BankDecoder(bank_file) as decoder:
+        offsets = decoder.offsets
+        if pack:
+            archive_path, index_path = decoder.write_archive(output_dir / f"{bank_file.stem}{ARCHIVE_SUFFIX}")
+            print(f"  Packed {len(offsets)} entries -> {archive_path.name}")
+            outputs = [str(archive_path), str(index_path)]
+        else:
+            bank_dir = output_dir / bank_file.stem
+            decoder.extract_all_entries(bank_dir)
+            outputs = [str(path) for path in sorted(bank_dir.glob('entry_*.bin'))]
+    return f"{bank_file.name}: {len(offsets)} entries", len(offsets), outputs
+
+
+def run_unit(unit: ExtractionUnit) -> UnitResult:
+    """
+    Run a single unit with its console output captured
+
+    Runs in a worker process when --jobs > 1, so errors are returned
+    in the result instead of raised.
+    """
+    buffer = io.StringIO()
+    try:
+        with redirect_stdout(buffer):
+            summary, count, outputs = unit.func(*unit.args)
+        return UnitResult(unit.stage, unit.name, True, summary, buffer.getvalue(), count, outputs)
+    except Exception as e:
+        return UnitResult(unit.stage, unit.name, False, f"{unit.name}: Error - {e}",
+                          buffer.getvalue())
+
+
+def run_units(units: List[ExtractionUnit], jobs: int = 1,
+              cache: Optional[ExtractionCache] = None):
+    """
+    Run extraction units serially or in a process pool
+
+    Yields results in unit order regardless of completion order, so console
+    output stays deterministic. With a cache, units whose key and outputs
+    are unchanged are reported as cached without running.
+
+    Args:
+        units: Work units to run
+        jobs: Number of worker processes (1 = run in this process)
+        cache: Optional ExtractionCache to skip fresh units and record new outputs
+    """
+    keys: Dict[int, str] = {}
+    pending = set(range(len(units)))
+    if cache is not None:
+        for idx, unit in enumerate(units):
+            keys[idx] = cache.asset_key(unit.stage, unit.inputs, unit.palette, unit.options)
+            if cache.is_fresh(unit.asset_name, keys[idx]):
+                pending.discard(idx)
+
+    def finish(idx: int, result: UnitResult) -> UnitResult:
+        if cache is not None and result.ok:
+            cache.record(units[idx].asset_name, keys[idx],
+                         [Path(out) for out in result.outputs], result.count)
+            cache.rebuilt += 1
+        return result
+
+    def cached(idx: int) -> UnitResult:
+        unit = units[idx]
+        entry = cache.entries[unit.asset_name]
+        cache.hits += 1
+        return UnitResult(unit.stage, unit.name, True, f"{unit.name}: cached",
+                          count=entry.get('count', 0), cached=True)
+
+    if jobs <= 1 or len(pending) <= 1:
+        for idx, unit in enumerate(units):
+            yield finish(idx, run_unit(unit)) if idx in pending else cached(idx)
+        return
+
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = {idx: pool.submit(run_unit, units[idx]) for idx in sorted(pending)}
+        for idx in range(len(units)):
+            yield finish(idx, futures[idx].result()) if idx in futures else cached(idx)
+
+
 def cmd_palette(args):
     """Handle 'palette' subcommand"""
     palette_path = Path(args.palette_file)
@@ -777,7 +1361,15 @@ def cmd_decode(args):
     print(f"Loaded {len(palette)} colors from palette")
 
     # Decode RGBE
-    decoder = RGBEDecoder(base_name)
+    decoder = RGBEDecoder(base_name, engine=args.engine)
+
+    if args.verify_engine:
+        if decoder.verify_engines():
+            print("Engine check: numpy output matches reference byte for byte")
+        else:
+            print("Error: numpy engine output differs from reference")
+            return 1
+
     img = decoder.decode_to_image(palette)
 
     if img is None:
@@ -798,6 +1390,36 @@ def cmd_decode(args):
     return 0
 
 
+def cmd_pack_plane(args):
+    """Handle 'pack-plane' subcommand - RLE-encode a raw plane as Type 7"""
+    plane_path = Path(args.plane_file)
+    if not plane_path.exists():
+        print(f"Error: Plane file not found: {plane_path}")
+        return 1
+
+    with open(plane_path, 'rb') as f:
+        raw = f.read()
+
+    decoder = RGBEDecoder(str(plane_path.with_suffix('')))
+    if len(raw) != decoder.plane_size:
+        print(f"Warning: {plane_path.name} is {len(raw)} bytes (expected: {decoder.plane_size})")
+
+    packed = decoder.compress_type7_rle(raw)
+
+    # Round-trip check against the decoder
+    if decoder.decompress_type7_rle(packed, skip=2) != raw[:decoder.plane_size]:
+        print("Error: Round-trip check failed")
+        return 1
+
+    output_path = Path(args.output_file)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, 'wb') as f:
+        f.write(packed)
+
+    print(f"Packed {len(raw)} bytes -> {len(packed)} bytes (Type 7): {output_path}")
+    return 0
+
+
 def cmd_decode_all(args):
     """Handle 'decode-all' subcommand - decode all RGBE images"""
     game_dir = Path(args.game_dir) if args.game_dir else Path("C:/claude/Fq4/GAME")
@@ -815,16 +1437,11 @@ def cmd_decode_all(args):
     palette = parser.parse()
     print(f"Loaded {len(palette)} colors from palette\n")
 
-    # List of RGBE image sets to extract
-    rgbe_sets = [
-        "FQOP_01", "FQOP_02", "FQOP_03", "FQOP_04", "FQOP_05",
-        "FQOP_06", "FQOP_07", "FQOP_08", "FQOP_09", "FQOP_10",
-        "FQ4G16", "FQ4GLOGO",
-        "SUEMI_A1", "SUEMI_A2", "SUEMI_A3"
-    ]
+    cache = ExtractionCache(output_dir, force=args.force)
 
+    # Extract every known RGBE image set
     success_count = 0
-    for base_name in rgbe_sets:
+    for base_name in RGBE_SETS:
         base_path = game_dir / base_name
         print(f"Processing {base_name}...")
 
@@ -834,14 +1451,24 @@ def cmd_decode_all(args):
             print(f"  Skipped: Missing plane files\n")
             continue
 
+        asset_name = f"rgbe/{base_name}"
+        key = cache.asset_key('rgbe', [game_dir / pf for pf in plane_files], palette)
+        output_path = output_dir / f"{base_name}.png"
+        if cache.is_fresh(asset_name, key):
+            print(f"  Cached: {output_path}\n")
+            cache.hits += 1
+            success_count += 1
+            continue
+
         try:
-            decoder = RGBEDecoder(str(base_path))
+            decoder = RGBEDecoder(str(base_path), engine=args.engine)
             img = decoder.decode_to_image(palette)
 
             if img:
-                output_path = output_dir / f"{base_name}.png"
                 img.save(output_path)
                 print(f"  Saved: {output_path} ({img.width}x{img.height})\n")
+                cache.record(asset_name, key, [output_path], 1)
+                cache.rebuilt += 1
                 success_count += 1
             else:
                 print(f"  Failed to decode\n")
@@ -849,7 +1476,10 @@ def cmd_decode_all(args):
         except Exception as e:
             print(f"  Error: {e}\n")
 
-    print(f"Successfully extracted {success_count}/{len(rgbe_sets)} images")
+    cache.save()
+
+    print(f"Successfully extracted {success_count}/{len(RGBE_SETS)} images")
+    print(f"Cache: {cache.hits} hits, {cache.rebuilt} rebuilt")
     return 0
 
 
@@ -874,9 +1504,10 @@ def cmd_chr(args):
 
     # Decode CHR file
     decoder = CHRDecoder(chr_file, tile_width=8, tile_height=8)
-    tiles = decoder.extract_all_tiles()
+    tiles = decoder.decode_tiles()
+    print(f"Extracting {len(tiles)} tiles from {chr_file.name}")
 
-    if not tiles:
+    if len(tiles) == 0:
         print("No tiles extracted")
         return 1
 
@@ -884,11 +1515,7 @@ def cmd_chr(args):
     sprite_sheet = decoder.create_sprite_sheet(tiles, cols=16)
 
     # Apply palette
-    pal_data = []
-    for r, g, b in palette:
-        pal_data.extend([r, g, b])
-    while len(pal_data) < 768:
-        pal_data.append(0)
+    pal_data = build_palette_data(palette)
     sprite_sheet.putpalette(pal_data)
 
     # Save sprite sheet
@@ -898,14 +1525,28 @@ def cmd_chr(args):
     print(f"Total tiles: {len(tiles)}")
     print(f"Sheet size: {sprite_sheet.width}x{sprite_sheet.height}")
 
-    # Optionally save individual tiles
+    # Optionally reduce to unique tiles (+ index map back to tile numbers)
+    use_flips = args.dedup_flips
+    dedup = args.dedup or use_flips
+    if dedup:
+        result = decoder.dedup_tiles(flips=use_flips)
+        tiles = result.tiles
+        print(f"Unique tiles: {len(tiles)}/{len(result.index)}{' (flips matched)' if use_flips else ''}")
+
+        unique_path = output_dir / f"{chr_file.stem}_unique_sheet.png"
+        indexed_image(assemble_tile_sheet(tiles, 16), palette).save(unique_path)
+        map_path = output_dir / f"{chr_file.stem}_tilemap.json"
+        result.save_tile_map(map_path, chr_file.name, use_flips)
+        print(f"Unique sheet saved: {unique_path}")
+        print(f"Tile map saved: {map_path}")
+
+    # Optionally save individual tiles (unique tiles only with --dedup)
     if args.individual:
-        tiles_dir = output_dir / "tiles"
+        tiles_dir = output_dir / ("unique_tiles" if dedup else "tiles")
         tiles_dir.mkdir(exist_ok=True)
-        for idx, tile in enumerate(tiles):
-            tile.putpalette(pal_data)
+        for idx, pixels in enumerate(tiles):
             tile_path = tiles_dir / f"tile_{idx:04d}.png"
-            tile.save(tile_path)
+            indexed_image(pixels, palette).save(tile_path)
         print(f"Individual tiles saved to: {tiles_dir}")
 
     return 0
@@ -919,17 +1560,36 @@ def cmd_bank(args):
         return 1
 
     output_dir = Path(args.output) if args.output else Path("C:/claude/Fq4/output/bank") / bank_file.stem
-    output_dir.mkdir(parents=True, exist_ok=True)
 
-    decoder = BankDecoder(bank_file)
-    offsets = decoder.parse_offset_table()
+    with BankDecoder(bank_file) as decoder:
+        offsets = decoder.offsets
 
-    print(f"Found {len(offsets)} entries in {bank_file.name}")
-    print(f"Offset table: {offsets[:10]}{'...' if len(offsets) > 10 else ''}")
+        print(f"Found {len(offsets)} entries in {bank_file.name}")
+        print(f"Offset table: {offsets[:10]}{'...' if len(offsets) > 10 else ''}")
 
-    decoder.extract_all_entries(output_dir)
+        if args.pack:
+            archive_path, index_path = decoder.write_archive(output_dir / f"{bank_file.stem}{ARCHIVE_SUFFIX}")
+            print(f"Packed {len(offsets)} entries into {archive_path}")
+            print(f"Index: {index_path}")
+            return 0
 
-    print(f"\nAll entries saved to: {output_dir}")
+        if args.list:
+            for idx in range(len(decoder)):
+                start, end = decoder.entry_range(idx)
+                print(f"  Entry {idx:4d}: 0x{start:06X}-0x{end:06X} ({max(end - start, 0):6d} bytes)")
+            return 0
+
+        entries = None
+        if args.entry:
+            bad = [idx for idx in args.entry if not 0 <= idx < len(decoder)]
+            if bad:
+                print(f"Error: Entry out of range (0-{len(decoder) - 1}): {bad}")
+                return 1
+            entries = args.entry
+
+        decoder.extract_all_entries(output_dir, entries)
+
+    print(f"\n{'Entries' if args.entry else 'All entries'} saved to: {output_dir}")
     return 0
 
 
@@ -984,75 +1644,52 @@ def cmd_extract_all(args):
         print("  Palette not found, using default grayscale")
         palette = [(i * 17, i * 17, i * 17) for i in range(16)]
 
-    # 2. Extract all RGBE images
-    print("\n[2/5] Extracting RGBE images...")
-    rgbe_output = output_base / "images"
-    rgbe_output.mkdir(parents=True, exist_ok=True)
+    # 2-4. RGBE images, CHR sprites and banks are independent units
+    units: List[ExtractionUnit] = []
 
-    rgbe_sets = [
-        "FQOP_01", "FQOP_02", "FQOP_03", "FQOP_04", "FQOP_05",
-        "FQOP_06", "FQOP_07", "FQOP_08", "FQOP_09", "FQOP_10",
-        "FQ4G16", "FQ4GLOGO",
-        "SUEMI_A1", "SUEMI_A2", "SUEMI_A3"
-    ]
-
-    rgbe_count = 0
-    for base_name in rgbe_sets:
-        base_path = game_dir / base_name
+    rgbe_output = output_base / "images"
+    for base_name in RGBE_SETS:
         plane_files = [f"{base_name}.{ext}" for ext in ['B_', 'R_', 'G_', 'E_']]
         if all((game_dir / pf).exists() for pf in plane_files):
-            try:
-                decoder = RGBEDecoder(str(base_path))
-                img = decoder.decode_to_image(palette)
-                if img:
-                    img.save(rgbe_output / f"{base_name}.png")
-                    rgbe_count += 1
-                    print(f"  {base_name}.png")
-            except Exception as e:
-                print(f"  {base_name}: Error - {e}")
-
-    print(f"  Total: {rgbe_count} images")
-
-    # 3. Extract all CHR files
-    print("\n[3/5] Extracting CHR sprite files...")
-    chr_files = list(game_dir.glob("*.CHR"))
-    chr_output = output_base / "sprites"
+            units.append(ExtractionUnit('rgbe', base_name, extract_rgbe_unit,
+                                        (game_dir, base_name, rgbe_output, palette, args.engine),
+                                        [game_dir / pf for pf in plane_files], palette))
 
-    for chr_file in chr_files:
-        try:
-            decoder = CHRDecoder(chr_file, tile_width=8, tile_height=8)
-            tiles = decoder.extract_all_tiles()
-            if tiles:
-                chr_dir = chr_output / chr_file.stem
-                chr_dir.mkdir(parents=True, exist_ok=True)
-
-                sprite_sheet = decoder.create_sprite_sheet(tiles, cols=16)
-                pal_data = []
-                for r, g, b in palette:
-                    pal_data.extend([r, g, b])
-                while len(pal_data) < 768:
-                    pal_data.append(0)
-                sprite_sheet.putpalette(pal_data)
-
-                sprite_sheet.save(chr_dir / f"{chr_file.stem}_sheet.png")
-                print(f"  {chr_file.name}: {len(tiles)} tiles")
-        except Exception as e:
-            print(f"  {chr_file.name}: Error - {e}")
+    chr_output = output_base / "sprites"
+    for chr_file in sorted(game_dir.glob("*.CHR")):
+        units.append(ExtractionUnit('chr', chr_file.name, extract_chr_unit,
+                                    (chr_file, chr_output, palette), [chr_file], palette))
 
-    # 4. Extract Bank files
-    print("\n[4/5] Extracting Bank files...")
-    bank_files = [f for f in game_dir.iterdir() if 'BANK' in f.name.upper()]
     bank_output = output_base / "bank"
-
-    for bank_file in bank_files:
-        try:
-            decoder = BankDecoder(bank_file)
-            offsets = decoder.parse_offset_table()
-            bank_dir = bank_output / bank_file.stem
-            decoder.extract_all_entries(bank_dir)
-            print(f"  {bank_file.name}: {len(offsets)} entries")
-        except Exception as e:
-            print(f"  {bank_file.name}: Error - {e}")
+    for bank_file in sorted(f for f in game_dir.iterdir() if 'BANK' in f.name.upper()):
+        units.append(ExtractionUnit('bank', bank_file.name, extract_bank_unit,
+                                    (bank_file, bank_output, args.pack), [bank_file],
+                                    options='pack' if args.pack else ''))
+
+    stage_titles = [
+        ('rgbe', "[2/5] Extracting RGBE images..."),
+        ('chr', "[3/5] Extracting CHR sprite files..."),
+        ('bank', "[4/5] Extracting Bank files..."),
+    ]
+    jobs = max(1, args.jobs)
+    if jobs > 1:
+        print(f"\nRunning {len(units)} units with {jobs} worker processes")
+
+    cache = ExtractionCache(output_base, force=args.force)
+    results = run_units(units, jobs, cache)
+    stage_results: Dict[str, List[UnitResult]] = {stage: [] for stage, _ in stage_titles}
+    for stage, title in stage_titles:
+        print(f"\n{title}")
+        stage_units = [u for u in units if u.stage == stage]
+        for _ in stage_units:
+            result = next(results)
+            stage_results[stage].append(result)
+            if result.log:
+                print(result.log, end='')
+            print(f"  {result.summary}")
+
+        if stage == 'rgbe':
+            print(f"  Total: {sum(r.ok for r in stage_results[stage])} images")
 
     # 5. Extract text
     print("\n[5/5] Extracting text files...")
@@ -1067,9 +1704,23 @@ def cmd_extract_all(args):
         except Exception as e:
             print(f"  FQ4MES: Error - {e}")
 
+    cache.save()
+
+    # Summary
+    errors = [r for rs in stage_results.values() for r in rs if not r.ok]
     print("\n" + "=" * 60)
     print(f"EXTRACTION COMPLETE: {output_base}")
     print("=" * 60)
+    print(f"  RGBE images: {sum(r.ok for r in stage_results['rgbe'])}/{len(stage_results['rgbe'])}")
+    print(f"  CHR files:   {sum(r.ok for r in stage_results['chr'])}/{len(stage_results['chr'])}"
+          f" ({sum(r.count for r in stage_results['chr'])} tiles)")
+    print(f"  Bank files:  {sum(r.ok for r in stage_results['bank'])}/{len(stage_results['bank'])}"
+          f" ({sum(r.count for r in stage_results['bank'])} entries)")
+    print(f"  Cache: {cache.hits} hits, {cache.rebuilt} rebuilt")
+    if errors:
+        print(f"  Errors ({len(errors)}):")
+        for result in errors:
+            print(f"    {result.summary}")
 
     return 0
 
@@ -1092,6 +1743,9 @@ Examples:
   # Extract Bank file
   python fq4_extractor.py bank C:/claude/Fq4/GAME/CHRBANK --output C:/claude/Fq4/output/chrbank
 
+  # Pack Bank entries into a single indexed archive
+  python fq4_extractor.py bank C:/claude/Fq4/GAME/CHRBANK --pack --output C:/claude/Fq4/output/bank
+
   # Extract text
   python fq4_extractor.py text C:/claude/Fq4/GAME/FQ4MES --output C:/claude/Fq4/output/text/messages.txt
 
@@ -1100,6 +1754,9 @@ Examples:
 
   # Decode single RGBE image
   python fq4_extractor.py decode C:/claude/Fq4/GAME/FQOP_01 --output C:/claude/Fq4/output
+
+  # Re-pack a modified raw R_/E_ plane
+  python fq4_extractor.py pack-plane FQOP_01_R.bin C:/claude/Fq4/mod/FQOP_01.R_
         """
     )
 
@@ -1109,11 +1766,23 @@ Examples:
     extract_all_parser = subparsers.add_parser('extract-all', help='Extract all assets (images, sprites, banks, text)')
     extract_all_parser.add_argument('--game-dir', '-g', help='Game directory (default: C:/claude/Fq4/GAME)')
     extract_all_parser.add_argument('--output', '-o', help='Output directory (default: C:/claude/Fq4/output)')
+    extract_all_parser.add_argument('--engine', choices=PLANAR_ENGINES, default='numpy',
+                                    help='Bitplane engine for RGBE images (default: numpy)')
+    extract_all_parser.add_argument('--jobs', '-j', type=int, default=1,
+                                    help='Worker processes for RGBE/CHR/bank units (default: 1)')
+    extract_all_parser.add_argument('--force', action='store_true',
+                                    help='Ignore the extraction cache and rebuild every asset')
+    extract_all_parser.add_argument('--pack', action='store_true',
+                                    help=f'Pack each bank into one {ARCHIVE_SUFFIX} archive + JSON index')
 
     # Decode-all command (NEW)
     decode_all_parser = subparsers.add_parser('decode-all', help='Decode all RGBE images')
     decode_all_parser.add_argument('--game-dir', '-g', help='Game directory (default: C:/claude/Fq4/GAME)')
     decode_all_parser.add_argument('--output', '-o', help='Output directory (default: C:/claude/Fq4/output/images)')
+    decode_all_parser.add_argument('--engine', choices=PLANAR_ENGINES, default='numpy',
+                                   help='Bitplane engine (default: numpy)')
+    decode_all_parser.add_argument('--force', action='store_true',
+                                   help='Ignore the extraction cache and rebuild every image')
 
     # CHR command (NEW)
     chr_parser = subparsers.add_parser('chr', help='Extract CHR sprite file')
@@ -1121,11 +1790,21 @@ Examples:
     chr_parser.add_argument('--palette', '-p', help='Path to palette file (default: FQ4.RGB)')
     chr_parser.add_argument('--output', '-o', help='Output directory (default: output/sprites/)')
     chr_parser.add_argument('--individual', action='store_true', help='Save individual tiles')
+    chr_parser.add_argument('--dedup', action='store_true',
+                            help='Also write unique tiles (_unique_sheet.png) and a tile map (_tilemap.json)')
+    chr_parser.add_argument('--dedup-flips', action='store_true',
+                            help='Like --dedup, also matching horizontally/vertically mirrored tiles')
 
     # Bank command (NEW)
     bank_parser = subparsers.add_parser('bank', help='Extract Bank file')
     bank_parser.add_argument('bank_file', help='Path to Bank file')
     bank_parser.add_argument('--output', '-o', help='Output directory (default: output/bank/)')
+    bank_parser.add_argument('--entry', '-e', type=int, action='append',
+                             help='Extract only this entry index (repeatable)')
+    bank_parser.add_argument('--list', action='store_true',
+                             help='List entry ranges without extracting')
+    bank_parser.add_argument('--pack', action='store_true',
+                             help=f'Write one indexed {ARCHIVE_SUFFIX} archive + JSON index instead of per-entry files')
 
     # Text command (NEW)
     text_parser = subparsers.add_parser('text', help='Extract text file')
@@ -1133,6 +1812,11 @@ Examples:
     text_parser.add_argument('--output', '-o', help='Output file (default: output/text/messages.txt)')
     text_parser.add_argument('--encoding', '-e', help='Text encoding (default: shift_jis)')
 
+    # Pack-plane command
+    pack_parser = subparsers.add_parser('pack-plane', help='RLE-encode a raw plane as a Type 7 (R_/E_) file')
+    pack_parser.add_argument('plane_file', help='Raw plane data (8000 bytes for 320x200)')
+    pack_parser.add_argument('output_file', help='Output plane file (e.g., FQOP_01.R_)')
+
     # Palette command
     palette_parser = subparsers.add_parser('palette', help='Parse palette file')
     palette_parser.add_argument('palette_file', help='Path to FQ4.RGB palette file')
@@ -1143,6 +1827,10 @@ Examples:
     decode_parser.add_argument('base_name', help='Base path to RGBE files (e.g., FQOP_01 without extension)')
     decode_parser.add_argument('--palette', '-p', help='Path to palette file (default: FQ4.RGB)')
     decode_parser.add_argument('--output', '-o', help='Output directory (default: output/)')
+    decode_parser.add_argument('--engine', choices=PLANAR_ENGINES, default='numpy',
+                               help='Bitplane engine (default: numpy, python = reference loop)')
+    decode_parser.add_argument('--verify-engine', action='store_true',
+                               help='Check numpy output against the reference loop before saving')
 
     args = parser.parse_args()
 
@@ -1159,6 +1847,7 @@ Examples:
         'text': cmd_text,
         'palette': cmd_palette,
         'decode': cmd_decode,
+        'pack-plane': cmd_pack_plane,
     }
 
     handler = command_map.get(args.command)
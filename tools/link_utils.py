@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+FQ4 File Linking Helpers
+Materialize files as copies, hardlinks, symlinks or reflinks
+
+Used by tools that place existing files into new directory layouts
+(sprite_classifier categories, upscale staging and caches) without
+duplicating them on disk.
+
+Usage:
+    from link_utils import LINK_MODES, link_file
+
+    used = link_file(src, dst, 'hardlink')   # 'hardlink', or 'copy' on fallback
+"""
+
+import os
+import shutil
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+LINK_MODES = ('copy', 'hardlink', 'symlink', 'reflink')
+
+# Linux ioctl that shares extents between files (btrfs, xfs, ...)
+FICLONE = 0x40049409
+
+
+def reflink_file(src: Path, dst: Path):
+    """Clone src to dst with copy-on-write extents (raises OSError if unsupported)"""
+    if fcntl is None:
+        raise OSError("reflink is not supported on this platform")
+
+    with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+        try:
+            fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+        except OSError:
+            fdst.close()
+            os.unlink(dst)
+            raise
+    shutil.copystat(src, dst)
+
+
+def link_file(src: Path, dst: Path, mode: str = 'copy') -> str:
+    """
+    Place src at dst, replacing any existing dst
+
+    Linking can fail per file (cross-device hardlinks, no symlink
+    privilege on Windows, filesystems without reflink); such files fall
+    back to a plain copy.
+
+    Args:
+        src: Existing file
+        dst: Destination path (parent directory must exist)
+        mode: One of LINK_MODES
+
+    Returns:
+        Mode actually used ('copy' after a fallback)
+    """
+    if mode not in LINK_MODES:
+        raise ValueError(f"Unknown link mode: {mode} (expected one of {', '.join(LINK_MODES)})")
+
+    if os.path.abspath(src) == os.path.abspath(dst):
+        raise shutil.SameFileError(f"{src} and {dst} are the same file")
+    if dst.is_symlink() or dst.exists():
+        dst.unlink()
+
+    if mode != 'copy':
+        try:
+            if mode == 'hardlink':
+                os.link(src, dst)
+            elif mode == 'symlink':
+                os.symlink(Path(src).resolve(), dst)
+            else:
+                reflink_file(src, dst)
+            return mode
+        except OSError:
+            pass
+
+    shutil.copy2(src, dst)
+    return 'copy'
@@ -5,22 +5,55 @@ Palette correction, conversion, and multi-palette support
 
 Usage:
     python tools/palette_tools.py brighten --input output/images --output output/images_bright --factor 1.5
+    python tools/palette_tools.py brighten --input output/sprites --output output/sprites_bright --workers 8
     python tools/palette_tools.py extract --input output/sprites/FQ4/FQ4_sheet.png --output output/palette_extracted.png
     python tools/palette_tools.py apply --input output/sprites --palette palettes/bright.png --output output/sprites_corrected
+    python tools/palette_tools.py apply --input output/sprites --palette sunset --output output/sprites_sunset --distance lab
+    python tools/palette_tools.py lut --palette knight --bits 6
 """
 
 import argparse
+import hashlib
+import json
+import os
+import struct
 import sys
+import zlib
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from typing import List, Tuple, Optional
 from collections import Counter
 
 try:
     from PIL import Image, ImageEnhance
+    import numpy as np
 except ImportError:
-    print("Error: PIL/Pillow is required. Install with: pip install Pillow")
+    print("Error: PIL/Pillow and numpy are required.")
+    print("Install with: pip install Pillow numpy")
     sys.exit(1)
 
+sys.path.insert(0, str(Path(__file__).parent))
+import custom_palettes
+
+
+# Color distance used when remapping images to a palette
+# - rgb: squared Euclidean distance in RGB (matches find_nearest_color)
+# - lab: CIE76 distance in CIELAB (D65), closer to perceived difference
+DISTANCE_MODES = ('rgb', 'lab')
+
+# Upper bound on candidate x palette distances evaluated per block
+DISTANCE_BLOCK = 1 << 22
+
+# On-disk cache for PaletteLUT cubes, one .npy per palette name
+LUT_CACHE_DIR = Path(__file__).parent.parent / "output" / "palettes" / "lut"
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+PNG_COLOR_INDEXED = 3
+
+# Per-output-directory record of brightened files (source stat + factor)
+BRIGHTEN_MANIFEST = '.brighten_manifest.json'
+BRIGHTEN_MANIFEST_VERSION = 1
+
 
 # Original FQ4.RGB palette (16 colors, extracted from game)
 ORIGINAL_PALETTE = [
@@ -110,6 +143,16 @@ PALETTES = {
 }
 
 
+def get_named_palette(name: str) -> List[Tuple[int, int, int]]:
+    """Look up a palette in custom_palettes.PALETTES, then in PALETTES"""
+    if name in custom_palettes.PALETTES:
+        return custom_palettes.PALETTES[name]
+    if name in PALETTES:
+        return PALETTES[name]
+    available = list(custom_palettes.PALETTES) + list(PALETTES)
+    raise ValueError(f"Unknown palette: {name}. Available: {available}")
+
+
 def create_palette_image(palette: List[Tuple[int, int, int]],
                          swatch_size: int = 32) -> Image.Image:
     """Create a visual palette swatch image"""
@@ -141,11 +184,91 @@ def extract_palette_from_image(img: Image.Image,
     return [color for color, count in most_common]
 
 
+def rgb_to_lab(rgb: np.ndarray) -> np.ndarray:
+    """
+    Convert sRGB colors to CIELAB (D65 white point).
+
+    Args:
+        rgb: (..., 3) array of 0-255 values
+
+    Returns:
+        (..., 3) float64 array of L*, a*, b*
+    """
+    c = np.asarray(rgb, dtype=np.float64) / 255.0
+    linear = np.where(c > 0.04045, ((c + 0.055) / 1.055) ** 2.4, c / 12.92)
+
+    xyz = linear @ np.array([
+        [0.4124564, 0.2126729, 0.0193339],
+        [0.3575761, 0.7151522, 0.1191920],
+        [0.1804375, 0.0721750, 0.9503041],
+    ])
+    xyz /= np.array([0.95047, 1.0, 1.08883])
+
+    f = np.where(xyz > (6 / 29) ** 3, np.cbrt(xyz), xyz / (3 * (6 / 29) ** 2) + 4 / 29)
+
+    lab = np.empty_like(f)
+    lab[..., 0] = 116 * f[..., 1] - 16
+    lab[..., 1] = 500 * (f[..., 0] - f[..., 1])
+    lab[..., 2] = 200 * (f[..., 1] - f[..., 2])
+    return lab
+
+
+def nearest_palette_indices(colors: np.ndarray,
+                            palette: List[Tuple[int, int, int]],
+                            mode: str = 'rgb') -> np.ndarray:
+    """
+    Find the nearest palette index for many colors at once.
+
+    Ties resolve to the lowest palette index, like find_nearest_color.
+
+    Args:
+        colors: (N, 3) array of RGB values
+        palette: List of RGB tuples
+        mode: One of DISTANCE_MODES
+
+    Returns:
+        (N,) array of palette indices
+    """
+    if mode not in DISTANCE_MODES:
+        raise ValueError(f"Unknown distance mode: {mode} (expected one of {', '.join(DISTANCE_MODES)})")
+
+    colors = np.asarray(colors).reshape(-1, 3)
+    if mode == 'lab':
+        points = rgb_to_lab(colors)
+        targets = rgb_to_lab(np.array(palette))
+    else:
+        points = colors.astype(np.int32)
+        targets = np.array(palette, dtype=np.int32)
+
+    indices = np.empty(len(points), dtype=np.intp)
+    block = max(1, DISTANCE_BLOCK // len(targets))
+    for start in range(0, len(points), block):
+        diff = points[start:start + block, None, :] - targets[None, :, :]
+        indices[start:start + block] = np.einsum('ijk,ijk->ij', diff, diff).argmin(axis=1)
+
+    return indices
+
+
 def apply_palette(img: Image.Image,
-                  palette: List[Tuple[int, int, int]]) -> Image.Image:
+                  palette: List[Tuple[int, int, int]],
+                  mode: str = 'rgb',
+                  lut: Optional['PaletteLUT'] = None) -> Image.Image:
     """
     Apply a new palette to an indexed image.
     Maps each color to nearest palette color.
+
+    Distances are computed once per distinct color in the image, so
+    large (upscaled) images with few colors stay cheap.
+
+    Args:
+        img: Source image (P, RGB, RGBA or anything convertible to RGBA)
+        palette: List of RGB tuples
+        mode: Distance mode, one of DISTANCE_MODES
+        lut: Prebuilt PaletteLUT for this palette; replaces the distance
+             search with a cube lookup (exact only up to the LUT's bits)
+
+    Returns:
+        RGB image, or RGBA with the original alpha channel kept
     """
     if img.mode not in ('P', 'RGB', 'RGBA'):
         img = img.convert('RGBA')
@@ -158,14 +281,20 @@ def apply_palette(img: Image.Image,
     else:
         img_rgb = img if img.mode == 'RGB' else img.convert('RGB')
 
-    # Create new image with remapped colors
-    result = Image.new('RGB', img.size)
+    # Pack pixels into 24-bit keys and remap each distinct color once
+    pixels = np.asarray(img_rgb, dtype=np.uint32)
+    keys = (pixels[..., 0] << 16) | (pixels[..., 1] << 8) | pixels[..., 2]
+    unique, inverse = np.unique(keys.ravel(), return_inverse=True)
+
+    unique_rgb = np.stack([unique >> 16, (unique >> 8) & 0xFF, unique & 0xFF], axis=1)
+    if lut is not None:
+        nearest = lut.indices(unique_rgb)
+    else:
+        nearest = nearest_palette_indices(unique_rgb, palette, mode)
 
-    for y in range(img.height):
-        for x in range(img.width):
-            pixel = img_rgb.getpixel((x, y))
-            nearest = find_nearest_color(pixel, palette)
-            result.putpixel((x, y), nearest)
+    mapped_rgb = np.array(palette, dtype=np.uint8)[nearest]
+    remapped = mapped_rgb[inverse].reshape(pixels.shape)
+    result = Image.fromarray(remapped, 'RGB')
 
     if has_alpha:
         r, g, b = result.split()
@@ -175,8 +304,12 @@ def apply_palette(img: Image.Image,
 
 
 def find_nearest_color(color: Tuple[int, int, int],
-                       palette: List[Tuple[int, int, int]]) -> Tuple[int, int, int]:
-    """Find nearest color in palette using Euclidean distance"""
+                       palette: List[Tuple[int, int, int]],
+                       lut: Optional['PaletteLUT'] = None) -> Tuple[int, int, int]:
+    """Find nearest color in palette using Euclidean distance (or a prebuilt LUT)"""
+    if lut is not None:
+        return lut.lookup(color)
+
     min_dist = float('inf')
     nearest = palette[0]
 
@@ -189,6 +322,131 @@ def find_nearest_color(color: Tuple[int, int, int],
     return nearest
 
 
+class PaletteLUT:
+    """
+    Nearest-palette lookup cube.
+
+    Each RGB channel is quantized to `bits` bits (6 = VGA DAC space, a
+    64x64x64 cube) and every cell stores the index of the palette color
+    nearest to the cell's representative color, so queries are a single
+    array index instead of a distance search.
+
+    Usage:
+        lut = PaletteLUT.for_palette('knight')
+        index = lut.lookup_index((200, 144, 104))
+        indices = lut.indices(pixels)            # (..., 3) array
+    """
+
+    def __init__(self, palette: List[Tuple[int, int, int]],
+                 bits: int = 6, mode: str = 'rgb',
+                 table: Optional[np.ndarray] = None):
+        if not 1 <= bits <= 8:
+            raise ValueError(f"LUT bits must be 1-8, got {bits}")
+        if len(palette) > 256:
+            raise ValueError(f"LUT palettes hold at most 256 colors, got {len(palette)}")
+
+        self.palette = [tuple(color) for color in palette]
+        self.bits = bits
+        self.mode = mode
+        self.shift = 8 - bits
+        self.colors = np.array(self.palette, dtype=np.uint8)
+        self.table = table if table is not None else self.build()
+
+    @property
+    def size(self) -> int:
+        """Cells per channel"""
+        return 1 << self.bits
+
+    def cell_colors(self) -> np.ndarray:
+        """Representative 8-bit color of every cell, (size**3, 3)"""
+        levels = np.arange(self.size) * 255 // (self.size - 1)
+        r, g, b = np.meshgrid(levels, levels, levels, indexing='ij')
+        return np.stack([r.ravel(), g.ravel(), b.ravel()], axis=1)
+
+    def build(self) -> np.ndarray:
+        """Compute the (size, size, size) index cube"""
+        indices = nearest_palette_indices(self.cell_colors(), self.palette, self.mode)
+        return indices.astype(np.uint8).reshape(self.size, self.size, self.size)
+
+    @staticmethod
+    def cache_key(palette: List[Tuple[int, int, int]], bits: int, mode: str) -> str:
+        """Short hash of the palette colors, bits and mode"""
+        key = f"{bits}:{mode}:" + ','.join(f"{r},{g},{b}" for r, g, b in palette)
+        return hashlib.sha1(key.encode()).hexdigest()[:12]
+
+    def lookup_index(self, color: Tuple[int, int, int]) -> int:
+        """Palette index for one RGB color"""
+        r, g, b = color[:3]
+        return int(self.table[r >> self.shift, g >> self.shift, b >> self.shift])
+
+    def lookup(self, color: Tuple[int, int, int]) -> Tuple[int, int, int]:
+        """Nearest palette color for one RGB color"""
+        return self.palette[self.lookup_index(color)]
+
+    def indices(self, pixels: np.ndarray) -> np.ndarray:
+        """Palette indices for a (..., 3) array of RGB values"""
+        q = np.asarray(pixels, dtype=np.uint8) >> self.shift
+        return self.table[q[..., 0], q[..., 1], q[..., 2]]
+
+    def remap(self, pixels: np.ndarray) -> np.ndarray:
+        """Nearest palette colors for a (..., 3) array of RGB values"""
+        return self.colors[self.indices(pixels)]
+
+    def save(self, path: Path):
+        """Write the index cube as .npy"""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        np.save(path, self.table)
+
+    @classmethod
+    def load(cls, path: Path, palette: List[Tuple[int, int, int]],
+             bits: int = 6, mode: str = 'rgb') -> 'PaletteLUT':
+        """Load a cube written by save(); raises ValueError if it does not fit"""
+        table = np.load(path, allow_pickle=False)
+        size = 1 << bits
+        if table.shape != (size, size, size) or table.dtype != np.uint8:
+            raise ValueError(f"{path}: not a {size}^3 palette LUT")
+        return cls(palette, bits, mode, table)
+
+    @classmethod
+    def for_palette(cls, name: str, bits: int = 6, mode: str = 'rgb',
+                    cache_dir: Optional[Path] = LUT_CACHE_DIR) -> 'PaletteLUT':
+        """
+        Get the LUT for a named palette, building and caching it on first use.
+
+        Args:
+            name: Palette name (custom_palettes.PALETTES or PALETTES)
+            bits: Bits per channel (6 = 64x64x64 VGA cube, 5 = 32x32x32)
+            mode: Distance mode, one of DISTANCE_MODES
+            cache_dir: Cache directory, or None to skip the disk cache
+
+        Returns:
+            PaletteLUT for the palette
+        """
+        palette = get_named_palette(name)
+        lut = None
+        path = None
+
+        if cache_dir is not None:
+            # Palette colors are part of the file name, so editing a
+            # palette definition never picks up a stale cube
+            path = cache_dir / f"{name}_{bits}bit_{mode}_{cls.cache_key(palette, bits, mode)}.npy"
+            if path.exists():
+                try:
+                    lut = cls.load(path, palette, bits, mode)
+                except (OSError, ValueError):
+                    lut = None
+
+        if lut is None:
+            lut = cls(palette, bits, mode)
+            if path is not None:
+                try:
+                    lut.save(path)
+                except OSError:
+                    pass
+
+        return lut
+
+
 def brighten_palette(palette: List[Tuple[int, int, int]],
                      factor: float = 1.5) -> List[Tuple[int, int, int]]:
     """Brighten all colors in palette"""
@@ -214,43 +472,217 @@ def adjust_palette_contrast(palette: List[Tuple[int, int, int]],
     return adjusted
 
 
+def brighten_colors(colors: List[Tuple[int, int, int]],
+                    factor: float) -> List[Tuple[int, int, int]]:
+    """Apply ImageEnhance.Brightness to a list of colors (pixel-exact with enhancing an image)"""
+    strip = Image.new('RGB', (len(colors), 1))
+    strip.putdata([tuple(color) for color in colors])
+    return list(ImageEnhance.Brightness(strip).enhance(factor).getdata())
+
+
+def iter_png_chunks(data: bytes):
+    """
+    Walk the chunks of a PNG file
+
+    Yields:
+        (chunk type, chunk start, data start, chunk end) offsets into data
+    """
+    if data[:8] != PNG_SIGNATURE:
+        raise ValueError("not a PNG file")
+
+    pos = 8
+    while pos + 8 <= len(data):
+        length, chunk_type = struct.unpack('>I4s', data[pos:pos + 8])
+        end = pos + 12 + length
+        if end > len(data):
+            raise ValueError(f"truncated {chunk_type.decode('latin-1')} chunk")
+        yield chunk_type, pos, pos + 8, end
+        if chunk_type == b'IEND':
+            return
+        pos = end
+
+
+def brighten_png_palette(data: bytes, factor: float) -> Optional[bytes]:
+    """
+    Brighten an indexed PNG by rewriting only its PLTE chunk
+
+    Pixel data (IDAT), transparency (tRNS) and every other chunk are
+    copied through byte for byte.
+
+    Args:
+        data: PNG file contents
+        factor: Brightness factor
+
+    Returns:
+        New PNG contents, or None if the image is not palette-based
+    """
+    chunks = list(iter_png_chunks(data))
+    if not chunks or chunks[0][0] != b'IHDR':
+        raise ValueError("PNG does not start with IHDR")
+
+    _, _, ihdr, _ = chunks[0]
+    if data[ihdr + 9] != PNG_COLOR_INDEXED:
+        return None
+
+    for chunk_type, start, body, end in chunks:
+        if chunk_type == b'PLTE':
+            raw = data[body:end - 4]
+            colors = [tuple(raw[i:i + 3]) for i in range(0, len(raw) - 2, 3)]
+            plte = bytes(v for color in brighten_colors(colors, factor) for v in color)
+            chunk = (struct.pack('>I', len(plte)) + b'PLTE' + plte
+                     + struct.pack('>I', zlib.crc32(b'PLTE' + plte)))
+            return data[:start] + chunk + data[end:]
+
+    raise ValueError("indexed PNG has no PLTE chunk")
+
+
+def brighten_image_file(src: Path, dst: Path, factor: float) -> str:
+    """
+    Brighten one PNG into dst
+
+    Indexed images take the PLTE fast path and stay indexed; everything
+    else is enhanced as RGB with alpha kept.
+
+    Returns:
+        'palette' or 'rgb', the path taken
+    """
+    data = src.read_bytes()
+    brightened = brighten_png_palette(data, factor)
+    if brightened is not None:
+        tmp_path = dst.with_name(dst.name + '.tmp')
+        tmp_path.write_bytes(brightened)
+        os.replace(tmp_path, dst)
+        return 'palette'
+
+    img = Image.open(src)
+
+    if img.mode == 'RGBA':
+        r, g, b, a = img.split()
+        rgb = Image.merge('RGB', (r, g, b))
+        enhancer = ImageEnhance.Brightness(rgb)
+        brightened = enhancer.enhance(factor)
+        r, g, b = brightened.split()
+        result = Image.merge('RGBA', (r, g, b, a))
+    else:
+        rgb = img.convert('RGB')
+        enhancer = ImageEnhance.Brightness(rgb)
+        result = enhancer.enhance(factor)
+
+    result.save(dst, 'PNG')
+    return 'rgb'
+
+
+def brighten_image_safe(task: Tuple[Path, Path, float]) -> Tuple[Optional[str], Optional[str]]:
+    """
+    brighten_image_file() for worker processes
+
+    Returns:
+        (path taken, None) on success, (None, error message) on failure
+    """
+    src, dst, factor = task
+    try:
+        return brighten_image_file(src, dst, factor), None
+    except Exception as e:
+        return None, str(e)
+
+
+def load_brighten_manifest(output_dir: Path) -> dict:
+    """Load the brighten manifest (missing or unreadable = empty)"""
+    try:
+        with open(output_dir / BRIGHTEN_MANIFEST, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if manifest.get('version') != BRIGHTEN_MANIFEST_VERSION:
+        return {}
+    return manifest.get('files', {})
+
+
+def save_brighten_manifest(output_dir: Path, files: dict):
+    """Write the brighten manifest atomically"""
+    path = output_dir / BRIGHTEN_MANIFEST
+    tmp_path = path.with_suffix('.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'version': BRIGHTEN_MANIFEST_VERSION, 'files': files},
+                  f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
 def batch_apply_brightness(input_dir: Path,
                            output_dir: Path,
                            factor: float = 1.5,
-                           recursive: bool = True) -> dict:
-    """Apply brightness correction to all images in directory"""
+                           recursive: bool = True,
+                           workers: int = 1,
+                           force: bool = False) -> dict:
+    """
+    Apply brightness correction to all images in directory
+
+    Outputs are recorded in a manifest in output_dir with the source's
+    size, mtime and the factor; a file whose record still matches and
+    whose output exists is skipped on the next run.
+
+    Args:
+        input_dir: Directory with PNG files
+        output_dir: Mirror directory for brightened files
+        factor: Brightness factor
+        recursive: Include subdirectories
+        workers: Number of worker processes (1 = run in this process)
+        force: Rebuild every output regardless of the manifest
+
+    Returns:
+        Stats dict with processed, palette, skipped and errors counts
+    """
     output_dir.mkdir(parents=True, exist_ok=True)
 
-    stats = {'processed': 0, 'errors': 0}
+    stats = {'processed': 0, 'palette': 0, 'skipped': 0, 'errors': 0}
+    manifest = {} if force else load_brighten_manifest(output_dir)
 
+    tasks = []
+    records = {}
     pattern = '**/*.png' if recursive else '*.png'
-    for png in input_dir.glob(pattern):
-        try:
-            relative = png.relative_to(input_dir)
-            out_path = output_dir / relative
-            out_path.parent.mkdir(parents=True, exist_ok=True)
-
-            img = Image.open(png)
-
-            if img.mode == 'RGBA':
-                r, g, b, a = img.split()
-                rgb = Image.merge('RGB', (r, g, b))
-                enhancer = ImageEnhance.Brightness(rgb)
-                brightened = enhancer.enhance(factor)
-                r, g, b = brightened.split()
-                result = Image.merge('RGBA', (r, g, b, a))
-            else:
-                rgb = img.convert('RGB')
-                enhancer = ImageEnhance.Brightness(rgb)
-                result = enhancer.enhance(factor)
-
-            result.save(out_path, 'PNG')
+    for png in sorted(input_dir.glob(pattern)):
+        relative = png.relative_to(input_dir)
+        key = relative.as_posix()
+        out_path = output_dir / relative
+
+        st = png.stat()
+        record = {'factor': factor, 'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+        if manifest.get(key) == record and out_path.exists():
+            stats['skipped'] += 1
+            continue
+
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        tasks.append((png, out_path, factor))
+        records[png] = (key, record)
+        manifest.pop(key, None)
+
+    if workers > 1 and len(tasks) > 1:
+        chunksize = max(1, min(64, len(tasks) // (workers * 4)))
+        pool = ProcessPoolExecutor(max_workers=workers)
+        results = pool.map(brighten_image_safe, tasks, chunksize=chunksize)
+    else:
+        pool = None
+        results = map(brighten_image_safe, tasks)
+
+    try:
+        for (png, out_path, _), (method, error) in zip(tasks, results):
+            key, record = records[png]
+            if error is not None:
+                stats['errors'] += 1
+                print(f"  [ERROR] {png}: {error}")
+                continue
+
+            manifest[key] = record
             stats['processed'] += 1
-            print(f"  [OK] {relative}")
-
-        except Exception as e:
-            stats['errors'] += 1
-            print(f"  [ERROR] {png}: {e}")
+            if method == 'palette':
+                stats['palette'] += 1
+                print(f"  [OK] {key} (palette only)")
+            else:
+                print(f"  [OK] {key}")
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        save_brighten_manifest(output_dir, manifest)
 
     return stats
 
@@ -295,6 +727,10 @@ def main():
     brighten_parser.add_argument('--factor', '-f', type=float, default=1.5,
                                  help='Brightness factor (default: 1.5)')
     brighten_parser.add_argument('--no-recursive', action='store_true')
+    brighten_parser.add_argument('--workers', '-w', type=int, default=1,
+                                 help='Worker processes (default: 1)')
+    brighten_parser.add_argument('--force', action='store_true',
+                                 help='Rebuild outputs even if they are up to date')
 
     # Extract palette command
     extract_parser = subparsers.add_parser('extract', help='Extract palette from image')
@@ -307,10 +743,25 @@ def main():
     apply_parser.add_argument('--input', '-i', type=Path, required=True)
     apply_parser.add_argument('--output', '-o', type=Path, required=True)
     apply_parser.add_argument('--palette', '-p', type=str, required=True,
-                              choices=list(PALETTES.keys()) + ['file'],
+                              choices=list(PALETTES.keys()) + list(custom_palettes.PALETTES) + ['file'],
                               help='Palette name or "file"')
     apply_parser.add_argument('--palette-file', type=Path,
                               help='Custom palette image (if --palette=file)')
+    apply_parser.add_argument('--distance', choices=DISTANCE_MODES, default='rgb',
+                              help='Color distance: rgb (default) or lab (perceptual)')
+    apply_parser.add_argument('--lut', type=int, nargs='?', const=6, metavar='BITS',
+                              help='Use a cached palette LUT with BITS per channel (default: 6)')
+
+    # Build palette LUTs command
+    lut_parser = subparsers.add_parser('lut', help='Build cached nearest-color LUTs for named palettes')
+    lut_parser.add_argument('--palette', '-p', type=str, default='all',
+                            choices=['all'] + list(custom_palettes.PALETTES) + list(PALETTES.keys()),
+                            help='Palette name (default: all)')
+    lut_parser.add_argument('--bits', type=int, default=6,
+                            help='Bits per channel: 6 = 64x64x64 VGA cube (default), 5 = 32x32x32')
+    lut_parser.add_argument('--distance', choices=DISTANCE_MODES, default='rgb')
+    lut_parser.add_argument('--cache-dir', type=Path, default=LUT_CACHE_DIR,
+                            help=f'LUT cache directory (default: {LUT_CACHE_DIR})')
 
     # Create swatches command
     swatch_parser = subparsers.add_parser('swatches', help='Create palette swatch images')
@@ -333,9 +784,12 @@ def main():
             args.input,
             args.output,
             args.factor,
-            not args.no_recursive
+            not args.no_recursive,
+            args.workers,
+            args.force
         )
-        print(f"\nProcessed: {stats['processed']}, Errors: {stats['errors']}")
+        print(f"\nProcessed: {stats['processed']} ({stats['palette']} palette only), "
+              f"Skipped: {stats['skipped']}, Errors: {stats['errors']}")
 
     elif args.command == 'extract':
         print(f"Extracting palette from {args.input}")
@@ -351,7 +805,7 @@ def main():
             print(f"  [{i:2d}] RGB{color}")
 
     elif args.command == 'apply':
-        print(f"Applying palette '{args.palette}' to images")
+        print(f"Applying palette '{args.palette}' to images ({args.distance} distance)")
 
         if args.palette == 'file':
             if not args.palette_file:
@@ -359,8 +813,10 @@ def main():
                 return
             pal_img = Image.open(args.palette_file)
             palette = extract_palette_from_image(pal_img, 16)
+            lut = PaletteLUT(palette, args.lut, args.distance) if args.lut else None
         else:
-            palette = PALETTES[args.palette]
+            palette = get_named_palette(args.palette)
+            lut = PaletteLUT.for_palette(args.palette, args.lut, args.distance) if args.lut else None
 
         args.output.mkdir(parents=True, exist_ok=True)
 
@@ -370,10 +826,19 @@ def main():
             out_path.parent.mkdir(parents=True, exist_ok=True)
 
             img = Image.open(png)
-            result = apply_palette(img, palette)
+            result = apply_palette(img, palette, args.distance, lut)
             result.save(out_path)
             print(f"  [OK] {relative}")
 
+    elif args.command == 'lut':
+        names = list(custom_palettes.PALETTES) + list(PALETTES) if args.palette == 'all' else [args.palette]
+        print(f"Building {1 << args.bits}^3 palette LUTs in {args.cache_dir}")
+
+        for name in names:
+            lut = PaletteLUT.for_palette(name, args.bits, args.distance, args.cache_dir)
+            used = np.unique(lut.table).size
+            print(f"  [OK] {name}: {len(lut.palette)} colors, {used} reachable")
+
     elif args.command == 'swatches':
         print(f"Creating palette swatches in {args.output}")
         args.output.mkdir(parents=True, exist_ok=True)
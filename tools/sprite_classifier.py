@@ -6,17 +6,29 @@ Automatic categorization of 27,005+ sprite tiles by visual characteristics
 Usage:
     python tools/sprite_classifier.py analyze --input output/sprites --output output/classified
     python tools/sprite_classifier.py report --input output/sprites
+    python tools/sprite_classifier.py report --input output/sprites --workers 16
+    python tools/sprite_classifier.py report --input output/sprites --max-distance 4 --clusters clusters.json
+    python tools/sprite_classifier.py report --input output/sprites --table sprites.parquet
     python tools/sprite_classifier.py extract-unique --input output/sprites --output output/unique_sprites
+    python tools/sprite_classifier.py analyze --input output/sprites --output output/classified --link-mode hardlink
+
+Analyzed features are cached in <input>/.sprite_features.sqlite (see
+SpriteCache), so reruns only analyze new or modified sprites.
 """
 
 import argparse
+import csv
+import functools
 import json
 import sys
 from pathlib import Path
-from typing import Dict, List, Tuple, Optional, Set
+from typing import Dict, List, Tuple, Optional
 from collections import defaultdict
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, asdict, fields
+from operator import attrgetter
 import hashlib
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
 
 try:
     from PIL import Image
@@ -26,6 +38,9 @@ except ImportError:
     print("Install with: pip install Pillow numpy")
     sys.exit(1)
 
+sys.path.insert(0, str(Path(__file__).parent))
+from link_utils import LINK_MODES, link_file
+
 
 @dataclass
 class SpriteInfo:
@@ -52,6 +67,26 @@ class CategoryStats:
     examples: List[str]
 
 
+# Columnar layout of SpriteInfo (one structured-array field per attribute)
+SPRITE_DTYPE = np.dtype([
+    ('path', object),
+    ('width', np.int32),
+    ('height', np.int32),
+    ('unique_colors', np.int32),
+    ('transparency_ratio', np.float64),
+    ('brightness', np.float64),
+    ('category', 'U16'),
+    ('hash', 'U16'),
+    ('is_duplicate', np.bool_),
+    ('duplicate_of', object),
+])
+
+# Bump when analyze_sprite features or classify_sprite rules change,
+# invalidating SpriteCache rows
+FEATURE_VERSION = 1
+CACHE_FILENAME = '.sprite_features.sqlite'
+
+
 # Sprite category definitions based on visual characteristics
 CATEGORIES = {
     'character': {
@@ -97,12 +132,11 @@ def compute_sprite_hash(img: Image.Image) -> str:
     """Compute perceptual hash of sprite for duplicate detection"""
     # Convert to grayscale and resize to 8x8
     gray = img.convert('L').resize((8, 8), Image.Resampling.NEAREST)
-    pixels = list(gray.getdata())
-    avg = sum(pixels) / len(pixels)
+    pixels = np.frombuffer(gray.tobytes(), dtype=np.uint8)
+    avg = int(pixels.sum()) / len(pixels)
 
-    # Generate hash based on pixel comparison to average
-    bits = ''.join('1' if p > avg else '0' for p in pixels)
-    return hex(int(bits, 2))[2:].zfill(16)
+    # Generate hash based on pixel comparison to average (row-major, MSB first)
+    return np.packbits(pixels > avg).tobytes().hex()
 
 
 def analyze_sprite(img_path: Path) -> SpriteInfo:
@@ -112,27 +146,28 @@ def analyze_sprite(img_path: Path) -> SpriteInfo:
     if img.mode != 'RGBA':
         img = img.convert('RGBA')
 
-    pixels = list(img.getdata())
     width, height = img.size
     total_pixels = width * height
 
-    # Count unique colors (excluding fully transparent)
-    color_set: Set[Tuple[int, int, int]] = set()
-    transparent_count = 0
-    brightness_sum = 0
+    # One little-endian uint32 per pixel: 0xAABBGGRR
+    pixels = np.frombuffer(img.tobytes(), dtype='<u4')
 
-    for r, g, b, a in pixels:
-        if a < 128:  # Consider as transparent
-            transparent_count += 1
-        else:
-            color_set.add((r, g, b))
-            brightness_sum += (r + g + b) / 3
+    # Alpha < 128 counts as transparent, i.e. opaque pixels are >= 0x80000000
+    opaque = pixels[pixels >= 0x80000000]
+    opaque_count = len(opaque)
+    transparent_count = total_pixels - opaque_count
 
-    unique_colors = len(color_set)
+    # Count unique colors (excluding transparent)
+    unique_colors = len(np.unique(opaque & 0x00FFFFFF))
     transparency_ratio = transparent_count / total_pixels if total_pixels > 0 else 0
 
-    opaque_count = total_pixels - transparent_count
-    brightness = (brightness_sum / opaque_count / 255) if opaque_count > 0 else 0
+    if opaque_count > 0:
+        channel_sum = (opaque & 0xFF) + ((opaque >> 8) & 0xFF) + ((opaque >> 16) & 0xFF)
+        # Accumulate left to right so the float sum matches a per-pixel loop exactly
+        brightness_sum = float(np.add.accumulate(channel_sum / 3)[-1])
+        brightness = brightness_sum / opaque_count / 255
+    else:
+        brightness = 0
 
     # Determine category based on characteristics
     category = classify_sprite(unique_colors, transparency_ratio, brightness)
@@ -178,126 +213,605 @@ def classify_sprite(colors: int, transparency: float, brightness: float) -> str:
     return 'character'
 
 
-def find_duplicates(sprites: List[SpriteInfo]) -> List[SpriteInfo]:
-    """Find duplicate sprites based on perceptual hash"""
-    hash_map: Dict[str, str] = {}  # hash -> first path
+# Set bits per byte value, for NumPy builds without np.bitwise_count
+POPCOUNT8 = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+def popcount(values: np.ndarray) -> np.ndarray:
+    """Number of set bits in each element of an unsigned integer array"""
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(values)
+    values = np.ascontiguousarray(values)
+    return POPCOUNT8[values.view(np.uint8)].reshape(values.shape + (-1,)).sum(axis=-1)
+
+
+class MultiIndexHash:
+    """
+    Multi-index hash over 64-bit hashes, split into four 16-bit bands
+
+    Two hashes within distance d must agree to within d // 4 bits in at
+    least one band (pigeonhole), so a query only probes each band's table
+    at keys within that radius and verifies the candidates found, instead
+    of comparing against every hash.
+
+    Each band keeps the hash indices sorted by band key plus a dense table
+    of where every key's bucket starts, so probed buckets are gathered as
+    array slices and verified with one vectorized popcount. Crowded
+    buckets (the all-zero band of mostly empty tiles) then cost array
+    work rather than a Python loop per candidate.
+    """
+
+    BANDS = 4
+    BAND_BITS = 16
+    # Probe key whose bucket is always empty
+    EMPTY_KEY = 1 << BAND_BITS
+    # Upper bound on candidate pairs expanded at once by pairs()
+    PAIR_BLOCK = 1 << 20
+    # A probed candidate costs about this many all-pairs comparisons
+    PROBE_COST = 12
+
+    def __init__(self, values: List[int]):
+        self.values = np.array(values, dtype=np.uint64)
+        self.keys: List[np.ndarray] = []
+        self.order: List[np.ndarray] = []
+        self.sorted_values: List[np.ndarray] = []
+        self.starts: List[np.ndarray] = []
+        n_keys = 1 << self.BAND_BITS
+        for band in range(self.BANDS):
+            keys = ((self.values >> np.uint64(band * self.BAND_BITS)) & np.uint64(n_keys - 1)).astype(np.intp)
+            order = np.argsort(keys, kind='stable')
+            self.keys.append(keys)
+            self.order.append(order)
+            self.sorted_values.append(self.values[order])
+            # Bucket of key k is order[starts[k]:starts[k + 1]]
+            self.starts.append(np.searchsorted(keys[order], np.arange(n_keys + 2)))
+
+    @classmethod
+    def band_key(cls, value: int, band: int) -> int:
+        return (value >> (band * cls.BAND_BITS)) & ((1 << cls.BAND_BITS) - 1)
+
+    @classmethod
+    @functools.lru_cache(maxsize=None)
+    def probe_masks(cls, radius: int) -> np.ndarray:
+        """All band-sized masks with at most `radius` bits set (computed once per radius)"""
+        masks = [0]
+        for _ in range(radius):
+            masks = sorted(set(masks) | {mask | (1 << bit) for mask in masks for bit in range(cls.BAND_BITS)})
+        masks = np.array(masks, dtype=np.intp)
+        masks.flags.writeable = False
+        return masks
+
+    def _gather(self, band: int, probes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Positions (in the band's sorted order) of the probed buckets, and each bucket's size"""
+        starts = self.starts[band]
+        first = starts[probes]
+        sizes = starts[probes + 1] - first
+        ends = np.cumsum(sizes)
+        if not len(ends) or not ends[-1]:
+            return np.empty(0, dtype=np.intp), sizes
+        # Consecutive positions within a bucket; jump to the next bucket's start at each boundary
+        nonempty = sizes > 0
+        first, ends, last = first[nonempty], ends[nonempty], (first + sizes - 1)[nonempty]
+        steps = np.ones(ends[-1], dtype=np.intp)
+        steps[0] = first[0]
+        steps[ends[:-1]] = first[1:] - last[:-1]
+        return np.cumsum(steps), sizes
+
+    def query(self, value: int, max_distance: int) -> List[int]:
+        """Return all stored hashes within max_distance of value"""
+        masks = self.probe_masks(max_distance // self.BANDS)
+        found = [self.order[band][self._gather(band, self.band_key(value, band) ^ masks)[0]]
+                 for band in range(self.BANDS)]
+        candidates = np.unique(np.concatenate(found))
+        near = popcount(self.values[candidates] ^ np.uint64(value)) <= max_distance
+        return self.values[candidates[near]].tolist()
+
+    def _probes(self, band: int, queries: np.ndarray, masks: np.ndarray) -> np.ndarray:
+        """Keys probed by each query; a pair of distinct keys is probed from the lower key only"""
+        own = self.keys[band][queries, None]
+        probes = own ^ masks
+        probes[probes < own] = self.EMPTY_KEY
+        return probes
+
+    def _probe_work(self, band: int, masks: np.ndarray) -> np.ndarray:
+        """Number of candidates (plus probes) each query expands to in a band"""
+        sizes = np.diff(self.starts[band])
+        step = max(1, self.PAIR_BLOCK // len(masks))
+        count = len(self.values)
+        return np.concatenate([
+            sizes[self._probes(band, np.arange(first, min(first + step, count)), masks)].sum(axis=1) + len(masks)
+            for first in range(0, count, step)
+        ])
+
+    def _probe_total(self, band: int, masks: np.ndarray) -> int:
+        """Sum of _probe_work over all queries, counted per key rather than per query"""
+        sizes = np.diff(self.starts[band])[:self.EMPTY_KEY]
+        keys = np.arange(self.EMPTY_KEY)
+        total = len(self.values) * len(masks)
+        for mask in masks.tolist():
+            partners = keys ^ mask
+            lower = keys <= partners
+            total += int(sizes[lower] @ sizes[partners[lower]])
+        return total
+
+    def _query_blocks(self, work: np.ndarray) -> List[Tuple[int, int]]:
+        """Split the queries into ranges of about PAIR_BLOCK work each"""
+        cuts = np.searchsorted(np.cumsum(work), np.arange(self.PAIR_BLOCK, work.sum(), self.PAIR_BLOCK))
+        bounds = [0] + sorted(set(cuts.tolist()) - {0}) + [len(work)]
+        return list(zip(bounds[:-1], bounds[1:]))
+
+    def _scan_pairs(self, max_distance: int):
+        """Yield the pairs within max_distance by comparing every pair, a block of rows at a time"""
+        count = len(self.values)
+        rows = max(1, self.PAIR_BLOCK // count)
+        for first in range(0, count, rows):
+            block = self.values[first:first + rows, None]
+            near = np.flatnonzero(popcount(block ^ self.values[first:]) <= max_distance)
+            i, j = np.divmod(near, count - first)
+            keep = j > i
+            yield i[keep] + first, j[keep] + first
+
+    def pairs(self, max_distance: int):
+        """
+        Yield (i, j) index arrays of all stored hash pairs within max_distance
+
+        Candidates are verified straight from the band's sorted copy of the
+        values, and only the few within max_distance are mapped back to
+        indices. Each pair is reported once, with i < j: from its lower band
+        key, and only in the first band whose keys are within the probe
+        radius. Queries are expanded in blocks of about PAIR_BLOCK
+        candidates, which bounds memory even when one bucket holds a large
+        share of all hashes.
+
+        When the bands prune too little (large distances, or hashes packed
+        into a few buckets), every pair is compared instead.
+        """
+        radius = max_distance // self.BANDS
+        masks = self.probe_masks(radius)
+        count = len(self.values)
+        if count < 2:
+            return
+        scan_cost = count * (count - 1) // 2
+        # Probing costs at least one step per probe; only total the buckets if that leaves a chance
+        if (count * len(masks) * self.BANDS * self.PROBE_COST > scan_cost
+                or sum(self._probe_total(band, masks) for band in range(self.BANDS)) * self.PROBE_COST > scan_cost):
+            yield from self._scan_pairs(max_distance)
+            return
+
+        for band in range(self.BANDS):
+            keys = self.keys[band]
+            for first, last in self._query_blocks(self._probe_work(band, masks)):
+                queries = np.arange(first, last)
+                positions, sizes = self._gather(band, self._probes(band, queries, masks).ravel())
+                counts = sizes.reshape(len(queries), len(masks)).sum(axis=1)
+                distances = popcount(self.sorted_values[band][positions] ^ np.repeat(self.values[queries], counts))
+                near = np.flatnonzero(distances <= max_distance)
+                i = queries[np.searchsorted(np.cumsum(counts), near, side='right')]
+                j = self.order[band][positions[near]]
+                keep = (keys[i] != keys[j]) | (i < j)
+                for earlier in range(band):
+                    keep &= popcount(self.keys[earlier][i] ^ self.keys[earlier][j]) > radius
+                yield np.minimum(i, j)[keep], np.maximum(i, j)[keep]
+
+
+def find_duplicate_clusters(sprites: List[SpriteInfo], max_distance: int = 0) -> List[List[int]]:
+    """
+    Group sprites whose perceptual hashes are within max_distance bits
+
+    Clusters are connected components: a chain of near matches joins one
+    cluster even if its ends differ by more than max_distance. Near pairs
+    come from a MultiIndexHash over the distinct hashes.
+
+    Args:
+        sprites: Analyzed sprites
+        max_distance: Maximum Hamming distance (0 = identical hashes only)
+
+    Returns:
+        Clusters of sprite indices (input order), only those with 2+ members
+    """
+    by_hash: Dict[int, List[int]] = defaultdict(list)
+    for idx, sprite in enumerate(sprites):
+        by_hash[int(sprite.hash, 16)].append(idx)
+    values = list(by_hash)
+
+    # Union-find over distinct hashes (by position in values)
+    parent = list(range(len(values)))
+
+    def find(node: int) -> int:
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    if max_distance > 0:
+        index = MultiIndexHash(values)
+        for first, second in index.pairs(max_distance):
+            for a, b in zip(first.tolist(), second.tolist()):
+                root_a, root_b = find(a), find(b)
+                if root_a != root_b:
+                    parent[root_b] = root_a
+
+    groups: Dict[int, List[int]] = defaultdict(list)
+    for node, value in enumerate(values):
+        groups[find(node)].extend(by_hash[value])
+
+    return sorted((sorted(indices) for indices in groups.values() if len(indices) > 1),
+                  key=lambda indices: indices[0])
+
+
+def find_duplicates(sprites: List[SpriteInfo], max_distance: int = 0) -> List[SpriteInfo]:
+    """
+    Find duplicate sprites based on perceptual hash
+
+    The first sprite of each cluster (input order) is kept; the others are
+    marked as duplicates of it.
+    """
+    for cluster in find_duplicate_clusters(sprites, max_distance):
+        first = sprites[cluster[0]]
+        for idx in cluster[1:]:
+            sprites[idx].is_duplicate = True
+            sprites[idx].duplicate_of = first.path
+
+    return sprites
+
 
+def duplicate_clusters(sprites: List[SpriteInfo]) -> List[Dict]:
+    """Describe duplicate clusters (as marked by find_duplicates) for JSON output"""
+    members: Dict[str, List[str]] = defaultdict(list)
     for sprite in sprites:
-        if sprite.hash in hash_map:
-            sprite.is_duplicate = True
-            sprite.duplicate_of = hash_map[sprite.hash]
-        else:
-            hash_map[sprite.hash] = sprite.path
+        if sprite.is_duplicate:
+            members[sprite.duplicate_of].append(sprite.path)
 
-    return sprites
+    return [
+        {'representative': path, 'size': len(duplicates) + 1, 'duplicates': duplicates}
+        for path, duplicates in members.items()
+    ]
+
+
+def analyze_sprite_safe(img_path: Path) -> Tuple[Optional[SpriteInfo], Optional[str]]:
+    """
+    analyze_sprite for worker processes
 
+    Returns:
+        (SpriteInfo, None) on success, (None, error message) on failure
+    """
+    try:
+        return analyze_sprite(img_path), None
+    except Exception as e:
+        return None, str(e)
 
-def analyze_directory(input_dir: Path, recursive: bool = True) -> List[SpriteInfo]:
-    """Analyze all sprites in a directory"""
+
+def iter_sprite_analysis(png_files: List[Path], workers: int = 1):
+    """
+    Analyze sprites serially or in a process pool
+
+    Yields (SpriteInfo or None, error or None) in png_files order. Files
+    are sent to workers in chunks so per-task overhead stays small next
+    to the ~100us analysis of a tile.
+
+    Args:
+        png_files: Sprite files to analyze
+        workers: Number of worker processes (1 = run in this process)
+    """
+    if workers <= 1 or len(png_files) <= 1:
+        yield from map(analyze_sprite_safe, png_files)
+        return
+
+    chunksize = max(1, min(256, len(png_files) // (workers * 4)))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        yield from pool.map(analyze_sprite_safe, png_files, chunksize=chunksize)
+
+
+class SpriteCache:
+    """
+    Persistent SQLite store of analyzed sprite features
+
+    Rows are keyed by absolute path and hold mtime, size and a SHA-256 of
+    the file. A row is reused when mtime and size match; when they do
+    not, the content hash decides, so touched but unchanged files are not
+    re-analyzed.
+    """
+
+    def __init__(self, db_path: Path):
+        self.db_path = db_path
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(db_path))
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS sprites (
+                path TEXT PRIMARY KEY,
+                mtime_ns INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                sha256 TEXT NOT NULL,
+                version INTEGER NOT NULL,
+                width INTEGER NOT NULL,
+                height INTEGER NOT NULL,
+                unique_colors INTEGER NOT NULL,
+                transparency_ratio REAL NOT NULL,
+                brightness REAL NOT NULL,
+                category TEXT NOT NULL,
+                hash TEXT NOT NULL
+            )
+        ''')
+        self.hits = 0
+        self.misses = 0
+        self._pending: List[tuple] = []
+
+    def close(self):
+        """Write pending rows and close the database"""
+        self.flush()
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    @staticmethod
+    def file_hash(filepath: Path) -> str:
+        """SHA-256 of a file's contents"""
+        with open(filepath, 'rb') as f:
+            return hashlib.sha256(f.read()).hexdigest()
+
+    def lookup(self, img_path: Path) -> Tuple[Optional[SpriteInfo], Optional[str]]:
+        """
+        Find cached features for a sprite
+
+        Returns:
+            (SpriteInfo, None) on a hit; (None, content hash or None) on a
+            miss, the hash being reusable by store()
+        """
+        key = str(img_path.resolve())
+        stat = img_path.stat()
+        row = self.conn.execute(
+            'SELECT mtime_ns, size, sha256, version, width, height, unique_colors,'
+            ' transparency_ratio, brightness, category, hash FROM sprites WHERE path = ?',
+            (key,)).fetchone()
+
+        digest = None
+        if row is not None and row[3] == FEATURE_VERSION:
+            if (row[0], row[1]) != (stat.st_mtime_ns, stat.st_size):
+                digest = self.file_hash(img_path)
+                if digest != row[2]:
+                    self.misses += 1
+                    return None, digest
+                # Same content, new mtime: refresh the row's stat fields
+                self.conn.execute('UPDATE sprites SET mtime_ns = ?, size = ? WHERE path = ?',
+                                  (stat.st_mtime_ns, stat.st_size, key))
+
+            self.hits += 1
+            return SpriteInfo(str(img_path), *row[4:]), None
+
+        self.misses += 1
+        return None, digest
+
+    def store(self, img_path: Path, info: SpriteInfo, digest: Optional[str] = None):
+        """Queue features of a freshly analyzed sprite (written by flush)"""
+        stat = img_path.stat()
+        if digest is None:
+            digest = self.file_hash(img_path)
+        self._pending.append((
+            str(img_path.resolve()), stat.st_mtime_ns, stat.st_size, digest, FEATURE_VERSION,
+            info.width, info.height, info.unique_colors,
+            info.transparency_ratio, info.brightness, info.category, info.hash,
+        ))
+
+    def flush(self):
+        """Write queued rows in one transaction"""
+        with self.conn:
+            self.conn.executemany(
+                'INSERT OR REPLACE INTO sprites VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                self._pending)
+        self._pending = []
+
+
+def analyze_directory(input_dir: Path, recursive: bool = True,
+                      workers: int = 1, cache: Optional[SpriteCache] = None,
+                      max_distance: int = 0) -> List[SpriteInfo]:
+    """
+    Analyze all sprites in a directory
+
+    Args:
+        input_dir: Directory to scan for PNG files
+        recursive: Include subdirectories
+        workers: Number of worker processes for analysis
+        cache: Optional SpriteCache; only uncached sprites are analyzed
+        max_distance: Hash distance up to which sprites count as duplicates
+    """
     pattern = '**/*.png' if recursive else '*.png'
     png_files = list(input_dir.glob(pattern))
 
     print(f"Found {len(png_files)} PNG files in {input_dir}")
 
+    cached: List[Optional[SpriteInfo]] = [None] * len(png_files)
+    digests: Dict[int, Optional[str]] = {}
+    if cache is not None:
+        for i, png in enumerate(png_files):
+            cached[i], digests[i] = cache.lookup(png)
+        print(f"Feature cache: {cache.hits} cached, {cache.misses} to analyze")
+
+    pending = [png for png, info in zip(png_files, cached) if info is None]
+    if workers > 1 and pending:
+        print(f"Analyzing with {workers} worker processes")
+
     sprites: List[SpriteInfo] = []
 
+    results = iter_sprite_analysis(pending, workers)
     for i, png in enumerate(png_files):
         if (i + 1) % 1000 == 0:
             print(f"  Analyzed {i + 1}/{len(png_files)} sprites...")
 
-        try:
-            info = analyze_sprite(png)
-            sprites.append(info)
-        except Exception as e:
-            print(f"  [ERROR] {png}: {e}")
+        info = cached[i]
+        if info is None:
+            info, error = next(results)
+            if info is None:
+                print(f"  [ERROR] {png}: {error}")
+                continue
+            if cache is not None:
+                cache.store(png, info, digests.get(i))
+
+        sprites.append(info)
+
+    if cache is not None:
+        cache.flush()
 
     # Find duplicates
-    sprites = find_duplicates(sprites)
+    sprites = find_duplicates(sprites, max_distance)
 
     return sprites
 
 
+def sprite_table(sprites: List[SpriteInfo]) -> np.ndarray:
+    """Convert sprites to a structured array with SPRITE_DTYPE columns"""
+    row = attrgetter(*(f.name for f in fields(SpriteInfo)))
+    return np.array([row(sprite) for sprite in sprites], dtype=SPRITE_DTYPE)
+
+
 def generate_report(sprites: List[SpriteInfo]) -> Dict:
-    """Generate classification report"""
-    categories: Dict[str, List[SpriteInfo]] = defaultdict(list)
+    """
+    Generate classification report
 
-    for sprite in sprites:
-        categories[sprite.category].append(sprite)
+    Per-category counts and sums are grouped reductions (np.bincount)
+    over the columnar sprite table rather than repeated list scans.
+    bincount adds weights in input order, so averages match a plain
+    per-category sum exactly.
+    """
+    table = sprite_table(sprites)
+    duplicate = table['is_duplicate']
 
     report = {
-        'total_sprites': len(sprites),
-        'unique_sprites': sum(1 for s in sprites if not s.is_duplicate),
-        'duplicate_sprites': sum(1 for s in sprites if s.is_duplicate),
+        'total_sprites': len(table),
+        'unique_sprites': int(np.count_nonzero(~duplicate)),
+        'duplicate_sprites': int(np.count_nonzero(duplicate)),
         'categories': {},
     }
 
-    for cat_name, cat_sprites in sorted(categories.items()):
-        unique_in_cat = [s for s in cat_sprites if not s.is_duplicate]
-
-        avg_colors = sum(s.unique_colors for s in cat_sprites) / len(cat_sprites)
-        avg_brightness = sum(s.brightness for s in cat_sprites) / len(cat_sprites)
-
-        # Get example paths (first 5)
-        examples = [s.path for s in unique_in_cat[:5]]
+    # Category codes in sorted name order
+    names, codes = np.unique(table['category'], return_inverse=True)
+    codes = codes.ravel()
+    n_categories = len(names)
+    counts = np.bincount(codes, minlength=n_categories)
+    unique_counts = np.bincount(codes[~duplicate], minlength=n_categories)
+    color_sums = np.bincount(codes, weights=table['unique_colors'], minlength=n_categories)
+    brightness_sums = np.bincount(codes, weights=table['brightness'], minlength=n_categories)
+
+    # First 5 unique sprites per category (stable sort keeps input order)
+    unique_rows = np.flatnonzero(~duplicate)
+    unique_rows = unique_rows[np.argsort(codes[unique_rows], kind='stable')]
+    starts = np.searchsorted(codes[unique_rows], np.arange(n_categories))
+
+    for code, cat_name in enumerate(names.tolist()):
+        count = int(counts[code])
+        unique_count = int(unique_counts[code])
+        examples = table['path'][unique_rows[starts[code]:starts[code] + min(unique_count, 5)]]
 
         report['categories'][cat_name] = {
             'description': CATEGORIES.get(cat_name, {}).get('description', ''),
-            'count': len(cat_sprites),
-            'unique_count': len(unique_in_cat),
-            'duplicate_count': len(cat_sprites) - len(unique_in_cat),
-            'avg_colors': round(avg_colors, 1),
-            'avg_brightness': round(avg_brightness, 3),
-            'examples': examples,
+            'count': count,
+            'unique_count': unique_count,
+            'duplicate_count': count - unique_count,
+            'avg_colors': round(float(color_sums[code]) / count, 1),
+            'avg_brightness': round(float(brightness_sums[code]) / count, 3),
+            'examples': examples.tolist(),
         }
 
     return report
 
 
-def organize_by_category(sprites: List[SpriteInfo], output_dir: Path,
-                         copy_files: bool = True) -> Dict[str, int]:
-    """Organize sprites into category folders"""
-    import shutil
+def export_table(sprites: List[SpriteInfo], output_path: Path) -> bool:
+    """
+    Export per-sprite features for notebooks
 
-    output_dir.mkdir(parents=True, exist_ok=True)
+    The format follows the file suffix: .parquet (requires pyarrow) or
+    anything else as CSV.
 
-    counts: Dict[str, int] = defaultdict(int)
+    Returns:
+        True if the file was written
+    """
+    table = sprite_table(sprites)
+    columns = {name: table[name].tolist() for name in SPRITE_DTYPE.names}
+    output_path.parent.mkdir(parents=True, exist_ok=True)
 
-    for sprite in sprites:
-        if sprite.is_duplicate:
-            continue  # Skip duplicates
+    if output_path.suffix.lower() == '.parquet':
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            print("Error: pyarrow is required for Parquet export.")
+            print("Install with: pip install pyarrow")
+            return False
+        pq.write_table(pa.table(columns), str(output_path))
+    else:
+        with open(output_path, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(SPRITE_DTYPE.names)
+            writer.writerows(zip(*columns.values()))
+
+    return True
+
+
+def place_sprites(placements: List[Tuple[Path, Path]], link_mode: str = 'copy') -> int:
+    """
+    Copy or link sprites into place, reporting per-file link fallbacks
+
+    Args:
+        placements: (source, destination) pairs; destination dirs must exist
+        link_mode: One of LINK_MODES
+
+    Returns:
+        Number of files placed
+    """
+    fallbacks = 0
+    for src, dst in placements:
+        if link_file(src, dst, link_mode) != link_mode:
+            fallbacks += 1
+
+    if fallbacks:
+        print(f"  [WARN] {fallbacks:,} of {len(placements):,} files could not be "
+              f"{link_mode}ed and were copied instead")
+    return len(placements)
 
-        cat_dir = output_dir / sprite.category
-        cat_dir.mkdir(exist_ok=True)
 
-        src = Path(sprite.path)
-        dst = cat_dir / src.name
+def organize_by_category(sprites: List[SpriteInfo], output_dir: Path,
+                         copy_files: bool = True, link_mode: str = 'copy') -> Dict[str, int]:
+    """
+    Organize sprites into category folders
+
+    Args:
+        sprites: Analyzed sprites (duplicates are skipped)
+        output_dir: Root directory for the category folders
+        copy_files: Place files (False = only count)
+        link_mode: One of LINK_MODES; linking falls back to copy per file
+    """
+    unique = [sprite for sprite in sprites if not sprite.is_duplicate]
+
+    # Create every category directory once, up front
+    for category in sorted({sprite.category for sprite in unique}):
+        (output_dir / category).mkdir(parents=True, exist_ok=True)
 
-        if copy_files:
-            shutil.copy2(src, dst)
+    counts: Dict[str, int] = defaultdict(int)
+    placements: List[Tuple[Path, Path]] = []
 
+    for sprite in unique:
+        src = Path(sprite.path)
+        placements.append((src, output_dir / sprite.category / src.name))
         counts[sprite.category] += 1
 
+    if copy_files:
+        place_sprites(placements, link_mode)
+
     return dict(counts)
 
 
-def extract_unique_sprites(sprites: List[SpriteInfo], output_dir: Path) -> int:
+def extract_unique_sprites(sprites: List[SpriteInfo], output_dir: Path,
+                           link_mode: str = 'copy') -> int:
     """Extract only unique sprites (no duplicates)"""
-    import shutil
-
     output_dir.mkdir(parents=True, exist_ok=True)
 
-    count = 0
-    for sprite in sprites:
-        if sprite.is_duplicate:
-            continue
-
-        src = Path(sprite.path)
-        dst = output_dir / src.name
-
-        shutil.copy2(src, dst)
-        count += 1
+    placements = [(Path(sprite.path), output_dir / Path(sprite.path).name)
+                  for sprite in sprites if not sprite.is_duplicate]
 
-    return count
+    return place_sprites(placements, link_mode)
 
 
 def print_report(report: Dict):
@@ -324,6 +838,47 @@ def print_report(report: Dict):
                 print(f"    - {Path(ex).name}")
 
 
+def add_analysis_arguments(parser: argparse.ArgumentParser):
+    """Options shared by every command that analyzes sprites"""
+    parser.add_argument('--workers', '-w', type=int, default=1,
+                        help='Worker processes for sprite analysis (default: 1)')
+    parser.add_argument('--cache', type=Path,
+                        help=f'Feature cache file (default: <input>/{CACHE_FILENAME})')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Analyze every sprite without reading or updating the cache')
+    parser.add_argument('--max-distance', '-d', type=int, default=0,
+                        help='Treat sprites whose 64-bit hashes differ in at most this many bits '
+                             'as duplicates (default: 0 = identical hashes)')
+    parser.add_argument('--clusters', type=Path,
+                        help='Output path for duplicate clusters (JSON)')
+    parser.add_argument('--table', type=Path,
+                        help='Export per-sprite features to .csv or .parquet')
+
+
+def load_sprites(args) -> List[SpriteInfo]:
+    """Analyze args.input using the feature cache unless --no-cache"""
+    if args.no_cache:
+        sprites = analyze_directory(args.input, workers=args.workers,
+                                    max_distance=args.max_distance)
+    else:
+        with SpriteCache(args.cache or args.input / CACHE_FILENAME) as cache:
+            sprites = analyze_directory(args.input, workers=args.workers, cache=cache,
+                                        max_distance=args.max_distance)
+
+    if args.clusters:
+        clusters = duplicate_clusters(sprites)
+        args.clusters.parent.mkdir(parents=True, exist_ok=True)
+        with open(args.clusters, 'w', encoding='utf-8') as f:
+            json.dump({'max_distance': args.max_distance, 'clusters': clusters},
+                      f, indent=2, ensure_ascii=False)
+        print(f"{len(clusters):,} duplicate clusters saved to: {args.clusters}")
+
+    if args.table and export_table(sprites, args.table):
+        print(f"Feature table saved to: {args.table}")
+
+    return sprites
+
+
 def main():
     parser = argparse.ArgumentParser(
         description='FQ4 Sprite Classifier - Automatic sprite categorization'
@@ -339,8 +894,11 @@ def main():
                                 help='Output directory for classified sprites')
     analyze_parser.add_argument('--no-copy', action='store_true',
                                 help='Skip copying files, only generate report')
+    analyze_parser.add_argument('--link-mode', choices=LINK_MODES, default='copy',
+                                help='How to place sprites in category folders (default: copy)')
     analyze_parser.add_argument('--report', '-r', type=Path,
                                 help='Output path for JSON report')
+    add_analysis_arguments(analyze_parser)
 
     # Report command
     report_parser = subparsers.add_parser('report', help='Generate classification report')
@@ -348,6 +906,7 @@ def main():
                                help='Input directory with sprites')
     report_parser.add_argument('--output', '-o', type=Path,
                                help='Output path for JSON report')
+    add_analysis_arguments(report_parser)
 
     # Extract unique command
     unique_parser = subparsers.add_parser('extract-unique',
@@ -356,6 +915,9 @@ def main():
                                help='Input directory with sprites')
     unique_parser.add_argument('--output', '-o', type=Path, required=True,
                                help='Output directory for unique sprites')
+    unique_parser.add_argument('--link-mode', choices=LINK_MODES, default='copy',
+                               help='How to place unique sprites (default: copy)')
+    add_analysis_arguments(unique_parser)
 
     args = parser.parse_args()
 
@@ -367,14 +929,15 @@ def main():
         print(f"\n=== FQ4 Sprite Classifier ===")
         print(f"Input: {args.input}")
 
-        sprites = analyze_directory(args.input)
+        sprites = load_sprites(args)
         report = generate_report(sprites)
 
         print_report(report)
 
         if args.output and not args.no_copy:
             print(f"\nOrganizing sprites into {args.output}...")
-            counts = organize_by_category(sprites, args.output, copy_files=True)
+            counts = organize_by_category(sprites, args.output, copy_files=True,
+                                          link_mode=args.link_mode)
             print("Category file counts:")
             for cat, count in sorted(counts.items()):
                 print(f"  {cat}: {count}")
@@ -388,7 +951,7 @@ def main():
     elif args.command == 'report':
         print(f"\n=== FQ4 Sprite Classification Report ===")
 
-        sprites = analyze_directory(args.input)
+        sprites = load_sprites(args)
         report = generate_report(sprites)
 
         print_report(report)
@@ -404,8 +967,8 @@ def main():
         print(f"Input: {args.input}")
         print(f"Output: {args.output}")
 
-        sprites = analyze_directory(args.input)
-        count = extract_unique_sprites(sprites, args.output)
+        sprites = load_sprites(args)
+        count = extract_unique_sprites(sprites, args.output, args.link_mode)
 
         print(f"\nExtracted {count:,} unique sprites to {args.output}")
 
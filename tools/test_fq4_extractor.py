@@ -0,0 +1,469 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the fq4_extractor decoders
+Checks the vectorized code paths against the original scalar loops
+
+Test data comes from the sprite sheets shipped under godot/assets/sprites.
+They are exact 4x nearest-neighbour copies of the CHR tiles, so sampling
+every 4th pixel gives back the original 8x8 tiles and their 16 colors.
+
+Usage:
+    python tools/test_fq4_extractor.py
+    python -m pytest tools/test_fq4_extractor.py
+"""
+
+import functools
+import json
+import random
+import struct
+import subprocess
+import sys
+import tempfile
+import traceback
+from pathlib import Path
+
+try:
+    from PIL import Image
+    import numpy as np
+except ImportError:
+    print("Error: PIL/Pillow and numpy are required.")
+    print("Install with: pip install Pillow numpy")
+    sys.exit(1)
+
+sys.path.insert(0, str(Path(__file__).parent))
+from fq4_extractor import (BitReader, CHRDecoder, RGBEDecoder, assemble_tile_sheet,
+                           decode_planar_tiles, dedup_tiles, indexed_image)
+from chr_extractor import CHRExtractor
+
+SPRITE_DIR = Path(__file__).resolve().parent.parent / 'godot' / 'assets' / 'sprites'
+
+
+@functools.lru_cache(maxsize=None)
+def load_sheet(sheet: str) -> np.ndarray:
+    """
+    Recover the 2D palette index buffer of a 4x sheet
+
+    Colors are numbered in sorted order, which puts black at index 0.
+    """
+    pixels = np.asarray(Image.open(SPRITE_DIR / sheet).convert('RGBA'))[::4, ::4]
+    rgba = np.ascontiguousarray(pixels).view('>u4')[..., 0]
+    colors, indices = np.unique(rgba, return_inverse=True)
+    assert len(colors) <= 16, f"{sheet}: {len(colors)} colors"
+    return indices.reshape(rgba.shape).astype(np.uint8)
+
+
+def load_sheet_tiles(sheet: str, tile_size: int = 8) -> np.ndarray:
+    """Split a 4x sheet into (n_tiles, tile_size, tile_size) palette indices"""
+    indices = load_sheet(sheet)
+    rows, cols = indices.shape[0] // tile_size, indices.shape[1] // tile_size
+    tiles = indices[:rows * tile_size, :cols * tile_size].reshape(rows, tile_size, cols, tile_size)
+    return tiles.transpose(0, 2, 1, 3).reshape(-1, tile_size, tile_size)
+
+
+def screen_planes(tiles: np.ndarray):
+    """Lay 1000 tiles out as a 320x200 screen and split it into B, G, R, E planes"""
+    screen = tiles[:1000].reshape(25, 40, 8, 8).transpose(0, 2, 1, 3).reshape(200, 320)
+    planes = [np.packbits((screen >> bit) & 1, axis=1).tobytes() for bit in (3, 2, 1, 0)]
+    return screen, planes
+
+
+def encode_planar_tiles(tiles: np.ndarray) -> bytes:
+    """Inverse of decode_planar_tiles: 4 bitplanes per tile, plane 0 = bit 0"""
+    planes = np.stack([(tiles >> bit) & 1 for bit in range(4)], axis=1)
+    return np.packbits(planes, axis=3).tobytes()
+
+
+def scalar_planar_tile(data: bytes, width: int, height: int) -> list:
+    """Original per-pixel planar tile decoder (CHRExtractor.decode_planar_tile)"""
+    pixels = []
+    bytes_per_row = width // 8
+    bytes_per_plane = height * bytes_per_row
+
+    for row in range(height):
+        for col in range(width):
+            pixel = 0
+            byte_in_row = col // 8
+            bit_in_byte = 7 - (col % 8)  # MSB first
+
+            for plane in range(4):
+                byte_offset = plane * bytes_per_plane + row * bytes_per_row + byte_in_row
+                if byte_offset < len(data):
+                    pixel |= ((data[byte_offset] >> bit_in_byte) & 1) << plane
+
+            pixels.append(pixel)
+
+    return pixels
+
+
+def scalar_read_codes(data: bytes, width: int, bit_order: str = 'lsb') -> list:
+    """Original one-bit-at-a-time code reader from decompress_type9, any width"""
+    codes = []
+    bit_pos = 0
+    byte_idx = 0
+    while True:
+        val = 0
+        for i in range(width):
+            if byte_idx >= len(data):
+                return codes
+            if bit_order == 'lsb':
+                val |= ((data[byte_idx] >> bit_pos) & 1) << i
+            else:
+                val = (val << 1) | ((data[byte_idx] >> (7 - bit_pos)) & 1)
+            bit_pos += 1
+            if bit_pos >= 8:
+                bit_pos = 0
+                byte_idx += 1
+        codes.append(val)
+
+
+def scalar_decompress_type9(data: bytes, plane_size: int = 8000) -> bytes:
+    """Original Type 9 decoder loop, reading 9-bit codes one bit at a time"""
+    table_size = struct.unpack('<H', data[4:6])[0]
+    flag_table = data[6:6 + table_size]
+    entries = [struct.unpack('<H', flag_table[i:i + 2])[0]
+               for i in range(0, min(1024, len(flag_table)) - 1, 2)]
+
+    result = bytearray()
+    for code in scalar_read_codes(data[6 + table_size:], 9):
+        if len(result) >= plane_size:
+            break
+        if code == 0:
+            continue
+        if code >= len(entries):
+            break
+
+        hi, lo = entries[code] >> 8, entries[code] & 0xFF
+        if hi == 0xFF:
+            if lo == 0xFF:
+                break
+            if lo == 0x00:
+                result.append(0)
+            else:
+                result.extend([result[-1] if result else 0] * (lo + 3))
+        else:
+            result.append(lo)
+
+    return bytes(result)
+
+
+def scalar_decompress_type7(data: bytes, plane_size: int = 8000) -> bytes:
+    """Original Type 7 decoder loop (grows a bytearray, no clipping)"""
+    result = bytearray()
+    i = 2
+    while i < len(data) and len(result) < plane_size:
+        control = data[i]
+        i += 1
+        if control >= 0x80:
+            if i < len(data):
+                result.extend([data[i]] * (control - 0x7F))
+                i += 1
+        else:
+            count = control + 1
+            if i + count > len(data):
+                break
+            result.extend(data[i:i + count])
+            i += count
+    return bytes(result)
+
+
+def test_combine_planes_matches_reference():
+    """combine_planes: NumPy engine matches the per-bit reference loop"""
+    screen, planes = screen_planes(load_sheet_tiles('characters/fq4_4x.png'))
+    decoder = RGBEDecoder('unused')
+
+    fast = decoder.combine_planes_numpy(planes)
+    assert fast.tobytes() == decoder.combine_planes_reference(planes)
+    assert np.array_equal(fast, screen)
+
+
+def test_combine_planes_short_planes():
+    """combine_planes: truncated planes decode like the reference loop"""
+    _, planes = screen_planes(load_sheet_tiles('characters/fq4_4x.png'))
+    decoder = RGBEDecoder('unused')
+
+    for lengths in ((8000, 7999, 4000, 0), (3000, 8000, 8000, 8000), (0, 0, 0, 0)):
+        cut = [plane[:length] for plane, length in zip(planes, lengths)]
+        assert decoder.combine_planes_numpy(cut).tobytes() == decoder.combine_planes_reference(cut)
+
+
+def test_decode_planar_tiles_matches_scalar():
+    """decode_planar_tiles: matches the per-pixel decoder on real tiles"""
+    data = encode_planar_tiles(load_sheet_tiles('characters/fq4p_4x.png'))
+
+    for width, height in ((8, 8), (16, 16), (16, 8)):
+        size = 4 * height * width // 8
+        tiles = decode_planar_tiles(data, width, height)
+        assert tiles.shape == (len(data) // size, height, width)
+        for i, tile in enumerate(tiles):
+            assert tile.ravel().tolist() == scalar_planar_tile(data[i * size:(i + 1) * size],
+                                                                width, height)
+
+
+def test_decode_planar_tiles_partial_tile():
+    """decode_planar_tiles: trailing bytes that do not fill a tile are ignored"""
+    tiles = load_sheet_tiles('characters/fq4p_4x.png')[:10]
+    data = encode_planar_tiles(tiles)
+
+    assert np.array_equal(decode_planar_tiles(data + b'\xff' * 31), tiles)
+    assert decode_planar_tiles(data[:31]).shape == (0, 8, 8)
+
+
+def test_single_tile_wrappers():
+    """decode_tile / decode_planar_tile: single-tile wrappers match the scalar decoder"""
+    data = encode_planar_tiles(load_sheet_tiles('effects/magic_4x.png'))
+    decoder = CHRDecoder(Path('unused.chr'))
+    decoder.data = data
+    extractor = CHRExtractor.__new__(CHRExtractor)
+
+    for offset in range(0, len(data), 32 * 37):
+        expected = scalar_planar_tile(data[offset:offset + 32], 8, 8)
+        assert decoder.decode_tile(offset) == expected
+        assert extractor.decode_planar_tile(data[offset:offset + 32], 8, 8) == expected
+
+    # A short tile reads missing bytes as 0
+    short = data[:20]
+    assert extractor.decode_planar_tile(short, 8, 8) == scalar_planar_tile(short, 8, 8)
+    assert decoder.decode_tile(len(data) - 16) == [0] * 64
+
+
+def test_assemble_tile_sheet_rebuilds_sheet():
+    """assemble_tile_sheet: real tiles lay out back into the original sheet"""
+    sheet = load_sheet('characters/fq4p_4x.png')
+    assert np.array_equal(assemble_tile_sheet(load_sheet_tiles('characters/fq4p_4x.png')), sheet)
+
+
+def test_sprite_sheet_matches_putpixel():
+    """assemble_tile_sheet: same image as the old putpixel loop, partial last row padded"""
+    tiles = load_sheet_tiles('effects/magic_4x.png')[:45]
+    palette = [(i * 16, i * 4, 255 - i * 16) for i in range(16)]
+    columns = 16
+    rows = (len(tiles) + columns - 1) // columns
+
+    expected = Image.new('P', (columns * 8, rows * 8), color=0)
+    for tile_idx, tile in enumerate(tiles):
+        x_offset, y_offset = tile_idx % columns * 8, tile_idx // columns * 8
+        for y in range(8):
+            for x in range(8):
+                expected.putpixel((x_offset + x, y_offset + y), int(tile[y, x]))
+
+    img = indexed_image(assemble_tile_sheet(tiles, columns), palette)
+    assert img.mode == 'P' and img.size == expected.size
+    assert np.array_equal(np.asarray(img), np.asarray(expected))
+    assert img.getpalette()[:48] == [c for color in palette for c in color]
+
+    # create_sprite_sheet still accepts a list of tile images
+    tile_images = [Image.fromarray(tile, 'L').convert('P') for tile in tiles]
+    sheet = CHRDecoder(Path('unused.chr')).create_sprite_sheet(tile_images, columns)
+    assert np.array_equal(np.asarray(sheet), np.asarray(expected))
+
+
+def test_bit_reader_matches_bit_loop():
+    """BitReader: read and read_codes match the one-bit-at-a-time loop"""
+    data = encode_planar_tiles(load_sheet_tiles('characters/fq4p_4x.png'))[:3001]
+
+    for bit_order in BitReader.BIT_ORDERS:
+        for width in (1, 3, 7, 8, 9, 13, 16, 31, 32):
+            expected = scalar_read_codes(data, width, bit_order)
+            assert BitReader(data, bit_order).read_codes(width).tolist() == expected
+
+            # Single reads, then a bulk read of the rest from the same position
+            reader = BitReader(data, bit_order)
+            head = [reader.read(width) for _ in range(5)]
+            assert head + reader.read_codes(width).tolist() == expected
+            assert reader.read(width) is None
+            assert reader.bits_remaining < width
+
+
+def test_bit_reader_counts_and_arguments():
+    """BitReader: count limits, seek, and argument validation"""
+    data = bytes(range(256))
+    reader = BitReader(data)
+    assert reader.read_codes(9, count=0).tolist() == []
+    assert reader.read_codes(9, count=4).tolist() == scalar_read_codes(data, 9)[:4]
+    assert reader.pos == 36
+    reader.seek(0)
+    assert len(reader.read_codes(8, count=10_000)) == 256
+
+    for width in (0, -1, 33):
+        for call in (lambda: reader.read(width), lambda: reader.read_codes(width)):
+            try:
+                call()
+            except ValueError:
+                pass
+            else:
+                raise AssertionError(f"width {width} accepted")
+    try:
+        reader.read_codes(8, count=-1)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("negative count accepted")
+    try:
+        BitReader(data, bit_order='middle')
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("unknown bit order accepted")
+
+
+def test_decompress_type9_matches_bit_loop():
+    """decompress_type9: same output as the bit-loop decoder"""
+    # Literal entries, zero/run commands, an unknown entry type, no end marker
+    entries = [0x0000] + list(range(1, 256)) + [0xFF00] + [0xFF00 | (i % 31 + 1) for i in range(200)]
+    entries += [0x1200 | i for i in range(512 - len(entries))]
+    table = struct.pack(f'<{len(entries)}H', *entries)
+    payload = encode_planar_tiles(load_sheet_tiles('effects/magic_4x.png'))
+    decoder = RGBEDecoder('unused')
+
+    for body in (payload, payload[:977], struct.pack('<H', 0x1FF) + payload):
+        data = struct.pack('<HHH', 9, 0, len(table)) + table + body
+        assert decoder.decompress_type9(data) == scalar_decompress_type9(data)
+
+    # End marker stops decoding
+    ended = struct.pack('<HHH', 9, 0, 8) + struct.pack('<4H', 0, 0x41, 0xFFFF, 0x42)
+    codes = bytes([0b00000001, 0b00000100, 0b00001100, 0b00000000])  # 1, 2, 3 as 9-bit LSB
+    assert decoder.decompress_type9(ended + codes) == b'A'
+
+
+def type7_planes():
+    """Raw planes covering literal blocks, long runs and run-length edges"""
+    rng = random.Random(7)
+    _, screen = screen_planes(load_sheet_tiles('characters/fq4_4x.png'))
+    _, fonts = screen_planes(load_sheet_tiles('ui/bigfont_4x.png'))
+    planes = screen + fonts
+    planes.append(bytes(8000))                                        # long repeat runs
+    planes.append(bytes(rng.randrange(256) for _ in range(8000)))     # incompressible
+    planes.append(bytes((i // 2) & 0xFF for i in range(8000)))        # pairs, below min_run
+    edges = bytearray()
+    for run in (1, 2, 3, 127, 128, 129, 130, 255, 256, 257):
+        edges += bytes([run & 0xFF]) * run + bytes(rng.randrange(256) for _ in range(run % 7))
+    planes.append(bytes(edges[:8000]))
+    return planes
+
+
+def test_type7_round_trip():
+    """Type 7 RLE: decode(encode(plane)) == plane for real and edge-case planes"""
+    decoder = RGBEDecoder('unused')
+    for plane in type7_planes():
+        for min_run in (1, 2, 3, 5):
+            packed = decoder.compress_type7_rle(plane, min_run)
+            assert packed[:2] == struct.pack('<H', 7)
+            assert decoder.decompress_type7_rle(packed) == plane
+            assert scalar_decompress_type7(packed) == plane
+
+    # All-zero plane: full 128-byte runs
+    packed = decoder.compress_type7_rle(bytes(8000))
+    assert packed[2:4] == bytes([0xFF, 0x00]) and len(packed) == 2 + 2 * 63
+
+
+def test_type7_plane_boundary():
+    """Type 7 RLE: a block overrunning plane_size is clipped to the plane"""
+    decoder = RGBEDecoder('unused')
+    header = struct.pack('<H', 7)
+    rng = random.Random(128)
+
+    for fill in (7872, 7873, 7950, 7999):
+        literals = bytes(rng.randrange(256) for _ in range(fill))
+        prefix = decoder.compress_type7_rle(literals)[2:]
+        tails = (bytes([0xFF, 0xAB]),                                  # 128-byte run
+                 bytes([0x7F]) + bytes(range(128)),                    # 128-byte literal block
+                 bytes([0xFF, 0xCD]) * 3)                              # runs past the end
+        for tail in tails:
+            stream = header + prefix + tail
+            out = decoder.decompress_type7_rle(stream)
+            assert len(out) == 8000
+            assert out == scalar_decompress_type7(stream)[:8000]
+
+
+def test_type7_truncated_stream():
+    """Type 7 RLE: truncated streams decode like the original loop"""
+    decoder = RGBEDecoder('unused')
+    packed = decoder.compress_type7_rle(type7_planes()[0])
+    for cut in (0, 2, 3, 50, 51, len(packed) // 2, len(packed) - 1):
+        assert decoder.decompress_type7_rle(packed[:cut]) == scalar_decompress_type7(packed[:cut])
+    # A run whose value byte is missing is dropped
+    assert decoder.decompress_type7_rle(struct.pack('<H', 7) + bytes([0x02, 1, 2, 3, 0x90])) == bytes([1, 2, 3])
+
+
+def test_pack_plane_command():
+    """pack-plane: packs a raw plane into a Type 7 file that decodes back"""
+    plane = type7_planes()[1]
+    with tempfile.TemporaryDirectory() as tmp:
+        raw_path = Path(tmp) / 'FQOP_01_R.bin'
+        out_path = Path(tmp) / 'mod' / 'FQOP_01.R_'
+        raw_path.write_bytes(plane)
+
+        result = subprocess.run([sys.executable, str(Path(__file__).parent / 'fq4_extractor.py'),
+                                 'pack-plane', str(raw_path), str(out_path)],
+                                capture_output=True, text=True)
+        assert result.returncode == 0, result.stdout + result.stderr
+        assert RGBEDecoder('unused').decompress_type7_rle(out_path.read_bytes()) == plane
+
+
+def test_dedup_tiles_round_trip():
+    """dedup_tiles: unique tiles plus the tile map rebuild the original sheets exactly"""
+    for sheet in ('characters/fq4_4x.png', 'characters/fq4p_4x.png', 'ui/bigfont_4x.png'):
+        tiles = load_sheet_tiles(sheet)
+        data = encode_planar_tiles(tiles)
+        for flips in (False, True):
+            result = dedup_tiles(data, flips=flips)
+            assert np.array_equal(result.tiles, tiles[result.first])
+            assert np.array_equal(result.restore(), tiles), (sheet, flips)
+            assert np.array_equal(assemble_tile_sheet(result.restore()), load_sheet(sheet)), (sheet, flips)
+
+            # The saved JSON tile map alone is enough to undo the dedup
+            tile_map = json.loads(json.dumps(result.tile_map(sheet, flips)))
+            rebuilt = result.tiles[tile_map['index']]
+            for tile_idx, flip in enumerate(tile_map.get('flip', [])):
+                if flip & tile_map['flip_flags']['h']:
+                    rebuilt[tile_idx] = rebuilt[tile_idx][:, ::-1]
+                if flip & tile_map['flip_flags']['v']:
+                    rebuilt[tile_idx] = rebuilt[tile_idx][::-1]
+            assert np.array_equal(assemble_tile_sheet(rebuilt), load_sheet(sheet)), (sheet, flips)
+
+    tiles = load_sheet_tiles('characters/fq4p_4x.png', 16)
+    result = dedup_tiles(encode_planar_tiles(tiles), 16, 16, flips=True)
+    assert np.array_equal(result.restore(), tiles)
+
+
+def test_dedup_tiles_matches_pixel_dedup():
+    """dedup_tiles: merges exactly the tiles with equal pixels (or mirrored pixels, with flips)"""
+    for sheet in ('characters/fq4_4x.png', 'effects/magic_4x.png'):
+        tiles = load_sheet_tiles(sheet)
+        data = encode_planar_tiles(tiles)
+        for flips in (False, True):
+            ids = {}
+            expected = []
+            for tile in tiles:
+                key = tile.tobytes()
+                if flips:
+                    key = min(key, tile[:, ::-1].tobytes(), tile[::-1].tobytes(), tile[::-1, ::-1].tobytes())
+                expected.append(ids.setdefault(key, len(ids)))
+            assert dedup_tiles(data, flips=flips).index.tolist() == expected, (sheet, flips)
+
+
+def main():
+    """Run every test_* function and print a summary"""
+    tests = [func for name, func in list(globals().items())
+             if name.startswith('test_') and callable(func)]
+
+    passed = 0
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except Exception:
+            print(f"[FAIL] {test.__doc__}")
+            traceback.print_exc()
+            failed += 1
+        else:
+            print(f"[OK] {test.__doc__}")
+            passed += 1
+
+    print(f"\nPassed: {passed}")
+    print(f"Failed: {failed}")
+    return 0 if failed == 0 else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the sprite_classifier near-duplicate search
+Checks MultiIndexHash against a plain all-pairs comparison
+
+Hashes come from the 8x8 tiles of the sprite sheets shipped under
+godot/assets/sprites (4x copies of the CHR art, sampled back to 1x).
+
+Usage:
+    python tools/test_sprite_classifier.py
+    python -m pytest tools/test_sprite_classifier.py
+"""
+
+import functools
+import random
+import sys
+import traceback
+from pathlib import Path
+
+try:
+    from PIL import Image
+    import numpy as np
+except ImportError:
+    print("Error: PIL/Pillow and numpy are required.")
+    print("Install with: pip install Pillow numpy")
+    sys.exit(1)
+
+sys.path.insert(0, str(Path(__file__).parent))
+from sprite_classifier import (MultiIndexHash, SpriteInfo, compute_sprite_hash,
+                               find_duplicate_clusters, popcount)
+
+SPRITE_DIR = Path(__file__).resolve().parent.parent / 'godot' / 'assets' / 'sprites'
+
+
+@functools.lru_cache(maxsize=None)
+def sheet_hashes(sheet: str) -> tuple:
+    """Perceptual hashes of every 8x8 tile of a shipped 4x sheet"""
+    img = Image.open(SPRITE_DIR / sheet).convert('RGBA')
+    img = img.resize((img.width // 4, img.height // 4), Image.NEAREST)
+    return tuple(int(compute_sprite_hash(img.crop((x, y, x + 8, y + 8))), 16)
+                 for y in range(0, img.height, 8) for x in range(0, img.width, 8))
+
+
+def real_values() -> list:
+    """Distinct tile hashes of two character/effect sheets"""
+    return sorted(set(sheet_hashes('characters/fq4p_4x.png') + sheet_hashes('effects/magic_4x.png')))
+
+
+def crowded_values() -> list:
+    """Real hashes with band 0 cleared on 40% of them, piling those into one bucket"""
+    rng = random.Random(4)
+    crowded = {value & ~0xFFFF if rng.random() < 0.4 else value for value in real_values()}
+    return sorted(crowded)
+
+
+@functools.lru_cache(maxsize=None)
+def pair_distances(values: tuple) -> dict:
+    """Reference: Hamming distance of every pair of hashes (only those up to 12 bits)"""
+    distances = {}
+    for i, a in enumerate(values):
+        for j in range(i + 1, len(values)):
+            distance = bin(a ^ values[j]).count('1')
+            if distance <= 12:
+                distances[i, j] = distance
+    return distances
+
+
+def all_pairs(values: list, max_distance: int) -> set:
+    return {pair for pair, distance in pair_distances(tuple(values)).items() if distance <= max_distance}
+
+
+def index_pairs(index: MultiIndexHash, max_distance: int) -> list:
+    return [pair for i, j in index.pairs(max_distance) for pair in zip(i.tolist(), j.tolist())]
+
+
+def sprites_for(values: list) -> list:
+    return [SpriteInfo(path=f'{n}.png', width=8, height=8, unique_colors=1, transparency_ratio=0.0,
+                       brightness=0.0, category='character', hash=f'{value:016x}')
+            for n, value in enumerate(values)]
+
+
+def test_popcount():
+    """popcount matches a bit-by-bit count"""
+    rng = random.Random(1)
+    values = [0, 1, (1 << 64) - 1] + [rng.getrandbits(64) for _ in range(1000)]
+    counts = popcount(np.array(values, dtype=np.uint64))
+    assert counts.tolist() == [bin(value).count('1') for value in values]
+
+
+def test_pairs_match_all_pairs():
+    """MultiIndexHash.pairs finds exactly the all-pairs matches, once each"""
+    for values in (real_values(), crowded_values()):
+        for max_distance in (1, 2, 4, 6, 8, 12):
+            expected = all_pairs(values, max_distance)
+            for probe_cost in (0, 1 << 40):
+                # 0 always probes the bands, a huge cost always scans every pair
+                index = MultiIndexHash(values)
+                index.PROBE_COST = probe_cost
+                found = index_pairs(index, max_distance)
+                assert len(found) == len(set(found)), (max_distance, probe_cost)
+                assert set(found) == expected, (max_distance, probe_cost)
+
+
+def test_pairs_small_blocks():
+    """Splitting queries into small blocks gives the same pairs"""
+    values = crowded_values()
+    index = MultiIndexHash(values)
+    index.PROBE_COST = 0
+    index.PAIR_BLOCK = 64
+    assert sorted(index_pairs(index, 8)) == sorted(all_pairs(values, 8))
+
+
+def test_query_matches_all_pairs():
+    """MultiIndexHash.query returns every stored hash within the distance"""
+    values = crowded_values()
+    index = MultiIndexHash(values)
+    for value in values[::25]:
+        for max_distance in (0, 3, 8):
+            expected = [v for v in values if bin(v ^ value).count('1') <= max_distance]
+            assert sorted(index.query(value, max_distance)) == expected
+
+
+def test_find_duplicate_clusters():
+    """Clusters are the connected components of near pairs, with repeated hashes grouped"""
+    values = crowded_values()
+    sprites = sprites_for(values + values[::3])
+    for max_distance in (0, 2, 8):
+        parent = list(range(len(values)))
+
+        def find(node):
+            while parent[node] != node:
+                node = parent[node]
+            return node
+
+        for i, j in all_pairs(values, max_distance):
+            parent[find(j)] = find(i)
+        groups = {}
+        for idx, sprite in enumerate(sprites):
+            groups.setdefault(find(values.index(int(sprite.hash, 16))), []).append(idx)
+        expected = sorted((g for g in groups.values() if len(g) > 1), key=lambda g: g[0])
+        assert find_duplicate_clusters(sprites, max_distance) == expected, max_distance
+
+
+def main():
+    """Run every test_* function and print a summary"""
+    tests = [func for name, func in list(globals().items())
+             if name.startswith('test_') and callable(func)]
+
+    passed = 0
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except Exception:
+            print(f"[FAIL] {test.__doc__}")
+            traceback.print_exc()
+            failed += 1
+        else:
+            print(f"[OK] {test.__doc__}")
+            passed += 1
+
+    print(f"\nPassed: {passed}")
+    print(f"Failed: {failed}")
+    return 0 if failed == 0 else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
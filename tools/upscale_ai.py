@@ -21,6 +21,19 @@ Usage:
     # Compare backends on sample image
     python tools/upscale_ai.py compare --input sample.png --output comparison/
 
+    # Run 8 backend processes at once, 5 minute limit and 2 retries per image
+    python tools/upscale_ai.py realesrgan-ncnn -i output/sprites -o output/sprites_ai --workers 8 --timeout 300 --retries 2
+
+    # Load the NCNN model once per 500 images (directory mode)
+    python tools/upscale_ai.py realesrgan-ncnn -i output/sprites -o output/sprites_ai --chunk-size 500
+
+    # Pack tiles up to 32x32 into atlases, upscale each atlas once, slice back
+    python tools/upscale_ai.py realesrgan-ncnn -i output/sprites/FQ4P -o output/sprites_ai --atlas
+
+    # Results are cached by pixel content in output/sprites_ai.upscale_cache;
+    # duplicate tiles are upscaled once and hardlinked
+    python tools/upscale_ai.py waifu2x -i output/sprites -o output/sprites_ai -s 2 --denoise 2 --cache D:/fq4_cache
+
 Installation:
     # Real-ESRGAN (Python)
     pip install realesrgan basicsr
@@ -33,21 +46,32 @@ Installation:
 """
 
 import argparse
+import os
 import subprocess
 import sys
 import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from pathlib import Path
-from typing import Optional, List, Tuple, Dict
+from typing import Callable, Iterator, Optional, List, Tuple, Dict
 from dataclasses import dataclass
 from enum import Enum
 import json
 
 try:
     from PIL import Image
+    import numpy as np
 except ImportError:
-    print("Error: PIL/Pillow is required. Install with: pip install Pillow")
+    print("Error: PIL/Pillow and numpy are required.")
+    print("Install with: pip install Pillow numpy")
     sys.exit(1)
 
+sys.path.insert(0, str(Path(__file__).parent))
+from link_utils import LINK_MODES, link_file
+from upscale_cache import CACHE_SUFFIX, UpscaleCache, default_cache_dir
+
 
 class Backend(Enum):
     REALESRGAN = "realesrgan"
@@ -82,6 +106,50 @@ UPSCAYL_MODELS = {
     'ultrasharp': 'ultrasharp',    # Maximum sharpness
 }
 
+@dataclass
+class UpscaleJob:
+    """One input image and the output it should produce"""
+    number: int      # 1-based position among the scanned files (progress display)
+    source: Path
+    output: Path
+    relative: Path
+    runs: int = 0  # chunk runs (directory mode, model session) that included this job
+
+
+@dataclass
+class JobResult:
+    """Outcome of an UpscaleJob after all attempts"""
+    ok: bool
+    error: str = ''
+    attempts: int = 1
+    elapsed: float = 0.0
+
+
+# Backends whose executables accept directories for -i/-o
+DIRECTORY_BACKENDS = ('realesrgan-ncnn', 'waifu2x')
+
+
+# Images read and written per RealESRGANSession run in batch_upscale
+SESSION_CHUNK_SIZE = 64
+
+
+# Atlas mode: small tiles are packed into shared canvases, one backend run each
+ATLAS_TILE_MAX = 32  # tiles up to this width and height (source pixels) are packed
+ATLAS_SIZE = 512     # canvas width/height limit (source pixels)
+ATLAS_GUTTER = 4     # edge-replicated border around each tile (source pixels)
+
+
+@dataclass
+class AtlasPlacement:
+    """Position of one tile inside an atlas (gutter excluded)"""
+    job: UpscaleJob
+    x: int
+    y: int
+    width: int
+    height: int
+    alpha: bool
+
+
 # Local installation directory
 INSTALL_DIR = Path(__file__).parent / 'ai_backends'
 CONFIG_PATH = INSTALL_DIR / 'config.json'
@@ -281,6 +349,183 @@ def check_all_backends() -> Dict[str, BackendInfo]:
     }
 
 
+class RealESRGANSession:
+    """
+    Real-ESRGAN (Python) model kept loaded across images
+
+    Importing torch and building the network and RealESRGANer costs far
+    more than upscaling one sprite, so a session is created once per
+    (model, tile, denoise) and reused. Same-size 8-bit BGR images are
+    stacked into one forward pass of up to batch_size images; images
+    with alpha, grayscale or 16-bit images and tiled sessions go through
+    RealESRGANer.enhance one at a time.
+
+    Raises ImportError if torch, basicsr, realesrgan or cv2 is missing.
+    """
+
+    def __init__(self, model: str = 'anime', tile: int = 0,
+                 denoise: float = 0.5, batch_size: int = 8):
+        import torch
+        from basicsr.archs.rrdbnet_arch import RRDBNet
+        from realesrgan import RealESRGANer
+        from realesrgan.archs.srvgg_arch import SRVGGNetCompact
+        import cv2  # noqa: F401 (fail at load time, not on the first image)
+
+        self.model_type = model
+        self.tile = tile
+        self.denoise = denoise
+        self.batch_size = max(1, batch_size)
+
+        # Select model
+        model_name = REALESRGAN_MODELS.get(model, REALESRGAN_MODELS['anime'])
+
+        # Setup model architecture based on model name
+        if 'anime' in model_name.lower():
+            model_arch = RRDBNet(num_in_ch=3, num_out_ch=3, num_feat=64,
+                                num_block=6, num_grow_ch=32, scale=4)
+        elif 'v3' in model_name.lower():
+            model_arch = SRVGGNetCompact(num_in_ch=3, num_out_ch=3, num_feat=64,
+                                         num_conv=32, upscale=4, act_type='prelu')
+        else:
+            model_arch = RRDBNet(num_in_ch=3, num_out_ch=3, num_feat=64,
+                                num_block=23, num_grow_ch=32, scale=4)
+
+        # Determine device
+        device = 'cuda' if torch.cuda.is_available() else 'cpu'
+        if device == 'cpu':
+            print("Warning: Running on CPU. GPU recommended for faster processing.")
+
+        # Create upsampler
+        self.upsampler = RealESRGANer(
+            scale=4,
+            model_path=None,  # Will download automatically
+            dni_weight=denoise,
+            model=model_arch,
+            tile=tile,
+            tile_pad=10,
+            pre_pad=0,
+            half=True if device == 'cuda' else False,
+            device=device
+        )
+
+    def forward(self, images: list) -> list:
+        """One network pass over same-size uint8 BGR images (model scale)"""
+        import numpy as np
+        import torch
+
+        rgb = np.stack([img[:, :, ::-1] for img in images]).astype(np.float32) / 255.0
+        tensor = torch.from_numpy(np.ascontiguousarray(rgb.transpose(0, 3, 1, 2)))
+        tensor = tensor.to(self.upsampler.device)
+        if self.upsampler.half:
+            tensor = tensor.half()
+
+        with torch.no_grad():
+            result = self.upsampler.model(tensor)
+
+        # NCHW RGB [0, 1] -> NHWC BGR uint8, rounded like RealESRGANer.enhance
+        result = result.float().cpu().clamp_(0, 1).numpy()
+        result = result[:, ::-1].transpose(0, 2, 3, 1)
+        return list((result * 255.0).round().astype(np.uint8))
+
+    def enhance(self, images: list, scale: float = 4) -> list:
+        """
+        Upscale images (cv2 BGR/BGRA/grayscale arrays)
+
+        Args:
+            images: Arrays as returned by cv2.imread(..., IMREAD_UNCHANGED)
+            scale: Output scale (resized with Lanczos if not the model's 4x)
+
+        Returns:
+            Upscaled arrays in input order
+        """
+        import cv2
+        import numpy as np
+
+        outputs = [None] * len(images)
+        groups: Dict[tuple, List[int]] = {}
+
+        for i, img in enumerate(images):
+            if self.tile == 0 and img.dtype == np.uint8 and img.ndim == 3 and img.shape[2] == 3:
+                groups.setdefault(img.shape, []).append(i)
+            else:
+                outputs[i], _ = self.upsampler.enhance(img, outscale=scale)
+
+        for indices in groups.values():
+            for start in range(0, len(indices), self.batch_size):
+                batch = indices[start:start + self.batch_size]
+                for i, output in zip(batch, self.forward([images[i] for i in batch])):
+                    if scale != self.upsampler.scale:
+                        h, w = images[i].shape[:2]
+                        output = cv2.resize(output, (int(w * scale), int(h * scale)),
+                                            interpolation=cv2.INTER_LANCZOS4)
+                    outputs[i] = output
+
+        return outputs
+
+    def upscale_files(self, pairs: List[Tuple[Path, Path]], scale: float = 4) -> List[str]:
+        """
+        Upscale (input, output) file pairs
+
+        Returns:
+            Error message per pair ('' = success)
+        """
+        import cv2
+
+        errors = [''] * len(pairs)
+        images = []
+        loaded = []
+        for k, (input_path, _) in enumerate(pairs):
+            img = cv2.imread(str(input_path), cv2.IMREAD_UNCHANGED)
+            if img is None:
+                errors[k] = f"Error: Cannot read image {input_path}"
+                continue
+            images.append(img)
+            loaded.append(k)
+
+        try:
+            outputs = self.enhance(images, scale)
+        except Exception as e:
+            for k in loaded:
+                errors[k] = f"Error during upscaling: {e}"
+            return errors
+
+        for k, output in zip(loaded, outputs):
+            output_path = pairs[k][1]
+            output_path.parent.mkdir(parents=True, exist_ok=True)
+            if not cv2.imwrite(str(output_path), output):
+                errors[k] = f"Error: Cannot write image {output_path}"
+
+        return errors
+
+    def upscale_chunk(self, jobs: List[UpscaleJob], scale: float = 4) -> Tuple[bool, str]:
+        """Upscale the jobs still missing output (scheduler chunk runner)"""
+        pending = [job for job in jobs if not job.output.exists()]
+        for job in pending:
+            job.runs += 1
+
+        errors = [e for e in self.upscale_files([(job.source, job.output) for job in pending], scale) if e]
+        if errors:
+            return False, errors[0]
+        return True, ''
+
+
+_REALESRGAN_SESSIONS: Dict[tuple, RealESRGANSession] = {}
+
+
+def get_realesrgan_session(model: str = 'anime', tile: int = 0,
+                           denoise: float = 0.5) -> Optional[RealESRGANSession]:
+    """Shared RealESRGANSession for these settings (None if dependencies are missing)"""
+    key = (model, tile, denoise)
+    if key not in _REALESRGAN_SESSIONS:
+        try:
+            _REALESRGAN_SESSIONS[key] = RealESRGANSession(model, tile, denoise)
+        except ImportError as e:
+            print(f"Error: Missing dependency - {e}")
+            print("Install with: pip install realesrgan basicsr torch torchvision opencv-python")
+            return None
+    return _REALESRGAN_SESSIONS[key]
+
+
 def upscale_realesrgan_python(
     input_path: Path,
     output_path: Path,
@@ -289,81 +534,57 @@ def upscale_realesrgan_python(
     tile: int = 0,
     denoise: float = 0.5
 ) -> bool:
-    """Upscale using Real-ESRGAN Python package"""
-    try:
-        import torch
-        from basicsr.archs.rrdbnet_arch import RRDBNet
-        from realesrgan import RealESRGANer
-        from realesrgan.archs.srvgg_arch import SRVGGNetCompact
-        import numpy as np
-        import cv2
-    except ImportError as e:
-        print(f"Error: Missing dependency - {e}")
-        print("Install with: pip install realesrgan basicsr torch torchvision")
+    """Upscale using Real-ESRGAN Python package (model stays loaded between calls)"""
+    session = get_realesrgan_session(model, tile, denoise)
+    if session is None:
         return False
 
-    # Select model
-    model_name = REALESRGAN_MODELS.get(model, REALESRGAN_MODELS['anime'])
+    error = session.upscale_files([(input_path, output_path)], scale)[0]
+    if error:
+        print(error)
+        return False
+    return True
 
-    # Setup model architecture based on model name
-    if 'anime' in model_name.lower():
-        model_arch = RRDBNet(num_in_ch=3, num_out_ch=3, num_feat=64,
-                            num_block=6, num_grow_ch=32, scale=4)
-    elif 'v3' in model_name.lower():
-        model_arch = SRVGGNetCompact(num_in_ch=3, num_out_ch=3, num_feat=64,
-                                     num_conv=32, upscale=4, act_type='prelu')
-    else:
-        model_arch = RRDBNet(num_in_ch=3, num_out_ch=3, num_feat=64,
-                            num_block=23, num_grow_ch=32, scale=4)
-
-    # Determine device
-    device = 'cuda' if torch.cuda.is_available() else 'cpu'
-    if device == 'cpu':
-        print("Warning: Running on CPU. GPU recommended for faster processing.")
-
-    # Create upsampler
-    upsampler = RealESRGANer(
-        scale=4,
-        model_path=None,  # Will download automatically
-        dni_weight=denoise,
-        model=model_arch,
-        tile=tile,
-        tile_pad=10,
-        pre_pad=0,
-        half=True if device == 'cuda' else False,
-        device=device
-    )
 
-    # Read image
-    img = cv2.imread(str(input_path), cv2.IMREAD_UNCHANGED)
-    if img is None:
-        print(f"Error: Cannot read image {input_path}")
-        return False
+def run_backend_command(cmd: List[str], output_path: Path,
+                        timeout: Optional[float] = None) -> Tuple[bool, str]:
+    """
+    Run one backend executable
 
-    # Upscale
-    try:
-        output, _ = upsampler.enhance(img, outscale=scale)
+    Args:
+        cmd: Command line
+        output_path: File (or directory) the command should create
+        timeout: Seconds before the process is killed (None = no limit)
 
-        # Save
+    Returns:
+        (success, error detail)
+    """
+    try:
         output_path.parent.mkdir(parents=True, exist_ok=True)
-        cv2.imwrite(str(output_path), output)
-        return True
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return False, f"timed out after {timeout:g}s"
     except Exception as e:
-        print(f"Error during upscaling: {e}")
-        return False
+        return False, str(e)
 
+    if result.returncode != 0:
+        detail = [f"exit code {result.returncode}"]
+        if result.stderr:
+            detail.append(f"stderr: {result.stderr.strip()}")
+        if result.stdout:
+            detail.append(f"stdout: {result.stdout.strip()}")
+        return False, '\n'.join(detail)
 
-def upscale_realesrgan_ncnn(
-    input_path: Path,
-    output_path: Path,
-    exe_path: str,
-    scale: int = 4,
-    model: str = 'anime'
-) -> bool:
-    """Upscale using Real-ESRGAN NCNN executable"""
-    model_name = REALESRGAN_MODELS.get(model, REALESRGAN_MODELS['anime'])
+    if not output_path.exists():
+        return False, f"backend exited without writing {output_path.name}"
+    return True, ''
 
-    cmd = [
+
+def realesrgan_ncnn_command(input_path: Path, output_path: Path, exe_path: str,
+                            scale: int = 4, model: str = 'anime') -> List[str]:
+    """Command line for Real-ESRGAN NCNN"""
+    model_name = REALESRGAN_MODELS.get(model, REALESRGAN_MODELS['anime'])
+    return [
         exe_path,
         '-i', str(input_path),
         '-o', str(output_path),
@@ -371,18 +592,34 @@ def upscale_realesrgan_ncnn(
         '-s', str(scale),
     ]
 
-    try:
-        output_path.parent.mkdir(parents=True, exist_ok=True)
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        if result.returncode != 0:
-            if result.stderr:
-                print(f"\n    stderr: {result.stderr.strip()}")
-            if result.stdout:
-                print(f"\n    stdout: {result.stdout.strip()}")
-        return result.returncode == 0
-    except Exception as e:
-        print(f"Error: {e}")
-        return False
+
+def waifu2x_command(input_path: Path, output_path: Path, exe_path: str,
+                    scale: int = 2, noise_level: int = 1) -> List[str]:
+    """Command line for waifu2x NCNN"""
+    return [
+        exe_path,
+        '-i', str(input_path),
+        '-o', str(output_path),
+        '-s', str(scale),
+        '-n', str(noise_level),
+    ]
+
+
+def upscale_realesrgan_ncnn(
+    input_path: Path,
+    output_path: Path,
+    exe_path: str,
+    scale: int = 4,
+    model: str = 'anime',
+    timeout: Optional[float] = None
+) -> bool:
+    """Upscale using Real-ESRGAN NCNN executable"""
+    cmd = realesrgan_ncnn_command(input_path, output_path, exe_path, scale, model)
+    success, error = run_backend_command(cmd, output_path, timeout)
+    if not success:
+        for line in error.splitlines():
+            print(f"\n    {line}")
+    return success
 
 
 def upscale_waifu2x(
@@ -390,24 +627,309 @@ def upscale_waifu2x(
     output_path: Path,
     exe_path: str,
     scale: int = 2,
-    noise_level: int = 1
+    noise_level: int = 1,
+    timeout: Optional[float] = None
 ) -> bool:
     """Upscale using waifu2x"""
-    cmd = [
-        exe_path,
-        '-i', str(input_path),
-        '-o', str(output_path),
-        '-s', str(scale),
-        '-n', str(noise_level),
-    ]
+    cmd = waifu2x_command(input_path, output_path, exe_path, scale, noise_level)
+    success, _ = run_backend_command(cmd, output_path, timeout)
+    return success
+
+
+def effective_denoise(backend: str, denoise: Optional[float] = None) -> Optional[float]:
+    """Denoise setting a backend actually uses (None if it has none)"""
+    if backend == 'realesrgan':
+        return 0.5 if denoise is None else denoise
+    if backend == 'waifu2x':
+        return 1 if denoise is None else int(denoise)
+    return None
+
+
+def upscale_file(backend: str, backend_info: BackendInfo,
+                 input_path: Path, output_path: Path,
+                 scale: int = 4, model: str = 'anime',
+                 timeout: Optional[float] = None,
+                 denoise: Optional[float] = None) -> Tuple[bool, str]:
+    """
+    Upscale one file with the named backend
+
+    Returns:
+        (success, error detail)
+    """
+    denoise = effective_denoise(backend, denoise)
+    if backend == 'realesrgan':
+        success = upscale_realesrgan_python(input_path, output_path, scale, model, denoise=denoise)
+        return success, '' if success else "Real-ESRGAN (Python) failed"
+    elif backend == 'realesrgan-ncnn':
+        cmd = realesrgan_ncnn_command(input_path, output_path, backend_info.path, scale, model)
+        return run_backend_command(cmd, output_path, timeout)
+    elif backend == 'waifu2x':
+        cmd = waifu2x_command(input_path, output_path, backend_info.path, scale, denoise)
+        return run_backend_command(cmd, output_path, timeout)
+
+    return False, f"batch upscaling is not supported for {backend}"
+
+
+def default_staging_root(output_dir: Path) -> Path:
+    """Where batches for output_dir stage temporary files: beside it, never inside it"""
+    return Path(os.path.abspath(output_dir)).parent
+
+
+def upscale_directory_chunk(
+    jobs: List[UpscaleJob],
+    command: Callable[[Path, Path], List[str]],
+    staging_root: Path,
+    timeout: Optional[float] = None
+) -> Tuple[bool, str]:
+    """
+    Upscale several images with a single backend run
+
+    Inputs still missing an output are hardlinked (copied as fallback)
+    into a temporary directory under staging_root under unique names,
+    the backend is run once on that directory, and each result is moved
+    to its job's output path. Only images without output are staged, so
+    a retry redoes just the failed part of a chunk.
+
+    Args:
+        jobs: Jobs of this chunk
+        command: Builds the backend command for (input dir, output dir)
+        staging_root: Directory for the staging area, outside the output
+                      tree so an interrupted run leaves no stray PNGs
+                      there (see default_staging_root)
+        timeout: Seconds per image; the run may take timeout * images
+
+    Returns:
+        (success, error detail)
+    """
+    pending = [job for job in jobs if not job.output.exists()]
+    if not pending:
+        return True, ''
+
+    missing = 0
+    with tempfile.TemporaryDirectory(prefix='.upscale_stage_', dir=str(staging_root)) as tmp:
+        stage_in = Path(tmp) / 'in'
+        stage_out = Path(tmp) / 'out'
+        stage_in.mkdir()
+        stage_out.mkdir()
+
+        for k, job in enumerate(pending):
+            link_file(job.source, stage_in / f"{k:06d}.png", 'hardlink')
+            job.runs += 1
+
+        success, error = run_backend_command(command(stage_in, stage_out), stage_out,
+                                             timeout * len(pending) if timeout else None)
+
+        for k, job in enumerate(pending):
+            # realesrgan-ncnn writes 000000.png, waifu2x-ncnn 000000.png.png
+            for name in (f"{k:06d}.png", f"{k:06d}.png.png"):
+                produced = stage_out / name
+                if produced.exists():
+                    job.output.parent.mkdir(parents=True, exist_ok=True)
+                    shutil.move(str(produced), str(job.output))
+                    break
+            else:
+                missing += 1
+
+    if missing:
+        return False, error or f"backend wrote no output for {missing} of {len(pending)} images"
+    return True, ''
+
+
+def split_atlas_jobs(
+    jobs: List[UpscaleJob],
+    tile_max: int = ATLAS_TILE_MAX
+) -> Tuple[List[Tuple[UpscaleJob, int, int, bool]], List[UpscaleJob]]:
+    """
+    Separate tiles small enough for atlas packing from other jobs
+
+    Returns:
+        ([(job, width, height, has_alpha), ...] for atlas tiles, remaining jobs)
+    """
+    tiles = []
+    others = []
+    for job in jobs:
+        try:
+            with Image.open(job.source) as img:
+                width, height = img.size
+                alpha = 'A' in img.getbands() or 'transparency' in img.info
+        except Exception:
+            others.append(job)  # reported by the regular path
+            continue
 
-    try:
-        output_path.parent.mkdir(parents=True, exist_ok=True)
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        return result.returncode == 0
-    except Exception as e:
-        print(f"Error: {e}")
-        return False
+        if width <= tile_max and height <= tile_max:
+            tiles.append((job, width, height, alpha))
+        else:
+            others.append(job)
+
+    return tiles, others
+
+
+def pack_atlases(
+    tiles: List[Tuple[UpscaleJob, int, int, bool]],
+    atlas_size: int = ATLAS_SIZE,
+    gutter: int = ATLAS_GUTTER
+) -> List[List[AtlasPlacement]]:
+    """
+    Shelf-pack tiles, tallest first, into atlases of at most atlas_size square
+
+    Every tile occupies its size plus `gutter` on each side, so an atlas
+    must fit at least one padded tile.
+
+    Returns:
+        One list of placements per atlas
+    """
+    pages = []
+    page: List[AtlasPlacement] = []
+    x = y = shelf_height = 0
+
+    for job, width, height, alpha in sorted(tiles, key=lambda t: (-t[2], -t[1])):
+        cell_w = width + 2 * gutter
+        cell_h = height + 2 * gutter
+        if x + cell_w > atlas_size:
+            x, y, shelf_height = 0, y + shelf_height, 0
+        if y + cell_h > atlas_size:
+            pages.append(page)
+            page = []
+            x = y = shelf_height = 0
+
+        page.append(AtlasPlacement(job, x + gutter, y + gutter, width, height, alpha))
+        x += cell_w
+        shelf_height = max(shelf_height, cell_h)
+
+    if page:
+        pages.append(page)
+    return pages
+
+
+def build_atlas(placements: List[AtlasPlacement], gutter: int = ATLAS_GUTTER) -> Image.Image:
+    """
+    Render placed tiles into one canvas
+
+    Each tile's gutter repeats its edge pixels, so the upscaler sees the
+    tile's own colors rather than its neighbours' at the borders. The
+    atlas is RGB unless some tile has transparency.
+    """
+    width = max(p.x + p.width for p in placements) + gutter
+    height = max(p.y + p.height for p in placements) + gutter
+    canvas = np.zeros((height, width, 4), dtype=np.uint8)
+
+    for p in placements:
+        with Image.open(p.job.source) as img:
+            tile = np.asarray(img.convert('RGBA'))
+        canvas[p.y - gutter:p.y + p.height + gutter, p.x - gutter:p.x + p.width + gutter] = \
+            np.pad(tile, ((gutter, gutter), (gutter, gutter), (0, 0)), mode='edge')
+
+    atlas = Image.fromarray(canvas, 'RGBA')
+    if not any(p.alpha for p in placements):
+        atlas = atlas.convert('RGB')
+    return atlas
+
+
+def upscale_atlas_chunk(
+    placements: List[AtlasPlacement],
+    upscale_one: Callable[[Path, Path, int], Tuple[bool, str]],
+    staging_root: Path,
+    scale: int = 4,
+    gutter: int = ATLAS_GUTTER
+) -> Tuple[bool, str]:
+    """
+    Upscale a packed atlas once and slice it back into per-tile outputs
+
+    Only tiles still missing output are rendered, so a retry redoes just
+    the failed part of an atlas.
+
+    Args:
+        placements: Tiles of this atlas
+        upscale_one: Upscales (input file, output file, tile count)
+        staging_root: Directory for the temporary atlas files, outside
+                      the output tree (see default_staging_root)
+        scale: Scale factor the backend applies
+        gutter: Gutter used when packing
+
+    Returns:
+        (success, error detail)
+    """
+    pending = [p for p in placements if not p.job.output.exists()]
+    if not pending:
+        return True, ''
+    for p in pending:
+        p.job.runs += 1
+
+    with tempfile.TemporaryDirectory(prefix='.upscale_atlas_', dir=str(staging_root)) as tmp:
+        atlas_path = Path(tmp) / 'atlas.png'
+        result_path = Path(tmp) / 'atlas_out.png'
+
+        atlas = build_atlas(pending, gutter)
+        atlas.save(atlas_path)
+
+        success, error = upscale_one(atlas_path, result_path, len(pending))
+        if not success:
+            return False, error
+
+        with Image.open(result_path) as img:
+            result = img.convert('RGBA')
+
+    expected = (atlas.width * scale, atlas.height * scale)
+    if result.size != expected:
+        return False, (f"atlas upscaled to {result.width}x{result.height}, "
+                       f"expected {expected[0]}x{expected[1]}")
+
+    for p in pending:
+        tile = result.crop((p.x * scale, p.y * scale,
+                            (p.x + p.width) * scale, (p.y + p.height) * scale))
+        p.job.output.parent.mkdir(parents=True, exist_ok=True)
+        tile.convert('RGBA' if p.alpha else 'RGB').save(p.job.output)
+
+    return True, ''
+
+
+def run_with_retries(func: Callable[[], Tuple[bool, str]], retries: int = 0) -> JobResult:
+    """Call func until it succeeds or retries are used up"""
+    start = time.monotonic()
+    for attempt in range(1, retries + 2):
+        success, error = func()
+        if success:
+            return JobResult(True, '', attempt, time.monotonic() - start)
+    return JobResult(False, error, attempt, time.monotonic() - start)
+
+
+def schedule_jobs(
+    jobs: list,
+    func: Callable[..., Tuple[bool, str]],
+    workers: int = 1,
+    retries: int = 0
+) -> Iterator[Tuple[object, JobResult]]:
+    """
+    Run func(job) for every job on a bounded pool of threads
+
+    Each thread mostly waits on a backend subprocess, so threads are
+    enough to keep `workers` processes busy. Results are yielded in job
+    order, whatever order the jobs finish in.
+
+    Args:
+        jobs: Jobs to run (UpscaleJobs, or chunks of them)
+        func: Returns (success, error detail) for one job
+        workers: Concurrent jobs (1 = run in this thread)
+        retries: Extra attempts for a failed job
+
+    Yields:
+        (job, JobResult) in job order
+    """
+    if workers <= 1 or len(jobs) <= 1:
+        for job in jobs:
+            yield job, run_with_retries(partial(func, job), retries)
+        return
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(run_with_retries, partial(func, job), retries) for job in jobs]
+        try:
+            for job, future in zip(jobs, futures):
+                yield job, future.result()
+        except BaseException:
+            # Ctrl+C or a consumer error: drop queued jobs, let running ones finish
+            for future in futures:
+                future.cancel()
+            raise
 
 
 def batch_upscale(
@@ -416,9 +938,47 @@ def batch_upscale(
     backend: str,
     scale: int = 4,
     model: str = 'anime',
-    recursive: bool = True
+    recursive: bool = True,
+    workers: int = 1,
+    timeout: Optional[float] = None,
+    retries: int = 0,
+    chunk_size: int = 0,
+    atlas_tile_max: int = 0,
+    atlas_size: int = ATLAS_SIZE,
+    gutter: int = ATLAS_GUTTER,
+    denoise: Optional[float] = None,
+    cache: Optional[UpscaleCache] = None
 ) -> dict:
-    """Batch upscale all images in directory or single file"""
+    """
+    Batch upscale all images in directory or single file
+
+    Args:
+        input_path: PNG file or directory
+        output_dir: Output directory (outputs are named *_ai{scale}x.png)
+        backend: Backend name
+        scale: Scale factor
+        model: Model type
+        recursive: Include subdirectories
+        workers: Concurrent backend processes
+        timeout: Seconds per attempt before a backend process is killed
+        retries: Extra attempts for a failed image
+        chunk_size: Images per backend run: NCNN directory mode (0 = one
+                    run per image) or Real-ESRGAN session reads (0 =
+                    SESSION_CHUNK_SIZE)
+        atlas_tile_max: Pack images up to this width and height into
+                        atlases (0 = atlas mode off)
+        atlas_size: Atlas width/height limit in source pixels
+        gutter: Edge-replicated border around each packed tile
+        denoise: Real-ESRGAN dni weight / waifu2x noise level (None =
+                 backend default)
+        cache: UpscaleCache; inputs whose pixels were already upscaled
+               with the same settings are linked from it, duplicates in
+               this run are upscaled once, and existing outputs made
+               with other settings are rebuilt
+
+    Returns:
+        Stats dict with processed, errors, skipped, retried and cached counts
+    """
     backends = check_all_backends()
 
     if backend not in backends or not backends[backend].available:
@@ -427,11 +987,16 @@ def batch_upscale(
         for name, info in backends.items():
             if info.available:
                 print(f"  - {name}: {info.path}")
-        return {'processed': 0, 'errors': 0}
+        return {'processed': 0, 'errors': 0, 'skipped': 0, 'retried': 0, 'cached': 0}
 
     backend_info = backends[backend]
     output_dir.mkdir(parents=True, exist_ok=True)
 
+    # The Python backend runs one model session in this process
+    # (torch already uses all cores)
+    if backend == 'realesrgan':
+        workers = 1
+
     # Handle single file vs directory
     if input_path.is_file():
         png_files = [input_path]
@@ -445,36 +1010,163 @@ def batch_upscale(
     print(f"Backend: {backend_info.name}")
     print(f"Scale: {scale}x")
     print(f"Model: {model}")
+    if workers > 1:
+        print(f"Workers: {workers}")
     print()
 
-    stats = {'processed': 0, 'errors': 0, 'skipped': 0}
+    stats = {'processed': 0, 'errors': 0, 'skipped': 0, 'retried': 0, 'cached': 0}
+    denoise = effective_denoise(backend, denoise)
+
+    # Cache keys: atlas-packed tiles see other context than single images
+    params = UpscaleCache.params(backend, model, scale, denoise)
+    atlas_params = UpscaleCache.params(backend, model, scale, denoise, f"atlas-g{gutter}")
+    keys: Dict[Path, Optional[str]] = {}
 
+    def cache_key(png: Path) -> Optional[str]:
+        if png not in keys:
+            try:
+                digest, (width, height) = cache.digest(png)
+            except Exception:
+                keys[png] = None  # unreadable: let the backend report it
+            else:
+                packed = 0 < atlas_tile_max and width <= atlas_tile_max and height <= atlas_tile_max
+                keys[png] = UpscaleCache.key(digest, atlas_params if packed else params)
+        return keys[png]
+
+    jobs = []
     for i, png in enumerate(png_files):
         relative = png.relative_to(input_dir)
         out_path = output_dir / relative.parent / f"{png.stem}_ai{scale}x.png"
 
         if out_path.exists():
-            print(f"  [SKIP] {relative}")
-            stats['skipped'] += 1
-            continue
+            recorded = cache.recorded_key(out_path) if cache is not None else None
+            if recorded is None or recorded == cache_key(png):
+                print(f"  [SKIP] {relative}")
+                stats['skipped'] += 1
+                continue
+
+            # Made with other settings or from older pixels; unlink rather
+            # than overwrite, the file may be a hardlink into the cache
+            print(f"  [STALE] {relative}")
+            cache.forget(out_path)
+            out_path.unlink()
+
+        jobs.append(UpscaleJob(i + 1, png, out_path, relative))
+
+    # Link cached results; upscale only the first job of each key
+    duplicates: Dict[str, List[UpscaleJob]] = {}
+    if cache is not None:
+        primaries = []
+        for job in jobs:
+            key = cache_key(job.source)
+            if key is None:
+                primaries.append(job)
+            elif cache.materialize(key, job.output):
+                print(f"  [CACHE] {job.relative}")
+                stats['cached'] += 1
+            elif key in duplicates:
+                duplicates[key].append(job)
+            else:
+                duplicates[key] = []
+                primaries.append(job)
+        jobs = primaries
+
+        pending_links = sum(len(dups) for dups in duplicates.values())
+        if pending_links:
+            print(f"{pending_links} duplicate image(s) will be linked to their first upscale")
+
+    def report(job: UpscaleJob, result: JobResult):
+        status = "OK" if result.ok else "ERROR"
+        if result.attempts > 1:
+            stats['retried'] += 1
+            status += f" (attempt {result.attempts})"
+        print(f"  [{job.number}/{len(png_files)}] {job.relative}... {status}")
+
+        if result.ok:
+            stats['processed'] += 1
+        else:
+            for line in result.error.splitlines():
+                print(f"    {line}")
+            stats['errors'] += 1
 
-        print(f"  [{i+1}/{len(png_files)}] {relative}...", end=' ', flush=True)
+        key = keys.get(job.source)
+        if cache is None or key is None:
+            return
+        if result.ok:
+            cache.store(key, job.output)
+        for dup in duplicates.pop(key, []):
+            if result.ok and cache.materialize(key, dup.output):
+                print(f"  [LINK] {dup.relative} (same pixels as {job.relative})")
+                stats['cached'] += 1
+            else:
+                print(f"  [ERROR] {dup.relative} (same pixels as {job.relative})")
+                stats['errors'] += 1
+
+    def report_chunk(chunk: List[UpscaleJob], result: JobResult):
+        for job in sorted(chunk, key=lambda job: job.number):
+            ok = job.output.exists()
+            report(job, JobResult(ok, '' if ok else result.error, max(job.runs, 1), result.elapsed))
+
+    session = None
+    if backend == 'realesrgan':
+        session = get_realesrgan_session(model, 0, denoise)
+        if session is None:
+            stats['errors'] += len(jobs)
+            return stats
+
+    def upscale_one(src: Path, dst: Path, images: int = 1) -> Tuple[bool, str]:
+        if session is not None:
+            error = session.upscale_files([(src, dst)], scale)[0]
+            return not error, error
+        return upscale_file(backend, backend_info, src, dst, scale, model,
+                            timeout * images if timeout else None, denoise)
+
+    # Temporary atlases and staging directories go beside the output tree
+    staging_root = default_staging_root(output_dir)
+
+    if atlas_tile_max > 0:
+        tiles, jobs = split_atlas_jobs(jobs, atlas_tile_max)
+        pages = pack_atlases(tiles, max(atlas_size, atlas_tile_max + 2 * gutter), gutter)
+        if pages:
+            print(f"Atlas mode: {len(tiles)} tiles packed into {len(pages)} atlas(es)")
+
+        def run_page(page: List[AtlasPlacement]) -> Tuple[bool, str]:
+            return upscale_atlas_chunk(page, upscale_one, staging_root, scale, gutter)
+
+        for page, result in schedule_jobs(pages, run_page, workers, retries):
+            report_chunk([p.job for p in page], result)
+
+    run_chunk = None
+    if session is not None:
+        chunk_size = chunk_size or SESSION_CHUNK_SIZE
+
+        def run_chunk(chunk: List[UpscaleJob]) -> Tuple[bool, str]:
+            return session.upscale_chunk(chunk, scale)
+
+    elif chunk_size > 0 and backend in DIRECTORY_BACKENDS:
+        if backend == 'realesrgan-ncnn':
+            def command(src: Path, dst: Path) -> List[str]:
+                return realesrgan_ncnn_command(src, dst, backend_info.path, scale, model) + ['-f', 'png']
+        else:
+            def command(src: Path, dst: Path) -> List[str]:
+                return waifu2x_command(src, dst, backend_info.path, scale, denoise) + ['-f', 'png']
 
-        success = False
+        def run_chunk(chunk: List[UpscaleJob]) -> Tuple[bool, str]:
+            return upscale_directory_chunk(chunk, command, staging_root, timeout)
 
-        if backend == 'realesrgan':
-            success = upscale_realesrgan_python(png, out_path, scale, model)
-        elif backend == 'realesrgan-ncnn':
-            success = upscale_realesrgan_ncnn(png, out_path, backend_info.path, scale, model)
-        elif backend == 'waifu2x':
-            success = upscale_waifu2x(png, out_path, backend_info.path, scale)
+        if jobs:
+            print(f"Directory mode: {-(-len(jobs) // chunk_size)} backend run(s) of up to {chunk_size} images")
 
-        if success:
-            print("OK")
-            stats['processed'] += 1
-        else:
-            print("ERROR")
-            stats['errors'] += 1
+    if run_chunk is not None:
+        chunks = [jobs[i:i + chunk_size] for i in range(0, len(jobs), chunk_size)]
+        for chunk, result in schedule_jobs(chunks, run_chunk, workers, retries):
+            report_chunk(chunk, result)
+    else:
+        def run_job(job: UpscaleJob) -> Tuple[bool, str]:
+            return upscale_one(job.source, job.output)
+
+        for job, result in schedule_jobs(jobs, run_job, workers, retries):
+            report(job, result)
 
     return stats
 
@@ -563,6 +1255,41 @@ def print_check_results(backends: Dict[str, BackendInfo]) -> None:
     print()
 
 
+def add_scheduler_arguments(parser: argparse.ArgumentParser):
+    """Add the batch scheduling and caching options shared by the upscale commands"""
+    parser.add_argument('--workers', '-w', type=int, default=1,
+                        help='Concurrent backend processes (default: 1)')
+    parser.add_argument('--timeout', type=float, default=None,
+                        help='Seconds per image before the backend is killed (default: no limit)')
+    parser.add_argument('--retries', type=int, default=1,
+                        help='Extra attempts for a failed image (default: 1)')
+    parser.add_argument('--chunk-size', type=int, default=0,
+                        help='Images per backend run: NCNN directory mode (default: 0 = one run '
+                             f'per image), Real-ESRGAN session batches (default: {SESSION_CHUNK_SIZE})')
+    parser.add_argument('--atlas', type=int, nargs='?', const=ATLAS_TILE_MAX, default=0, metavar='MAX',
+                        help=f'Pack images up to MAXxMAX (default: {ATLAS_TILE_MAX}) into atlases '
+                             'and upscale each atlas once')
+    parser.add_argument('--atlas-size', type=int, default=ATLAS_SIZE,
+                        help=f'Atlas width/height limit in source pixels (default: {ATLAS_SIZE})')
+    parser.add_argument('--gutter', type=int, default=ATLAS_GUTTER,
+                        help=f'Edge-replicated border around packed tiles (default: {ATLAS_GUTTER})')
+    parser.add_argument('--denoise', type=float, default=None,
+                        help='Real-ESRGAN denoise strength (default: 0.5) or waifu2x noise level (default: 1)')
+    parser.add_argument('--cache', type=Path,
+                        help=f'Upscale result cache directory (default: <output>{CACHE_SUFFIX} next to the output)')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Upscale without reading or updating the result cache')
+    parser.add_argument('--link-mode', choices=LINK_MODES, default='hardlink',
+                        help='How cached results are placed at output paths (default: hardlink)')
+
+
+def open_cache(args) -> Optional[UpscaleCache]:
+    """UpscaleCache for the parsed arguments, or None with --no-cache"""
+    if args.no_cache:
+        return None
+    return UpscaleCache(args.cache or default_cache_dir(args.output), args.link_mode)
+
+
 def main():
     parser = argparse.ArgumentParser(
         description='FQ4 AI Upscale Tool - High-quality AI-powered upscaling'
@@ -584,6 +1311,7 @@ def main():
                         choices=['anime', 'general', 'video', 'fast'],
                         help='Model type (default: anime)')
         bp.add_argument('--no-recursive', action='store_true')
+        add_scheduler_arguments(bp)
 
     # Compare command
     compare_parser = subparsers.add_parser('compare', help='Compare backends')
@@ -597,6 +1325,7 @@ def main():
     auto_parser.add_argument('--output', '-o', type=Path, required=True)
     auto_parser.add_argument('--scale', '-s', type=int, default=4)
     auto_parser.add_argument('--model', '-m', type=str, default='anime')
+    add_scheduler_arguments(auto_parser)
 
     args = parser.parse_args()
 
@@ -630,18 +1359,36 @@ def main():
             return
 
         print(f"Auto-selected backend: {selected}")
-        stats = batch_upscale(
-            args.input, args.output, selected,
-            args.scale, args.model, True
-        )
-        print(f"\nProcessed: {stats['processed']}, Errors: {stats['errors']}, Skipped: {stats['skipped']}")
+        cache = open_cache(args)
+        try:
+            stats = batch_upscale(
+                args.input, args.output, selected,
+                args.scale, args.model, True,
+                args.workers, args.timeout, args.retries, args.chunk_size,
+                args.atlas, args.atlas_size, args.gutter,
+                args.denoise, cache
+            )
+        finally:
+            if cache is not None:
+                cache.save()
+        print(f"\nProcessed: {stats['processed']}, Errors: {stats['errors']}, "
+              f"Skipped: {stats['skipped']}, Cached: {stats['cached']}")
 
     elif args.command in ['realesrgan', 'realesrgan-ncnn', 'upscayl', 'waifu2x']:
-        stats = batch_upscale(
-            args.input, args.output, args.command,
-            args.scale, args.model, not args.no_recursive
-        )
-        print(f"\nProcessed: {stats['processed']}, Errors: {stats['errors']}, Skipped: {stats['skipped']}")
+        cache = open_cache(args)
+        try:
+            stats = batch_upscale(
+                args.input, args.output, args.command,
+                args.scale, args.model, not args.no_recursive,
+                args.workers, args.timeout, args.retries, args.chunk_size,
+                args.atlas, args.atlas_size, args.gutter,
+                args.denoise, cache
+            )
+        finally:
+            if cache is not None:
+                cache.save()
+        print(f"\nProcessed: {stats['processed']}, Errors: {stats['errors']}, "
+              f"Skipped: {stats['skipped']}, Cached: {stats['cached']}")
 
 
 if __name__ == '__main__':
@@ -6,6 +6,7 @@ Nearest-neighbor upscaling for pixel art preservation
 Usage:
     python tools/upscale_basic.py --input output/images --output output/images_hd --scale 4
     python tools/upscale_basic.py --input output/sprites --output output/sprites_hd --scale 4
+    python tools/upscale_basic.py batch --input output/sprites --output output/sprites_hd --no-cache
 """
 
 import argparse
@@ -19,6 +20,10 @@ except ImportError:
     print("Error: PIL/Pillow is required. Install with: pip install Pillow")
     sys.exit(1)
 
+sys.path.insert(0, str(Path(__file__).parent))
+from link_utils import LINK_MODES
+from upscale_cache import CACHE_SUFFIX, UpscaleCache, default_cache_dir
+
 
 def upscale_nearest(input_path: Path, output_path: Path, scale: int = 4) -> Image.Image:
     """
@@ -79,7 +84,8 @@ def batch_upscale(
     output_dir: Path,
     scale: int = 4,
     brighten: Optional[float] = None,
-    recursive: bool = True
+    recursive: bool = True,
+    cache: Optional[UpscaleCache] = None
 ) -> dict:
     """
     Batch upscale all PNG files in directory
@@ -90,6 +96,8 @@ def batch_upscale(
         scale: Scale factor
         brighten: Optional brightness factor
         recursive: Process subdirectories
+        cache: Optional UpscaleCache; identical pixels are upscaled once
+               and linked, outputs made with other settings are rebuilt
 
     Returns:
         Statistics dict
@@ -99,6 +107,7 @@ def batch_upscale(
     stats = {
         'processed': 0,
         'skipped': 0,
+        'cached': 0,
         'errors': 0,
         'total_size_before': 0,
         'total_size_after': 0
@@ -110,6 +119,13 @@ def batch_upscale(
 
     print(f"Found {len(png_files)} PNG files in {input_dir}")
 
+    variant = f"brighten={brighten}" if brighten and brighten != 1.0 else ''
+    params = UpscaleCache.params('nearest', '', scale, None, variant)
+
+    def cache_key(png: Path) -> str:
+        digest, _ = cache.digest(png)
+        return UpscaleCache.key(digest, params)
+
     for png in png_files:
         try:
             # Preserve directory structure
@@ -117,15 +133,34 @@ def batch_upscale(
             out_path = output_dir / relative.parent / f"{png.stem}_x{scale}.png"
             out_path.parent.mkdir(parents=True, exist_ok=True)
 
-            # Skip if already exists
+            # Skip if already exists (and, when cached, made with these settings);
+            # inputs are only hashed when their output has to be checked or built
+            key = None
             if out_path.exists():
-                print(f"  [SKIP] {relative}")
-                stats['skipped'] += 1
-                continue
+                recorded = cache.recorded_key(out_path) if cache is not None else None
+                if recorded is not None:
+                    key = cache_key(png)
+                if recorded is None or recorded == key:
+                    print(f"  [SKIP] {relative}")
+                    stats['skipped'] += 1
+                    continue
+
+                # Unlink rather than overwrite: it may be a hardlink into the cache
+                cache.forget(out_path)
+                out_path.unlink()
+
+            if cache is not None and key is None:
+                key = cache_key(png)
 
             # Read original
             stats['total_size_before'] += png.stat().st_size
 
+            if key is not None and cache.materialize(key, out_path):
+                stats['total_size_after'] += out_path.stat().st_size
+                stats['cached'] += 1
+                print(f"  [CACHE] {relative} → {out_path.name}")
+                continue
+
             # Upscale
             img = Image.open(png)
             if img.mode != 'RGBA':
@@ -139,6 +174,8 @@ def batch_upscale(
             new_size = (img.width * scale, img.height * scale)
             upscaled = img.resize(new_size, Image.Resampling.NEAREST)
             upscaled.save(out_path, 'PNG')
+            if key is not None:
+                cache.store(key, out_path)
 
             stats['total_size_after'] += out_path.stat().st_size
             stats['processed'] += 1
@@ -216,6 +253,12 @@ def main():
                               help='Brightness factor (e.g., 1.5 for 50% brighter)')
     batch_parser.add_argument('--no-recursive', action='store_true',
                               help='Do not process subdirectories')
+    batch_parser.add_argument('--cache', type=Path,
+                              help=f'Upscale result cache directory (default: <output>{CACHE_SUFFIX} next to the output)')
+    batch_parser.add_argument('--no-cache', action='store_true',
+                              help='Upscale without reading or updating the result cache')
+    batch_parser.add_argument('--link-mode', choices=LINK_MODES, default='hardlink',
+                              help='How cached results are placed at output paths (default: hardlink)')
 
     # Single file command
     single_parser = subparsers.add_parser('single', help='Upscale single file')
@@ -254,17 +297,25 @@ def main():
             print(f"Brighten: {args.brighten}×")
         print()
 
-        stats = batch_upscale(
-            args.input,
-            args.output,
-            args.scale,
-            args.brighten,
-            not args.no_recursive
-        )
+        cache = None if args.no_cache else UpscaleCache(args.cache or default_cache_dir(args.output),
+                                                        args.link_mode)
+        try:
+            stats = batch_upscale(
+                args.input,
+                args.output,
+                args.scale,
+                args.brighten,
+                not args.no_recursive,
+                cache
+            )
+        finally:
+            if cache is not None:
+                cache.save()
 
         print(f"\n=== Results ===")
         print(f"Processed: {stats['processed']}")
         print(f"Skipped: {stats['skipped']}")
+        print(f"Cached: {stats['cached']}")
         print(f"Errors: {stats['errors']}")
         if stats['total_size_before'] > 0:
             ratio = stats['total_size_after'] / stats['total_size_before']
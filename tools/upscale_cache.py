@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+FQ4 Upscale Result Cache
+Content-addressed store of upscaled images
+
+Results are keyed by a hash of the decoded input pixels (so renamed or
+re-encoded copies of a tile hit the same entry) together with every
+parameter that changes the output: backend, model, scale, denoise and
+layout variant (e.g. atlas packing). Each distinct key is upscaled once;
+outputs are materialized from the store with link_utils (hardlinks by
+default), so duplicate tiles cost no extra disk space.
+
+The cache also remembers which key produced each output path. An
+existing output made with other settings, or from an input that has
+since changed, is detected as stale instead of being silently reused.
+Input digests are kept with the file's size and mtime, so re-checking
+unchanged inputs on later runs costs a stat() instead of a decode.
+
+Layout:
+    <cache_dir>/objects/ab/cdef...   upscaled results (PNG data, no suffix)
+    <cache_dir>/index.json           output path -> key, input digests
+
+The default cache directory sits next to the output directory rather than
+inside it, and stored objects carry no .png suffix, so '**/*.png' globs
+over an output tree (palette tools, the classifier, chained upscales)
+never pick up cache entries.
+
+Usage:
+    from upscale_cache import UpscaleCache, default_cache_dir, pixel_digest
+
+    with UpscaleCache(default_cache_dir(output_dir)) as cache:
+        params = cache.params('realesrgan-ncnn', 'anime', 4)
+        digest, size = cache.digest(src)
+        key = cache.key(digest, params)
+        if not cache.materialize(key, dst):
+            ...  # upscale src to dst
+            cache.store(key, dst)
+"""
+
+import hashlib
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+try:
+    from PIL import Image
+except ImportError:
+    print("Error: PIL/Pillow is required. Install with: pip install Pillow")
+    sys.exit(1)
+
+sys.path.insert(0, str(Path(__file__).parent))
+from link_utils import link_file
+
+
+# Suffix of the default cache directory, a sibling of the output directory
+CACHE_SUFFIX = '.upscale_cache'
+
+# Bump when keys or stored results change meaning
+CACHE_VERSION = 1
+
+
+def default_cache_dir(output_dir: Path) -> Path:
+    """Default cache for an output directory: <output>.upscale_cache beside it"""
+    output_dir = Path(os.path.abspath(output_dir))
+    return output_dir.with_name(output_dir.name + CACHE_SUFFIX)
+
+
+def pixel_digest(image_path: Path) -> Tuple[str, Tuple[int, int]]:
+    """
+    SHA-256 of an image's decoded pixels
+
+    Mode, size, palette and transparency are hashed along with the pixel
+    bytes; file names, timestamps and PNG encoding details are not.
+
+    Returns:
+        (hex digest, (width, height))
+    """
+    with Image.open(image_path) as img:
+        img.load()
+        digest = hashlib.sha256(f"{img.mode}:{img.width}x{img.height}\n".encode())
+        if img.mode == 'P':
+            digest.update(bytes(img.getpalette() or []))
+        if 'transparency' in img.info:
+            digest.update(repr(img.info['transparency']).encode())
+        digest.update(img.tobytes())
+        return digest.hexdigest(), img.size
+
+
+class UpscaleCache:
+    """Content-addressed upscale results plus an output path -> key index"""
+
+    INDEX_NAME = 'index.json'
+
+    def __init__(self, cache_dir: Path, link_mode: str = 'hardlink'):
+        self.cache_dir = cache_dir
+        self.objects_dir = cache_dir / 'objects'
+        self.index_path = cache_dir / self.INDEX_NAME
+        self.link_mode = link_mode
+        self.outputs: Dict[str, str] = {}
+        self.sources: Dict[str, list] = {}
+        self.hits = 0
+        self.stored = 0
+        self.load()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.save()
+
+    def load(self):
+        """Load the output index (missing or unreadable index = empty)"""
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return
+        if index.get('version') == CACHE_VERSION:
+            self.outputs = index.get('outputs', {})
+            self.sources = index.get('sources', {})
+
+    def save(self):
+        """Write the output index atomically"""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.index_path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': CACHE_VERSION, 'outputs': self.outputs,
+                       'sources': self.sources},
+                      f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.index_path)
+
+    @staticmethod
+    def params(backend: str, model: str = '', scale: int = 4,
+               denoise: Optional[float] = None, variant: str = '') -> str:
+        """Canonical string of the settings that affect an upscaled result"""
+        return f"v{CACHE_VERSION}|{backend}|{model}|x{scale}|denoise={denoise}|{variant}"
+
+    @staticmethod
+    def key(digest: str, params: str) -> str:
+        """Cache key for an input pixel digest upscaled with params"""
+        return hashlib.sha256(f"{params}\n{digest}".encode()).hexdigest()
+
+    def object_path(self, key: str) -> Path:
+        """Stored result for a key (no suffix, so image globs skip it)"""
+        return self.objects_dir / key[:2] / key[2:]
+
+    @staticmethod
+    def output_id(output_path: Path) -> str:
+        return os.path.abspath(output_path)
+
+    def digest(self, image_path: Path) -> Tuple[str, Tuple[int, int]]:
+        """
+        pixel_digest of an input, reused while its size and mtime are unchanged
+
+        Returns:
+            (hex digest, (width, height))
+        """
+        st = os.stat(image_path)
+        signature = [st.st_size, st.st_mtime_ns]
+        source_id = self.output_id(image_path)
+
+        entry = self.sources.get(source_id)
+        if entry is not None and entry[:2] == signature:
+            return entry[2], tuple(entry[3])
+
+        digest, size = pixel_digest(image_path)
+        self.sources[source_id] = signature + [digest, list(size)]
+        return digest, size
+
+    def recorded_key(self, output_path: Path) -> Optional[str]:
+        """Key that produced output_path, or None if it was not made through the cache"""
+        return self.outputs.get(self.output_id(output_path))
+
+    def materialize(self, key: str, output_path: Path) -> bool:
+        """
+        Place the stored result for key at output_path
+
+        Returns:
+            False if nothing is stored for key
+        """
+        obj = self.object_path(key)
+        if not obj.exists():
+            return False
+
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        link_file(obj, output_path, self.link_mode)
+        self.outputs[self.output_id(output_path)] = key
+        self.hits += 1
+        return True
+
+    def store(self, key: str, output_path: Path):
+        """Add a freshly upscaled output to the store (hardlinked when possible)"""
+        obj = self.object_path(key)
+        if not obj.exists():
+            obj.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = obj.with_name(obj.name + '.tmp')
+            link_file(output_path, tmp_path, 'hardlink')
+            os.replace(tmp_path, obj)
+            self.stored += 1
+        self.outputs[self.output_id(output_path)] = key
+
+    def forget(self, output_path: Path):
+        """Drop the index entry of an output that is about to be rebuilt"""
+        self.outputs.pop(self.output_id(output_path), None)